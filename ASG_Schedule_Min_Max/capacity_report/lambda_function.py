@@ -0,0 +1,48 @@
+import os
+import json
+from datetime import datetime
+
+import aws_clients
+import report
+
+def lambda_handler(event, context):
+    sns_topic_arn = os.environ['SNS_TOPIC_ARN']
+    groups = report_groups()
+    weeks = int(event.get('weeks', os.environ.get('REPORT_WEEKS', '4')))
+
+    autoscaling = aws_clients.client('autoscaling')
+    sns = aws_clients.client('sns')
+
+    try:
+        summary = report.build_report(autoscaling, groups, report.cache_from_environment(), weeks=weeks)
+
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Subject=f"ASG Capacity Savings Report: {len(groups)} group(s)",
+            Message=report.format_report(summary)
+        )
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(summary)
+        }
+
+    except Exception as e:
+        error_message = f"Error building ASG capacity report: {str(e)}"
+
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Subject="ERROR: ASG Capacity Savings Report Failed",
+            Message=f"Error occurred while building the capacity report:\n\n{error_message}\n\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+
+        raise e
+
+
+def report_groups():
+    """The scheduled group plus any groups in the tiered schedule."""
+    groups = [os.environ['ASG_NAME']]
+    tiers = os.environ.get('ASG_TIERS')
+    if tiers:
+        groups += [name for name in json.loads(tiers)['groups'] if name not in groups]
+    return groups
@@ -0,0 +1,297 @@
+"""
+Instance-hours and under-provisioning report rebuilt from scaling activities.
+
+Each group's capacity over time is reconstructed from
+describe_scaling_activities:
+
+- in-service count: +1 when a launch completes, -1 when a termination starts
+- desired capacity: the "changing the desired capacity from X to Y" causes
+
+Events are cached per group (S3 or a local directory) together with a cursor,
+so later reports only page through activities newer than the cursor. The
+in-service series is anchored to the group's current instance count, and all
+totals are computed with NumPy over the merged breakpoints of both series.
+
+Usage (with ../../Shared_Runtime on PYTHONPATH):
+
+    python report.py --groups app-asg,web-asg --weeks 4 --cache-dir ./cache
+"""
+import argparse
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import aws_clients
+
+TERMINAL_STATUSES = {'Successful', 'Failed', 'Cancelled'}
+DESIRED_CHANGE = re.compile(r'At (\S+Z) .*?changing the desired capacity from (\d+) to (\d+)')
+
+
+class FileCache:
+    """Cache reconstructed series as <directory>/<group>.json."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, group):
+        path = os.path.join(self.directory, f"{group}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as handle:
+            return json.load(handle)
+
+    def save(self, group, series):
+        with open(os.path.join(self.directory, f"{group}.json"), 'w') as handle:
+            json.dump(series, handle)
+
+
+class S3Cache:
+    """Cache reconstructed series as s3://<bucket>/<prefix><group>.json."""
+
+    def __init__(self, s3, bucket, prefix='capacity-report/'):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def load(self, group):
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}{group}.json")
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def save(self, group, series):
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}{group}.json",
+                           Body=json.dumps(series).encode('utf-8'),
+                           ContentType='application/json')
+
+
+def empty_series():
+    return {'cursor': None, 'recorded': [], 'coverage_start': None,
+            'instance_events': [], 'desired_events': []}
+
+
+def fetch_new_activities(autoscaling, group, cursor):
+    """
+    Page through activities newest first and stop at the cached cursor.
+    Returns the new activities oldest first.
+    """
+    activities = []
+    paginator = autoscaling.get_paginator('describe_scaling_activities')
+    for page in paginator.paginate(AutoScalingGroupName=group):
+        for activity in page['Activities']:
+            if activity['ActivityId'] == cursor:
+                return activities[::-1]
+            activities.append(activity)
+    return activities[::-1]
+
+
+def update_series(series, activities):
+    """
+    Fold new activities (oldest first) into the cached series.
+
+    Finished activities are recorded as they are seen, but the cursor only
+    moves up to the first activity still in progress, so that one is fetched
+    again next time. Activities recorded past the cursor are remembered by id
+    to avoid counting them twice.
+    """
+    recorded = set(series['recorded'])
+    desired_seen = {tuple(event) for event in series['desired_events']}
+    pending = False
+    for activity in activities:
+        finished = activity['StatusCode'] in TERMINAL_STATUSES
+        if not pending and finished:
+            series['cursor'] = activity['ActivityId']
+        pending = pending or not finished
+        if not finished or activity['ActivityId'] in recorded:
+            continue
+        if pending:
+            recorded.add(activity['ActivityId'])
+
+        start = activity['StartTime'].timestamp()
+        if series['coverage_start'] is None or start < series['coverage_start']:
+            series['coverage_start'] = start
+
+        description = activity.get('Description', '')
+        if activity['StatusCode'] == 'Successful':
+            if description.startswith('Launching'):
+                series['instance_events'].append([activity.get('EndTime', activity['StartTime']).timestamp(), 1])
+            elif description.startswith('Terminating'):
+                series['instance_events'].append([start, -1])
+
+        # Every instance launched for one capacity change repeats the same cause
+        for when, before, after in DESIRED_CHANGE.findall(activity.get('Cause', '')):
+            event = (_parse_time(when), int(before), int(after))
+            if event not in desired_seen:
+                desired_seen.add(event)
+                series['desired_events'].append(list(event))
+
+    # Ids at or before the cursor will never be returned again
+    series['recorded'] = sorted(recorded) if pending else []
+    series['instance_events'].sort()
+    series['desired_events'].sort()
+    return series
+
+
+def counted_instances(asg):
+    """Instances whose launch has completed, matching the recorded launch events."""
+    return sum(1 for instance in asg.get('Instances', [])
+               if not instance['LifecycleState'].startswith('Pending'))
+
+
+def instance_steps(series, current_count):
+    """Return (times, levels, initial): the in-service count from each time onwards."""
+    events = np.asarray(series['instance_events'], dtype=float).reshape(-1, 2)
+    times, deltas = events[:, 0], events[:, 1]
+    # Anchor at the current count and walk the deltas backwards
+    before_first = current_count - deltas.sum()
+    levels = np.maximum(before_first + np.cumsum(deltas), 0)
+    return times, levels, max(before_first, 0)
+
+
+def desired_steps(series, current_desired):
+    """Return (times, levels, initial) for the desired capacity."""
+    events = np.asarray(series['desired_events'], dtype=float).reshape(-1, 3)
+    if events.size == 0:
+        return np.empty(0), np.empty(0), float(current_desired)
+    return events[:, 0], events[:, 2], events[0, 1]
+
+
+def step_values(times, levels, initial, points):
+    """Evaluate a right-continuous step function at each point."""
+    if times.size == 0:
+        return np.full(points.shape, float(initial))
+    index = np.searchsorted(times, points, side='right') - 1
+    return np.where(index >= 0, levels[np.maximum(index, 0)], initial).astype(float)
+
+
+def weekly_totals(series, asg, week_edges):
+    """
+    Integrate the reconstructed series over each week.
+
+    Returns one dict per week with instance-hours, always-on baseline hours at
+    MaxSize, hours saved and hours spent with fewer InService instances than
+    desired.
+    """
+    in_times, in_levels, in_initial = instance_steps(series, counted_instances(asg))
+    de_times, de_levels, de_initial = desired_steps(series, asg['DesiredCapacity'])
+
+    breakpoints = np.union1d(np.union1d(in_times, de_times), week_edges)
+    breakpoints = breakpoints[(breakpoints >= week_edges[0]) & (breakpoints <= week_edges[-1])]
+    starts, durations = breakpoints[:-1], np.diff(breakpoints) / 3600.0
+
+    in_service = step_values(in_times, in_levels, in_initial, starts)
+    desired = step_values(de_times, de_levels, de_initial, starts)
+    week = np.searchsorted(week_edges, starts, side='right') - 1
+    weeks = len(week_edges) - 1
+
+    instance_hours = np.bincount(week, weights=in_service * durations, minlength=weeks)
+    under_hours = np.bincount(week, weights=(in_service < desired) * durations, minlength=weeks)
+    baseline_hours = np.diff(week_edges) / 3600.0 * asg['MaxSize']
+
+    return [
+        {
+            'week_start': datetime.fromtimestamp(week_edges[i], tz=timezone.utc).strftime('%Y-%m-%d'),
+            'instance_hours': round(float(instance_hours[i]), 1),
+            'baseline_hours': round(float(baseline_hours[i]), 1),
+            'saved_hours': round(float(baseline_hours[i] - instance_hours[i]), 1),
+            'under_provisioned_hours': round(float(under_hours[i]), 2),
+        }
+        for i in range(weeks)
+    ]
+
+
+def week_edges_for(now, weeks):
+    """Monday 00:00 UTC boundaries for the last `weeks` complete weeks."""
+    monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return np.array([(monday - timedelta(weeks=weeks - i)).timestamp() for i in range(weeks + 1)])
+
+
+def build_report(autoscaling, groups, cache, weeks=4, now=None):
+    """Refresh each group's cached series and summarize it per week and per fleet."""
+    now = now or datetime.now(timezone.utc)
+    edges = week_edges_for(now, weeks)
+
+    described = {}
+    paginator = autoscaling.get_paginator('describe_auto_scaling_groups')
+    for page in paginator.paginate(AutoScalingGroupNames=list(groups)):
+        for asg in page['AutoScalingGroups']:
+            described[asg['AutoScalingGroupName']] = asg
+
+    report = {'groups': {}, 'fleet': [], 'coverage_start': {}}
+    for group in groups:
+        if group not in described:
+            raise Exception(f"Auto Scaling Group {group} not found")
+        series = cache.load(group) or empty_series()
+        series = update_series(series, fetch_new_activities(autoscaling, group, series['cursor']))
+        cache.save(group, series)
+
+        report['groups'][group] = weekly_totals(series, described[group], edges)
+        if series['coverage_start']:
+            report['coverage_start'][group] = datetime.fromtimestamp(
+                series['coverage_start'], tz=timezone.utc).strftime('%Y-%m-%d')
+
+    for i in range(weeks):
+        rows = [totals[i] for totals in report['groups'].values()]
+        report['fleet'].append({
+            'week_start': rows[0]['week_start'],
+            **{key: round(sum(row[key] for row in rows), 2)
+               for key in ('instance_hours', 'baseline_hours', 'saved_hours', 'under_provisioned_hours')},
+        })
+    return report
+
+
+def format_report(report):
+    header = f"{'Week of':<12}{'Inst-hrs':>10}{'Always-on':>11}{'Saved':>9}{'Saved %':>9}{'Under-prov hrs':>16}"
+
+    def rows(totals):
+        lines = [header]
+        for row in totals:
+            share = row['saved_hours'] / row['baseline_hours'] if row['baseline_hours'] else 0.0
+            lines.append(f"{row['week_start']:<12}{row['instance_hours']:>10.1f}{row['baseline_hours']:>11.1f}"
+                         f"{row['saved_hours']:>9.1f}{share:>9.0%}{row['under_provisioned_hours']:>16.2f}")
+        return lines
+
+    lines = ["ASG Capacity Savings Report", ""]
+    for group, totals in report['groups'].items():
+        since = report['coverage_start'].get(group)
+        lines.append(f"Group: {group}" + (f" (activity history since {since})" if since else ""))
+        lines.extend(rows(totals))
+        lines.append("")
+    lines.append("Fleet total:")
+    lines.extend(rows(report['fleet']))
+    lines.append("")
+    lines.append("Always-on baseline assumes MaxSize instances around the clock.")
+    return '\n'.join(lines)
+
+
+def cache_from_environment():
+    bucket = os.environ.get('REPORT_CACHE_BUCKET')
+    if bucket:
+        return S3Cache(aws_clients.client('s3'), bucket)
+    return FileCache(os.environ.get('REPORT_CACHE_DIR', '/tmp/capacity-report'))
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Weekly ASG instance-hours savings report')
+    parser.add_argument('--groups', required=True, help='comma separated Auto Scaling Group names')
+    parser.add_argument('--weeks', type=int, default=4)
+    parser.add_argument('--cache-dir', default='.capacity-report-cache')
+    parser.add_argument('--json', action='store_true', help='print the raw report as JSON')
+    args = parser.parse_args(argv)
+
+    report = build_report(aws_clients.client('autoscaling'), [g.strip() for g in args.groups.split(',') if g.strip()],
+                          FileCache(args.cache_dir), weeks=args.weeks)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,15 @@
-import boto3
 import os
 import json
 from datetime import datetime
 
+import aws_clients
+
 def lambda_handler(event, context):
     asg_name = os.environ['ASG_NAME']
     sns_topic_arn = os.environ['SNS_TOPIC_ARN']
     
-    autoscaling = boto3.client('autoscaling')
-    sns = boto3.client('sns')
+    autoscaling = aws_clients.client('autoscaling')
+    sns = aws_clients.client('sns')
     
     try:
         # Get current ASG configuration
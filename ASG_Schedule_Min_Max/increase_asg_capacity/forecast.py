@@ -0,0 +1,331 @@
+"""
+Seasonal capacity forecast for the morning scale-up.
+
+Instead of always restoring the Auto Scaling Group to MaxSize, the increase
+function can size the group from the same hour-of-week in previous weeks.
+Hourly history is turned into "required instances" per hour, a weekly level
+with a linear trend is fitted, and the morning desired capacity is the chosen
+percentile of the week-over-week peaks, plus headroom, clamped to the group
+bounds. Target tracking absorbs anything above the forecast.
+
+The module also doubles as a command line tool (with ../../Shared_Runtime on
+PYTHONPATH):
+
+    python forecast.py backtest --asg <name> --weeks 6 --days 28
+    python forecast.py backtest --csv history.csv --max-size 10
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import aws_clients
+
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday; shifting by three days makes slot 0 Monday 00:00 UTC
+EPOCH_WEEKDAY_OFFSET_HOURS = 72
+
+
+def fetch_required_history(cloudwatch, asg_name, weeks, end=None, metric='cpu',
+                           target_cpu=50.0, target_group=None, load_balancer=None,
+                           requests_per_instance=None):
+    """
+    Fetch hourly history from CloudWatch and convert it to required instances.
+
+    metric='cpu' uses the group's CPUUtilization and GroupInServiceInstances
+    (group metrics collection must be enabled), scaled to the target CPU.
+    metric='requests' uses the ALB target group RequestCount divided by the
+    requests one instance can serve in an hour.
+
+    Returns (hours, required) where hours are epoch hours (UTC).
+    """
+    end = (end or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(weeks=weeks)
+
+    if metric == 'cpu':
+        queries = [
+            _metric_query('cpu', 'AWS/EC2', 'CPUUtilization', 'Average',
+                          [{'Name': 'AutoScalingGroupName', 'Value': asg_name}]),
+            _metric_query('instances', 'AWS/AutoScaling', 'GroupInServiceInstances', 'Average',
+                          [{'Name': 'AutoScalingGroupName', 'Value': asg_name}]),
+        ]
+    elif metric == 'requests':
+        if not (target_group and load_balancer and requests_per_instance):
+            raise ValueError("metric 'requests' needs target_group, load_balancer and requests_per_instance")
+        queries = [
+            _metric_query('requests', 'AWS/ApplicationELB', 'RequestCount', 'Sum',
+                          [{'Name': 'TargetGroup', 'Value': target_group},
+                           {'Name': 'LoadBalancer', 'Value': load_balancer}]),
+        ]
+    else:
+        raise ValueError(f"Unsupported forecast metric: {metric}")
+
+    series = _get_metric_data(cloudwatch, queries, start, end)
+    hours = np.arange(_epoch_hour(start), _epoch_hour(end), dtype=np.int64)
+
+    if metric == 'cpu':
+        cpu = _align(series['cpu'], hours)
+        instances = _align(series['instances'], hours)
+        required = instances * cpu / float(target_cpu)
+    else:
+        required = _align(series['requests'], hours) / float(requests_per_instance)
+
+    return hours, required
+
+
+def fit_seasonal_baseline(hours, required):
+    """
+    Fold an hourly series into a (weeks x 168) matrix and fit its weekly level.
+
+    Returns (ratios, next_level): each week's hourly values relative to that
+    week's mean, and the level extrapolated one week past the history with a
+    least-squares linear trend. Missing hours stay NaN.
+    """
+    hours = np.asarray(hours, dtype=np.int64)
+    required = np.asarray(required, dtype=float)
+
+    shifted = hours + EPOCH_WEEKDAY_OFFSET_HOURS
+    week = shifted // HOURS_PER_WEEK
+    week -= week.min()
+    slot = shifted % HOURS_PER_WEEK
+
+    matrix = np.full((week.max() + 1, HOURS_PER_WEEK), np.nan)
+    matrix[week, slot] = required
+
+    counts = np.isfinite(matrix).sum(axis=1)
+    if not counts.any():
+        return matrix, float('nan')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        level = np.where(counts > 0, np.nansum(matrix, axis=1) / counts, np.nan)
+
+    x = np.flatnonzero(np.isfinite(level) & (level > 0))
+    if x.size == 0:
+        return np.zeros_like(matrix), 0.0
+    if x.size == 1:
+        next_level = level[x[0]]
+    else:
+        slope, intercept = np.polyfit(x, level[x], 1)
+        # Never let the trend extrapolate below the lowest level actually seen
+        next_level = max(slope * matrix.shape[0] + intercept, np.nanmin(level[x]))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = matrix / level[:, None]
+    return ratios, float(next_level)
+
+
+def forecast_capacity(hours, required, start_hour, window_hours=2, percentile=90.0,
+                      headroom=0.15, min_size=1, max_size=None):
+    """
+    Forecast the desired capacity for the window starting at start_hour.
+
+    start_hour is an epoch hour (UTC). The peak of each past week over the same
+    hour-of-week window is taken, the given percentile of those peaks is scaled
+    by the forecast weekly level and headroom, rounded up and clamped to
+    [min_size, max_size]. Returns None when there is not enough history.
+    """
+    ratios, next_level = fit_seasonal_baseline(hours, required)
+    if not np.isfinite(next_level):
+        return None
+
+    slots = (start_hour + EPOCH_WEEKDAY_OFFSET_HOURS + np.arange(window_hours)) % HOURS_PER_WEEK
+    window = ratios[:, slots]
+    observed = np.isfinite(window).any(axis=1)
+    if not observed.any():
+        return None
+
+    weekly_peaks = np.nanmax(window[observed], axis=1)
+    predicted = np.percentile(weekly_peaks, percentile) * next_level * (1.0 + headroom)
+
+    capacity = max(int(math.ceil(predicted - 1e-9)), min_size)
+    if max_size is not None:
+        capacity = min(capacity, max_size)
+    return capacity
+
+
+def backtest(hours, required, start_hour_of_day, days, weeks, window_hours=2,
+             percentile=90.0, headroom=0.15, min_size=1, max_size=None):
+    """
+    Replay the last `days` mornings, forecasting each one from the `weeks`
+    before it only, and compare with the capacity that was actually required.
+
+    Returns a list of dicts with day, predicted, required and shortfall.
+    """
+    hours = np.asarray(hours, dtype=np.int64)
+    required = np.asarray(required, dtype=float)
+
+    last_day_start = (hours.max() // 24) * 24
+    results = []
+    for offset in range(days, 0, -1):
+        start = last_day_start - offset * 24 + start_hour_of_day
+        history = (hours < start) & (hours >= start - weeks * HOURS_PER_WEEK)
+        window = (hours >= start) & (hours < start + window_hours)
+        if not history.any() or not window.any() or not np.isfinite(required[window]).any():
+            continue
+
+        predicted = forecast_capacity(hours[history], required[history], start,
+                                      window_hours=window_hours, percentile=percentile,
+                                      headroom=headroom, min_size=min_size, max_size=max_size)
+        if predicted is None:
+            continue
+        actual = int(math.ceil(np.nanmax(required[window]) - 1e-9))
+        results.append({
+            'day': datetime.fromtimestamp(start * 3600, tz=timezone.utc).strftime('%Y-%m-%d %a %H:00'),
+            'predicted': predicted,
+            'required': actual,
+            'shortfall': max(actual - predicted, 0),
+        })
+    return results
+
+
+def forecast_from_environment(asg_name, min_size, max_size, now=None):
+    """Forecast the morning capacity using the FORECAST_* environment variables."""
+    now = now or datetime.now(timezone.utc)
+    cloudwatch = aws_clients.client('cloudwatch')
+
+    hours, required = fetch_required_history(
+        cloudwatch, asg_name,
+        weeks=int(os.environ.get('FORECAST_LOOKBACK_WEEKS', '6')),
+        end=now,
+        metric=os.environ.get('FORECAST_METRIC', 'cpu'),
+        target_cpu=float(os.environ.get('FORECAST_TARGET_CPU', '50')),
+        target_group=os.environ.get('FORECAST_TARGET_GROUP'),
+        load_balancer=os.environ.get('FORECAST_LOAD_BALANCER'),
+        requests_per_instance=float(os.environ.get('FORECAST_REQUESTS_PER_INSTANCE', '0')) or None,
+    )
+    return forecast_capacity(
+        hours, required, _epoch_hour(now),
+        window_hours=int(os.environ.get('FORECAST_WINDOW_HOURS', '2')),
+        percentile=float(os.environ.get('FORECAST_PERCENTILE', '90')),
+        headroom=float(os.environ.get('FORECAST_HEADROOM', '0.15')),
+        min_size=min_size,
+        max_size=max_size,
+    )
+
+
+def _metric_query(query_id, namespace, metric_name, stat, dimensions):
+    return {
+        'Id': query_id,
+        'MetricStat': {
+            'Metric': {'Namespace': namespace, 'MetricName': metric_name, 'Dimensions': dimensions},
+            'Period': 3600,
+            'Stat': stat,
+        },
+        'ReturnData': True,
+    }
+
+
+def _get_metric_data(cloudwatch, queries, start, end):
+    series = {query['Id']: ([], []) for query in queries}
+    paginator = cloudwatch.get_paginator('get_metric_data')
+    for page in paginator.paginate(MetricDataQueries=queries, StartTime=start, EndTime=end):
+        for result in page['MetricDataResults']:
+            timestamps, values = series[result['Id']]
+            timestamps.extend(_epoch_hour(ts) for ts in result['Timestamps'])
+            values.extend(result['Values'])
+    return series
+
+
+def _align(series, hours):
+    timestamps, values = series
+    aligned = np.full(hours.shape, np.nan)
+    if timestamps:
+        index = np.asarray(timestamps, dtype=np.int64) - hours[0]
+        keep = (index >= 0) & (index < hours.size)
+        aligned[index[keep]] = np.asarray(values, dtype=float)[keep]
+    return aligned
+
+
+def _epoch_hour(ts):
+    return int(ts.timestamp() // 3600)
+
+
+def _load_csv(path):
+    """Read a timestamp,required CSV (ISO 8601 timestamps, UTC if naive)."""
+    hours, required = [], []
+    with open(path, newline='') as handle:
+        for row in csv.DictReader(handle):
+            ts = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00'))
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            hours.append(_epoch_hour(ts))
+            required.append(float(row['required']) if row['required'] else np.nan)
+    order = np.argsort(hours)
+    return np.asarray(hours, dtype=np.int64)[order], np.asarray(required)[order]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seasonal morning capacity forecast')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    run = subcommands.add_parser('backtest', help='replay history to compare predicted and required capacity')
+    source = run.add_mutually_exclusive_group(required=True)
+    source.add_argument('--asg', help='Auto Scaling Group to fetch CloudWatch history for')
+    source.add_argument('--csv', help='offline history with timestamp,required columns')
+    run.add_argument('--metric', choices=['cpu', 'requests'], default='cpu')
+    run.add_argument('--target-cpu', type=float, default=50.0)
+    run.add_argument('--target-group')
+    run.add_argument('--load-balancer')
+    run.add_argument('--requests-per-instance', type=float)
+    run.add_argument('--weeks', type=int, default=6, help='lookback used for each forecast')
+    run.add_argument('--days', type=int, default=28, help='number of past mornings to replay')
+    run.add_argument('--hour', type=int, default=21, help='scale-up hour of day (UTC), as in the cron')
+    run.add_argument('--window', type=int, default=2, help='hours the morning capacity must cover')
+    run.add_argument('--percentile', type=float, default=90.0)
+    run.add_argument('--headroom', type=float, default=0.15)
+    run.add_argument('--min-size', type=int, default=1)
+    run.add_argument('--max-size', type=int)
+    run.add_argument('--save-csv', help='write the fetched history to this file')
+    args = parser.parse_args(argv)
+
+    max_size = args.max_size
+    if args.csv:
+        hours, required = _load_csv(args.csv)
+    else:
+        if max_size is None:
+            group = aws_clients.client('autoscaling').describe_auto_scaling_groups(
+                AutoScalingGroupNames=[args.asg])['AutoScalingGroups']
+            if not group:
+                parser.error(f"Auto Scaling Group {args.asg} not found")
+            max_size = group[0]['MaxSize']
+        hours, required = fetch_required_history(
+            aws_clients.client('cloudwatch'), args.asg, weeks=args.weeks + args.days // 7 + 1,
+            metric=args.metric, target_cpu=args.target_cpu, target_group=args.target_group,
+            load_balancer=args.load_balancer, requests_per_instance=args.requests_per_instance)
+
+    if args.save_csv:
+        with open(args.save_csv, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['timestamp', 'required'])
+            for hour, value in zip(hours, required):
+                ts = datetime.fromtimestamp(int(hour) * 3600, tz=timezone.utc).isoformat()
+                writer.writerow([ts, '' if np.isnan(value) else f'{value:.3f}'])
+
+    results = backtest(hours, required, args.hour, args.days, args.weeks,
+                       window_hours=args.window, percentile=args.percentile,
+                       headroom=args.headroom, min_size=args.min_size, max_size=max_size)
+    if not results:
+        print('Not enough history to backtest.')
+        return 1
+
+    print(f"{'Morning (UTC)':<22}{'Predicted':>10}{'Required':>10}{'Shortfall':>10}")
+    for row in results:
+        print(f"{row['day']:<22}{row['predicted']:>10}{row['required']:>10}{row['shortfall']:>10}")
+
+    predicted = np.array([row['predicted'] for row in results])
+    actual = np.array([row['required'] for row in results])
+    print()
+    print(f"Mornings replayed: {len(results)}")
+    print(f"Under-provisioned mornings: {int((predicted < actual).sum())}")
+    print(f"Mean over-provisioning: {float(np.mean(predicted - actual)):.2f} instances")
+    if max_size:
+        print(f"Instances saved per morning vs MaxSize ({max_size}): {float(np.mean(max_size - predicted)):.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
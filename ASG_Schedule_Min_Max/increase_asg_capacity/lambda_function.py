@@ -1,14 +1,16 @@
-import boto3
 import os
 import json
 from datetime import datetime
 
+import aws_clients
+import forecast
+
 def lambda_handler(event, context):
     asg_name = os.environ['ASG_NAME']
     sns_topic_arn = os.environ['SNS_TOPIC_ARN']
     
-    autoscaling = boto3.client('autoscaling')
-    sns = boto3.client('sns')
+    autoscaling = aws_clients.client('autoscaling')
+    sns = aws_clients.client('sns')
     
     try:
         # Get current ASG configuration
@@ -24,11 +26,14 @@ def lambda_handler(event, context):
         current_desired = asg['DesiredCapacity']
         max_capacity = asg['MaxSize']
         
+        # Size the morning capacity from history, falling back to MaxSize
+        new_capacity, capacity_note = get_target_capacity(asg_name, max_capacity)
+        
         # Update ASG to increase capacity
         autoscaling.update_auto_scaling_group(
             AutoScalingGroupName=asg_name,
-            MinSize=max_capacity,
-            DesiredCapacity=max_capacity
+            MinSize=new_capacity,
+            DesiredCapacity=new_capacity
         )
         
         # Prepare notification message
@@ -44,10 +49,12 @@ def lambda_handler(event, context):
         - Max Size: {max_capacity}
         
         New Configuration:
-        - Min Size: {max_capacity}
-        - Desired Capacity: {max_capacity}
+        - Min Size: {new_capacity}
+        - Desired Capacity: {new_capacity}
         - Max Size: {max_capacity}
         
+        {capacity_note}
+        
         This change was made as part of the daily schedule to restore full capacity during business hours.
         """
         
@@ -64,8 +71,8 @@ def lambda_handler(event, context):
                 'message': 'ASG capacity increased successfully',
                 'previous_min': current_min,
                 'previous_desired': current_desired,
-                'new_min': max_capacity,
-                'new_desired': max_capacity
+                'new_min': new_capacity,
+                'new_desired': new_capacity
             })
         }
         
@@ -80,3 +87,30 @@ def lambda_handler(event, context):
         )
         
         raise e
+
+
+def get_target_capacity(asg_name, max_capacity):
+    """
+    Return (capacity, note) for the morning scale-up.
+    
+    With FORECAST_ENABLED=true the capacity comes from the seasonal forecast;
+    otherwise, or if the forecast fails or lacks history, it is MaxSize.
+    """
+    if os.environ.get('FORECAST_ENABLED', 'false').lower() != 'true':
+        return max_capacity, "Capacity source: MaxSize (forecast disabled)."
+    
+    try:
+        min_capacity = int(os.environ.get('FORECAST_MIN_CAPACITY', '1'))
+        capacity = forecast.forecast_from_environment(asg_name, min_capacity, max_capacity)
+    except Exception as e:
+        print(f"Forecast failed, falling back to MaxSize: {str(e)}")
+        return max_capacity, f"Capacity source: MaxSize (forecast failed: {str(e)})."
+    
+    if capacity is None:
+        return max_capacity, "Capacity source: MaxSize (not enough history for a forecast)."
+    
+    return capacity, (
+        f"Capacity source: forecast at p{os.environ.get('FORECAST_PERCENTILE', '90')} "
+        f"with {float(os.environ.get('FORECAST_HEADROOM', '0.15')):.0%} headroom; "
+        f"target tracking can scale up to {max_capacity}."
+    )
@@ -0,0 +1,335 @@
+"""
+Replay historical per-minute load against candidate capacity schedules.
+
+A candidate uses the same shape as the scheduler: the EventBridge cron
+expressions from template.yaml plus the day/night capacities used by the
+increase/decrease functions and the tiered scheduler (ASG_TIERS):
+
+    [
+      {"name": "current", "scale_up": "cron(0 21 ? * * *)", "scale_down": "cron(0 9 ? * * *)",
+       "day_capacity": 4, "night_capacity": 1},
+      {"grid": {"scale_up_hours": [19, 20, 21], "scale_down_hours": [8, 9, 10],
+                "day_capacity": [2, 3, 4, 5], "night_capacity": [1, 2], "days": "*"}}
+    ]
+
+"grid" entries expand into every combination. For each candidate the
+simulator reports under-provisioned minutes, peak shortfall (instances) and
+instance-hours. Candidates that share crons share one pass over the data, and
+capacities are scored from cumulative histograms of the required instances,
+so thousands of candidates run in seconds.
+
+Usage:
+
+    python simulate.py --load load.csv --per-instance 1200 --candidates candidates.json
+    python simulate.py --load load.parquet --per-instance 1200 --template ../template.yaml --max-size 4
+"""
+import argparse
+import csv
+import itertools
+import json
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+DAY_NAMES = {'SUN': 1, 'MON': 2, 'TUE': 3, 'WED': 4, 'THU': 5, 'FRI': 6, 'SAT': 7}
+MONTH_NAMES = {name: number for number, name in enumerate(
+    ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'], start=1)}
+CRON_PATTERN = re.compile(r'^cron\((.+)\)$')
+
+
+def parse_cron_field(field, low, high, names=None):
+    """Expand one cron field (*, ?, lists, ranges, steps, names) into a set of ints."""
+    if field in ('*', '?'):
+        return set(range(low, high + 1))
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part in ('*', ''):
+            start, end = low, high
+        elif '-' in part:
+            start, end = (_cron_value(value, names) for value in part.split('-'))
+        else:
+            start = _cron_value(part, names)
+            end = high if step > 1 else start
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _cron_value(value, names):
+    if names and value.upper() in names:
+        return names[value.upper()]
+    return int(value)
+
+
+def _has_modifier(field, names=None):
+    """True if a token of the field (other than a month or day name) uses L, W or #."""
+    for token in re.split(r'[,/-]', field.upper()):
+        if names and token in names:
+            continue
+        if any(marker in token for marker in ('L', 'W', '#')):
+            return True
+    return False
+
+
+def parse_cron(expression):
+    """
+    Parse an EventBridge cron(min hour day-of-month month day-of-week year).
+    L, W and # modifiers are not supported by the simulator.
+    """
+    match = CRON_PATTERN.match(expression.strip())
+    if not match:
+        raise ValueError(f"Not an EventBridge cron expression: {expression}")
+    fields = match.group(1).split()
+    if len(fields) != 6:
+        raise ValueError(f"Expected 6 cron fields in {expression}")
+    minutes, hours, days, months, weekdays, years = fields
+    if any(_has_modifier(field, names) for field, names in (
+            (minutes, None), (hours, None), (days, None), (months, MONTH_NAMES), (weekdays, DAY_NAMES), (years, None))):
+        raise ValueError(f"L, W and # are not supported: {expression}")
+    return {
+        'minute': parse_cron_field(minutes, 0, 59),
+        'hour': parse_cron_field(hours, 0, 23),
+        'day': parse_cron_field(days, 1, 31),
+        'month': parse_cron_field(months, 1, 12, MONTH_NAMES),
+        'weekday': parse_cron_field(weekdays, 1, 7, DAY_NAMES),
+        'year': parse_cron_field(years, 1970, 2199),
+    }
+
+
+def calendar_fields(minutes):
+    """Calendar fields (UTC) for an array of epoch minutes, AWS weekday 1=SUN."""
+    stamps = minutes.astype('datetime64[m]')
+    days = stamps.astype('datetime64[D]')
+    months = stamps.astype('datetime64[M]')
+    years = stamps.astype('datetime64[Y]')
+    return {
+        'minute': minutes % 60,
+        'hour': (minutes // 60) % 24,
+        'day': (days - months.astype('datetime64[D]')).astype(np.int64) + 1,
+        'month': months.astype(np.int64) % 12 + 1,
+        # 1970-01-01 was a Thursday (AWS weekday 5)
+        'weekday': (days.astype(np.int64) + 4) % 7 + 1,
+        'year': years.astype(np.int64) + 1970,
+    }
+
+
+def cron_fires(expression, fields):
+    """Boolean mask of the minutes in which the cron expression fires."""
+    cron = parse_cron(expression)
+    fires = np.ones(fields['minute'].shape, dtype=bool)
+    for name, allowed in cron.items():
+        fires &= np.isin(fields[name], list(allowed))
+    return fires
+
+
+def day_mask(scale_up, scale_down, fields):
+    """
+    True for minutes after a scale-up and before the next scale-down. Minutes
+    before the first event take the state of the last event in the data, as
+    the schedule repeats.
+    """
+    up = cron_fires(scale_up, fields)
+    down = cron_fires(scale_down, fields)
+    events = up | down
+    if not events.any():
+        return np.zeros(up.shape, dtype=bool)
+    positions = np.where(events, np.arange(events.size), -1)
+    last_event = np.maximum.accumulate(positions)
+    last_event[last_event < 0] = np.flatnonzero(events)[-1]
+    # A scale-down firing in the same minute as a scale-up wins, as it runs last
+    return up[last_event] & ~down[last_event]
+
+
+def expand_candidates(entries):
+    """Expand "grid" entries and fill defaults so every candidate is complete."""
+    candidates = []
+    for entry in entries:
+        if 'grid' not in entry:
+            candidate = dict(entry)
+            candidate.setdefault('night_capacity', 1)
+            candidate.setdefault('name', f"{candidate['scale_up']} / {candidate['scale_down']} "
+                                         f"@ {candidate['day_capacity']}/{candidate['night_capacity']}")
+            candidates.append(candidate)
+            continue
+        grid = entry['grid']
+        days = grid.get('days', '*')
+        for up_hour, down_hour, day, night in itertools.product(
+                grid['scale_up_hours'], grid['scale_down_hours'],
+                grid['day_capacity'], grid.get('night_capacity', [1])):
+            candidates.append({
+                'name': f"up {up_hour:02d}:00 down {down_hour:02d}:00 @ {day}/{night}",
+                'scale_up': f"cron(0 {up_hour} ? * {days} *)",
+                'scale_down': f"cron(0 {down_hour} ? * {days} *)",
+                'day_capacity': day,
+                'night_capacity': night,
+            })
+    return candidates
+
+
+def simulate(minutes, load, per_instance, candidates):
+    """
+    Score every candidate against the load.
+
+    minutes are epoch minutes (UTC), load the per-minute load; missing minutes
+    are filled in for the schedule but not scored. Returns one dict per
+    candidate with under_provisioned_minutes, peak_shortfall and
+    instance_hours.
+    """
+    minutes = np.asarray(minutes, dtype=np.int64)
+    grid = np.arange(minutes.min(), minutes.max() + 1, dtype=np.int64)
+    observed = np.zeros(grid.size, dtype=bool)
+    observed[minutes - grid[0]] = True
+    required = np.zeros(grid.size, dtype=np.int64)
+    needed = np.ceil(np.asarray(load, dtype=float) / per_instance - 1e-9)
+    required[minutes - grid[0]] = np.maximum(needed, 0).astype(np.int64)
+    fields = calendar_fields(grid)
+
+    results = [None] * len(candidates)
+    by_crons = {}
+    for index, candidate in enumerate(candidates):
+        by_crons.setdefault((candidate['scale_up'], candidate['scale_down']), []).append(index)
+
+    for (scale_up, scale_down), indexes in by_crons.items():
+        is_day = day_mask(scale_up, scale_down, fields)
+        day_stats = _period_stats(required[is_day & observed])
+        night_stats = _period_stats(required[~is_day & observed])
+        # Instance-hours cover the whole span, observed or not
+        day_hours, night_hours = is_day.sum() / 60.0, (~is_day).sum() / 60.0
+
+        day_capacity = np.array([candidates[i]['day_capacity'] for i in indexes])
+        night_capacity = np.array([candidates[i]['night_capacity'] for i in indexes])
+        under = _minutes_above(day_stats, day_capacity) + _minutes_above(night_stats, night_capacity)
+        shortfall = np.maximum(np.maximum(day_stats['peak'] - day_capacity, night_stats['peak'] - night_capacity), 0)
+        instance_hours = day_hours * day_capacity + night_hours * night_capacity
+
+        for position, index in enumerate(indexes):
+            results[index] = {
+                **candidates[index],
+                'under_provisioned_minutes': int(under[position]),
+                'peak_shortfall': int(shortfall[position]),
+                'instance_hours': round(float(instance_hours[position]), 1),
+            }
+    return results
+
+
+def _period_stats(required):
+    """Cumulative histogram of required instances, for O(1) scoring per capacity."""
+    if required.size == 0:
+        return {'above': np.zeros(1, dtype=np.int64), 'peak': 0}
+    counts = np.bincount(required)
+    # above[c] = number of minutes needing more than c instances
+    above = required.size - np.cumsum(counts)
+    return {'above': above, 'peak': int(required.max())}
+
+
+def _minutes_above(stats, capacity):
+    above = stats['above']
+    return np.where(capacity < above.size, above[np.minimum(capacity, above.size - 1)], 0)
+
+
+def load_series(path, timestamp_column='timestamp', load_column='load'):
+    """Read per-minute load from CSV or Parquet into (epoch minutes, load)."""
+    if path.endswith('.parquet'):
+        try:
+            import pandas as pd
+        except ImportError:
+            sys.exit("Reading Parquet needs pandas and pyarrow: pip install pandas pyarrow")
+        frame = pd.read_parquet(path, columns=[timestamp_column, load_column])
+        stamps = pd.to_datetime(frame[timestamp_column], utc=True)
+        minutes = (stamps.astype('int64') // 60_000_000_000).to_numpy()
+        load = frame[load_column].to_numpy(dtype=float)
+    else:
+        minutes, load = [], []
+        with open(path, newline='') as handle:
+            for row in csv.DictReader(handle):
+                stamp = datetime.fromisoformat(row[timestamp_column].replace('Z', '+00:00'))
+                if stamp.tzinfo is None:
+                    stamp = stamp.replace(tzinfo=timezone.utc)
+                minutes.append(int(stamp.timestamp() // 60))
+                load.append(float(row[load_column] or 0))
+        minutes, load = np.asarray(minutes, dtype=np.int64), np.asarray(load)
+
+    # Keep the last sample for any duplicated minute
+    order = np.argsort(minutes, kind='stable')
+    minutes, load = minutes[order], load[order]
+    keep = np.append(minutes[1:] != minutes[:-1], True)
+    return minutes[keep], load[keep]
+
+
+def candidates_from_template(path, max_size):
+    """The schedule currently deployed by template.yaml, as a candidate."""
+    with open(path) as handle:
+        template = handle.read()
+    expressions = {}
+    for rule in ('IncreaseASGRule', 'DecreaseASGRule'):
+        match = re.search(rf'^  {rule}:\n(?:    .*\n|\s*\n)*?\s+ScheduleExpression: (cron\([^)]*\))',
+                          template, re.MULTILINE)
+        if not match:
+            raise ValueError(f"{rule} ScheduleExpression not found in {path}")
+        expressions[rule] = match.group(1)
+    return [{
+        'name': 'template.yaml (current)',
+        'scale_up': expressions['IncreaseASGRule'],
+        'scale_down': expressions['DecreaseASGRule'],
+        'day_capacity': max_size,
+        'night_capacity': 1,
+    }]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay historical load against candidate ASG schedules')
+    parser.add_argument('--load', required=True, help='CSV or Parquet with timestamp and load columns')
+    parser.add_argument('--timestamp-column', default='timestamp')
+    parser.add_argument('--load-column', default='load')
+    parser.add_argument('--per-instance', type=float, required=True, help='load one instance can serve per minute')
+    parser.add_argument('--candidates', help='JSON file with a list of candidate schedules')
+    parser.add_argument('--template', help='also score the schedule in this template.yaml')
+    parser.add_argument('--max-size', type=int, help='day capacity for the --template schedule (the ASG MaxSize)')
+    parser.add_argument('--top', type=int, default=20, help='number of candidates to print')
+    parser.add_argument('--max-under-minutes', type=int, default=0,
+                        help='rank candidates within this budget by instance-hours')
+    parser.add_argument('--output', help='write all results to this CSV')
+    args = parser.parse_args(argv)
+
+    entries = []
+    if args.candidates:
+        with open(args.candidates) as handle:
+            entries.extend(json.load(handle))
+    if args.template:
+        if args.max_size is None:
+            parser.error('--template needs --max-size')
+        entries.extend(candidates_from_template(args.template, args.max_size))
+    if not entries:
+        parser.error('give --candidates and/or --template')
+
+    started = time.perf_counter()
+    minutes, load = load_series(args.load, args.timestamp_column, args.load_column)
+    candidates = expand_candidates(entries)
+    results = simulate(minutes, load, args.per_instance, candidates)
+    elapsed = time.perf_counter() - started
+
+    ranked = sorted(results, key=lambda r: (r['under_provisioned_minutes'] > args.max_under_minutes,
+                                            r['instance_hours'], r['under_provisioned_minutes']))
+    print(f"Scored {len(results)} candidate(s) over {minutes.size} minutes in {elapsed:.2f}s\n")
+    print(f"{'Candidate':<44}{'Under-prov min':>15}{'Peak short':>11}{'Inst-hrs':>10}")
+    for row in ranked[:args.top]:
+        print(f"{row['name'][:43]:<44}{row['under_provisioned_minutes']:>15}"
+              f"{row['peak_shortfall']:>11}{row['instance_hours']:>10.1f}")
+
+    if args.output:
+        columns = ['name', 'scale_up', 'scale_down', 'day_capacity', 'night_capacity',
+                   'under_provisioned_minutes', 'peak_shortfall', 'instance_hours']
+        with open(args.output, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(ranked)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The functions' modules are imported as the Lambda runtime does, from their
+# code directories and the shared runtime layer
+sys.path.insert(0, os.path.join(ROOT, 'increase_asg_capacity'))
+sys.path.insert(0, os.path.join(ROOT, 'simulator'))
+sys.path.insert(0, os.path.join(ROOT, '..', 'Shared_Runtime'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+import forecast
+import lambda_function
+from forecast import HOURS_PER_WEEK, fit_seasonal_baseline, forecast_capacity
+
+# Epoch hour of a Monday 00:00 UTC (slot 0 of the week)
+MONDAY = 96 + 2900 * HOURS_PER_WEEK
+PEAK_SLOT = 8
+
+
+def synthetic_history(weeks, base=2.0, peak=8.0, growth=0.0):
+    """Hourly required instances: flat at base, peak at Monday 08:00, scaled by week."""
+    hours = np.arange(MONDAY, MONDAY + weeks * HOURS_PER_WEEK)
+    required = np.full(hours.shape, base)
+    required[(hours - MONDAY) % HOURS_PER_WEEK == PEAK_SLOT] = peak
+    required *= 1.0 + growth * ((hours - MONDAY) // HOURS_PER_WEEK)
+    return hours, required
+
+
+def test_fit_seasonal_baseline_folds_weeks():
+    hours, required = synthetic_history(4)
+
+    ratios, next_level = fit_seasonal_baseline(hours, required)
+
+    level = (167 * 2.0 + 8.0) / HOURS_PER_WEEK
+    assert ratios.shape == (4, HOURS_PER_WEEK)
+    assert next_level == pytest.approx(level)
+    assert ratios[:, PEAK_SLOT] == pytest.approx([8.0 / level] * 4)
+    assert ratios[:, 0] == pytest.approx([2.0 / level] * 4)
+
+
+def test_fit_seasonal_baseline_extrapolates_trend():
+    hours, required = synthetic_history(4, growth=0.1)
+
+    _, next_level = fit_seasonal_baseline(hours, required)
+
+    assert next_level == pytest.approx((167 * 2.0 + 8.0) / HOURS_PER_WEEK * 1.4)
+
+
+def test_fit_seasonal_baseline_keeps_missing_hours():
+    hours, required = synthetic_history(2)
+    required[:24] = np.nan
+
+    ratios, next_level = fit_seasonal_baseline(hours, required)
+
+    assert np.isnan(ratios[0, :24]).all()
+    assert np.isfinite(ratios[1]).all()
+    assert np.isfinite(next_level)
+
+
+def test_forecast_capacity_sizes_the_peak_with_headroom():
+    hours, required = synthetic_history(4)
+    start = MONDAY + 4 * HOURS_PER_WEEK + PEAK_SLOT
+
+    assert forecast_capacity(hours, required, start, headroom=0.0) == 8
+    assert forecast_capacity(hours, required, start, headroom=0.15) == 10
+    # Outside the peak only the base load is left
+    assert forecast_capacity(hours, required, start + 4, headroom=0.0) == 2
+
+
+def test_forecast_capacity_clamps_to_group_bounds():
+    hours, required = synthetic_history(4)
+    start = MONDAY + 4 * HOURS_PER_WEEK + PEAK_SLOT
+
+    assert forecast_capacity(hours, required, start, max_size=6) == 6
+    assert forecast_capacity(hours, required, start + 4, headroom=0.0, min_size=3) == 3
+
+
+def test_forecast_capacity_needs_history():
+    hours, required = synthetic_history(1)
+
+    assert forecast_capacity(hours, np.full(hours.shape, np.nan), MONDAY + HOURS_PER_WEEK) is None
+    required[:PEAK_SLOT + 2] = np.nan
+    assert forecast_capacity(hours, required, MONDAY + HOURS_PER_WEEK, window_hours=2) is None
+
+
+def test_target_capacity_is_max_size_when_forecast_disabled(monkeypatch):
+    monkeypatch.delenv('FORECAST_ENABLED', raising=False)
+
+    capacity, note = lambda_function.get_target_capacity('web', 10)
+
+    assert capacity == 10
+    assert 'forecast disabled' in note
+
+
+@pytest.mark.parametrize('outcome, reason', [
+    (None, 'not enough history'),
+    (RuntimeError('throttled'), 'forecast failed: throttled'),
+])
+def test_target_capacity_falls_back_to_max_size(monkeypatch, outcome, reason):
+    def fake_forecast(asg_name, min_size, max_size):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setenv('FORECAST_ENABLED', 'true')
+    monkeypatch.setattr(forecast, 'forecast_from_environment', fake_forecast)
+
+    capacity, note = lambda_function.get_target_capacity('web', 10)
+
+    assert capacity == 10
+    assert reason in note
+
+
+def test_target_capacity_uses_forecast(monkeypatch):
+    monkeypatch.setenv('FORECAST_ENABLED', 'true')
+    monkeypatch.setenv('FORECAST_MIN_CAPACITY', '2')
+    monkeypatch.setattr(forecast, 'forecast_from_environment',
+                        lambda asg_name, min_size, max_size: min_size + 2)
+
+    capacity, note = lambda_function.get_target_capacity('web', 10)
+
+    assert capacity == 4
+    assert note.startswith('Capacity source: forecast')
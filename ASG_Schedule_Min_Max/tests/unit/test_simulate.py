@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from simulate import calendar_fields, cron_fires, day_mask, parse_cron, parse_cron_field
+
+# Monday 2026-10-19 00:00 UTC, in epoch minutes
+MONDAY = int(datetime(2026, 10, 19, tzinfo=timezone.utc).timestamp() // 60)
+
+
+def week_fields(days=7):
+    return calendar_fields(np.arange(MONDAY, MONDAY + days * 1440, dtype=np.int64))
+
+
+def at(day, hour, minute=0):
+    """Index of a minute in week_fields(), day 0 being Monday."""
+    return day * 1440 + hour * 60 + minute
+
+
+@pytest.mark.parametrize('field, low, high, expected', [
+    ('*', 0, 23, set(range(24))),
+    ('?', 1, 31, set(range(1, 32))),
+    ('5,10,15', 0, 59, {5, 10, 15}),
+    ('8-11', 0, 23, {8, 9, 10, 11}),
+    ('0/15', 0, 59, {0, 15, 30, 45}),
+    ('*/6', 0, 23, {0, 6, 12, 18}),
+    ('1-10/3', 1, 31, {1, 4, 7, 10}),
+    ('20/2', 0, 23, {20, 22}),
+])
+def test_parse_cron_field_ranges_and_steps(field, low, high, expected):
+    assert parse_cron_field(field, low, high) == expected
+
+
+def test_parse_cron_reads_month_and_day_names():
+    cron = parse_cron('cron(30 21 ? JUL,APR MON-FRI *)')
+
+    assert cron['minute'] == {30}
+    assert cron['hour'] == {21}
+    assert cron['month'] == {4, 7}
+    assert cron['weekday'] == {2, 3, 4, 5, 6}
+
+
+@pytest.mark.parametrize('expression', [
+    # Names containing L or W are not modifiers
+    'cron(0 9 ? JUL WED *)',
+    'cron(0 9 ? APR-JUL TUE,WED,THU *)',
+    'cron(0 9 ? * SAT-SUN *)',
+])
+def test_parse_cron_accepts_names_with_modifier_letters(expression):
+    parse_cron(expression)
+
+
+@pytest.mark.parametrize('expression', [
+    'cron(0 9 L * ? *)',
+    'cron(0 9 15W * ? *)',
+    'cron(0 9 LW * ? *)',
+    'cron(0 9 ? * 6L *)',
+    'cron(0 9 ? * MON#2 *)',
+])
+def test_parse_cron_rejects_modifiers(expression):
+    with pytest.raises(ValueError, match='not supported'):
+        parse_cron(expression)
+
+
+@pytest.mark.parametrize('expression', ['0 9 * * ? *', 'cron(0 9 * * ?)', 'rate(1 hour)'])
+def test_parse_cron_rejects_malformed_expressions(expression):
+    with pytest.raises(ValueError):
+        parse_cron(expression)
+
+
+def test_cron_fires_on_the_named_weekdays():
+    fires = cron_fires('cron(0 8 ? * MON-FRI *)', week_fields())
+
+    assert list(np.flatnonzero(fires)) == [at(day, 8) for day in range(5)]
+
+
+def test_day_mask_covers_scale_up_to_scale_down():
+    mask = day_mask('cron(0 8 ? * MON-FRI *)', 'cron(0 18 ? * MON-FRI *)', week_fields())
+
+    assert not mask[at(0, 7, 59)]
+    assert mask[at(0, 8)]
+    assert mask[at(4, 17, 59)]
+    assert not mask[at(4, 18)]
+    # Nothing fires at the weekend, so Friday's scale-down holds
+    assert not mask[at(5, 12)]
+    assert not mask[at(6, 12)]
+    assert mask.sum() == 5 * 10 * 60
+
+
+def test_day_mask_wraps_overnight_schedules():
+    # Scale up at 21:00 and down at 09:00: the minutes before the first event
+    # take the state of the last one in the data (Sunday 21:00)
+    mask = day_mask('cron(0 21 ? * * *)', 'cron(0 9 ? * * *)', week_fields())
+
+    assert mask[at(0, 0)]
+    assert not mask[at(0, 9)]
+    assert mask[at(0, 21)]
+    assert mask[at(1, 8, 59)]
+    assert mask.sum() == 7 * 12 * 60
+
+
+def test_day_mask_scale_down_wins_in_the_same_minute():
+    mask = day_mask('cron(0 8 ? * * *)', 'cron(0 8 ? * * *)', week_fields(2))
+
+    assert not mask.any()
+
+
+def test_day_mask_without_events_is_night():
+    mask = day_mask('cron(0 8 ? DEC * *)', 'cron(0 18 ? DEC * *)', week_fields())
+
+    assert not mask.any()
@@ -0,0 +1,84 @@
+import os
+import json
+from datetime import datetime
+
+import aws_clients
+import tiers
+
+# Time kept back from the Lambda timeout to send the notification
+NOTIFY_MARGIN_SECONDS = 30
+
+ACTION_LABELS = {
+    'scale_up': 'Increased',
+    'scale_down': 'Decreased',
+}
+
+def lambda_handler(event, context):
+    action = event.get('action', 'scale_up')
+    sns_topic_arn = os.environ['SNS_TOPIC_ARN']
+
+    autoscaling = aws_clients.client('autoscaling')
+    sns = aws_clients.client('sns')
+
+    try:
+        if action not in ACTION_LABELS:
+            raise ValueError(f"Unsupported action '{action}', expected scale_up or scale_down")
+
+        schedule = tiers.load_schedule(os.environ['ASG_TIERS'])
+        completed = tiers.run_schedule(
+            autoscaling, schedule, action,
+            time_remaining=lambda: context.get_remaining_time_in_millis() / 1000 - NOTIFY_MARGIN_SECONDS
+        )
+
+        message = f"""
+        Tiered Auto Scaling Group Capacity {ACTION_LABELS[action]} Successfully!
+
+        Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        Order: {describe_order(completed)}
+
+{format_tiers(completed)}
+        This change was made as part of the daily schedule, one dependency tier at a time.
+        """
+
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Subject=f"Tiered ASG Capacity {ACTION_LABELS[action]}",
+            Message=message
+        )
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': f"Tiered ASG capacity {ACTION_LABELS[action].lower()} successfully",
+                'tiers': completed
+            })
+        }
+
+    except Exception as e:
+        error_message = f"Error running tiered {action}: {str(e)}"
+        completed = getattr(e, 'completed', [])
+        progress = f"\n\nTiers already updated:\n{format_tiers(completed)}" if completed else ""
+
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Subject=f"ERROR: Tiered ASG {action} Failed",
+            Message=f"Error occurred while running the tiered schedule:\n\n{error_message}{progress}\n\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+
+        raise e
+
+
+def describe_order(completed):
+    return ' -> '.join('[' + ', '.join(result['group'] for result in tier) + ']' for tier in completed)
+
+
+def format_tiers(completed):
+    lines = []
+    for number, tier in enumerate(completed, start=1):
+        lines.append(f"        Tier {number}:")
+        for result in tier:
+            lines.append(
+                f"        - {result['group']}: min {result['previous_min']} -> {result['new_min']}, "
+                f"desired {result['previous_desired']} -> {result['new_desired']} (max {result['max_size']})"
+            )
+    return '\n'.join(lines) + '\n'
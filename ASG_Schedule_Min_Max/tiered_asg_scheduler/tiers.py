@@ -0,0 +1,207 @@
+"""
+Dependency-ordered scaling of related Auto Scaling Groups.
+
+The schedule is a JSON document (the ASG_TIERS environment variable):
+
+    {
+      "groups": {
+        "app-asg":    {"depends_on": []},
+        "worker-asg": {"depends_on": ["app-asg"]},
+        "web-asg":    {"depends_on": ["app-asg", "worker-asg"],
+                       "day_capacity": 4, "night_capacity": 1}
+      },
+      "readiness_timeout_seconds": 600,
+      "poll_interval_seconds": 15
+    }
+
+day_capacity defaults to the group's MaxSize and night_capacity to 1, which
+matches the increase/decrease functions for a single group. Both must lie
+between 0 and the group's MaxSize, with night_capacity at most day_capacity;
+the whole schedule is checked before any group is changed.
+
+Each wait is also cut short by the time left in the invocation, so a run
+that cannot finish reports the tiers still pending instead of being killed
+by the Lambda timeout.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_NIGHT_CAPACITY = 1
+DEFAULT_READINESS_TIMEOUT = 600
+DEFAULT_POLL_INTERVAL = 15
+
+
+class TierNotReadyError(Exception):
+    """Raised when a tier does not become ready (or drained) in time."""
+
+    def __init__(self, message, completed=None):
+        super().__init__(message)
+        self.completed = completed or []
+
+
+def load_schedule(raw):
+    """Parse and validate the ASG_TIERS document."""
+    schedule = json.loads(raw) if isinstance(raw, str) else raw
+    groups = schedule.get('groups')
+    if not groups:
+        raise ValueError("ASG_TIERS must define at least one group under 'groups'")
+    for name, config in groups.items():
+        for dependency in config.get('depends_on', []):
+            if dependency not in groups:
+                raise ValueError(f"Group {name} depends on unknown group {dependency}")
+    return schedule
+
+
+def topological_tiers(groups):
+    """
+    Group names into tiers so every group comes after all of its dependencies.
+
+    Groups within a tier do not depend on each other and can be scaled
+    concurrently. Raises ValueError on a dependency cycle.
+    """
+    remaining = {name: set(config.get('depends_on', [])) for name, config in groups.items()}
+    tiers = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"Dependency cycle between groups: {', '.join(sorted(remaining))}")
+        tiers.append(ready)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return tiers
+
+
+def describe_groups(autoscaling, names):
+    """Describe several groups in as few calls as possible, keyed by name."""
+    found = {}
+    paginator = autoscaling.get_paginator('describe_auto_scaling_groups')
+    for page in paginator.paginate(AutoScalingGroupNames=list(names)):
+        for asg in page['AutoScalingGroups']:
+            found[asg['AutoScalingGroupName']] = asg
+    missing = set(names) - set(found)
+    if missing:
+        raise Exception(f"Auto Scaling Group(s) not found: {', '.join(sorted(missing))}")
+    return found
+
+
+def healthy_in_service(asg):
+    return sum(1 for instance in asg.get('Instances', [])
+               if instance['LifecycleState'] == 'InService' and instance['HealthStatus'] == 'Healthy')
+
+
+def check_capacities(autoscaling, groups):
+    """Raise ValueError if a configured capacity does not fit its group's size limits."""
+    current = describe_groups(autoscaling, groups)
+    problems = []
+    for name, config in sorted(groups.items()):
+        max_size = current[name]['MaxSize']
+        day = config.get('day_capacity', max_size)
+        night = config.get('night_capacity', DEFAULT_NIGHT_CAPACITY)
+        for key, value in (('day_capacity', day), ('night_capacity', night)):
+            if not isinstance(value, int) or not 0 <= value <= max_size:
+                problems.append(f"{name}: {key} {value} is outside 0..{max_size} (MaxSize)")
+        if isinstance(day, int) and isinstance(night, int) and night > day:
+            problems.append(f"{name}: night_capacity {night} is above day_capacity {day}")
+    if problems:
+        raise ValueError(f"Invalid capacities in ASG_TIERS: {'; '.join(problems)}")
+
+
+def target_capacity(asg, config, action):
+    if action == 'scale_up':
+        return min(config.get('day_capacity', asg['MaxSize']), asg['MaxSize'])
+    return max(config.get('night_capacity', DEFAULT_NIGHT_CAPACITY), 0)
+
+
+def scale_tier(autoscaling, tier, groups, action):
+    """
+    Update every group in the tier concurrently and return one result per group
+    with its previous and new min/desired sizes.
+    """
+    current = describe_groups(autoscaling, tier)
+
+    def update(name):
+        asg = current[name]
+        capacity = target_capacity(asg, groups[name], action)
+        autoscaling.update_auto_scaling_group(
+            AutoScalingGroupName=name,
+            MinSize=capacity,
+            DesiredCapacity=capacity
+        )
+        return {
+            'group': name,
+            'previous_min': asg['MinSize'],
+            'previous_desired': asg['DesiredCapacity'],
+            'new_min': capacity,
+            'new_desired': capacity,
+            'max_size': asg['MaxSize'],
+        }
+
+    with ThreadPoolExecutor(max_workers=len(tier)) as executor:
+        return list(executor.map(update, tier))
+
+
+def wait_for_tier(autoscaling, results, action, timeout, poll_interval, sleep=time.sleep):
+    """
+    Block until the tier has settled: on scale-up every group has at least its
+    desired number of healthy InService instances, on scale-down no group has
+    more instances than desired. Raises TierNotReadyError on timeout.
+    """
+    wanted = {result['group']: result['new_desired'] for result in results}
+    deadline = time.monotonic() + timeout
+    while True:
+        current = describe_groups(autoscaling, wanted)
+        if action == 'scale_up':
+            pending = {name: f"{healthy_in_service(current[name])}/{desired} healthy"
+                       for name, desired in wanted.items()
+                       if healthy_in_service(current[name]) < desired}
+        else:
+            pending = {name: f"{len(current[name].get('Instances', []))}/{desired} instances"
+                       for name, desired in wanted.items()
+                       if len(current[name].get('Instances', [])) > desired}
+        if not pending:
+            return
+        left = deadline - time.monotonic()
+        if left <= 0:
+            state = ', '.join(f"{name} ({progress})" for name, progress in sorted(pending.items()))
+            raise TierNotReadyError(f"Timed out after {timeout:.0f}s waiting for {state}")
+        sleep(min(poll_interval, left))
+
+
+def run_schedule(autoscaling, schedule, action, sleep=time.sleep, time_remaining=None):
+    """
+    Scale all groups tier by tier: dependencies first on scale-up, dependents
+    first on scale-down. Returns the per-tier results; a tier that does not
+    settle in time stops the run before the next tier is touched.
+
+    time_remaining, if given, returns the seconds the run may still wait;
+    no wait is longer than that.
+    """
+    if action not in ('scale_up', 'scale_down'):
+        raise ValueError(f"Unsupported action: {action}")
+
+    groups = schedule['groups']
+    tiers = topological_tiers(groups)
+    if action == 'scale_down':
+        tiers.reverse()
+
+    timeout = schedule.get('readiness_timeout_seconds', DEFAULT_READINESS_TIMEOUT)
+    poll_interval = schedule.get('poll_interval_seconds', DEFAULT_POLL_INTERVAL)
+    check_capacities(autoscaling, groups)
+
+    completed = []
+    for index, tier in enumerate(tiers):
+        results = scale_tier(autoscaling, tier, groups, action)
+        completed.append(results)
+        # The last tier has nobody waiting on it
+        if index < len(tiers) - 1:
+            budget = max(time_remaining(), 0) if time_remaining else timeout
+            try:
+                wait_for_tier(autoscaling, results, action, min(timeout, budget), poll_interval, sleep=sleep)
+            except TierNotReadyError as e:
+                not_started = ' -> '.join('[' + ', '.join(rest) + ']' for rest in tiers[index + 1:])
+                reason = " (stopped early to finish within the Lambda timeout)" if budget < timeout else ""
+                raise TierNotReadyError(f"{e}{reason}. Tiers not started: {not_started}", completed) from e
+    return completed
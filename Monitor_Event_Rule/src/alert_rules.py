@@ -0,0 +1,114 @@
+import json
+import os
+import re
+
+# The Claude variant's action_descriptions, with the default severity of each action
+ACTION_DESCRIPTIONS = {
+    'DeleteRule': ('DELETED', 'high'),
+    'PutRule': ('CREATED/MODIFIED', 'normal'),
+    'DisableRule': ('DISABLED', 'high'),
+    'EnableRule': ('ENABLED', 'normal'),
+    'PutTargets': ('TARGETS ADDED/MODIFIED', 'normal'),
+    'RemoveTargets': ('TARGETS REMOVED', 'high'),
+}
+
+ACTIONS = ('suppress', 'downgrade', 'notify', 'escalate')
+ACTION_SEVERITY = {'downgrade': 'low', 'escalate': 'critical'}
+
+# Separates the event's fields in the string the combined regex runs against
+SEPARATOR = '\x1f'
+
+
+class AlertClassifier:
+    """
+    Decides whether a rule change is suppressed, downgraded, notified as
+    usual or escalated.
+
+    ALERT_RULES is a JSON list checked in order; the first rule whose
+    conditions all match wins, and events matching no rule are notified:
+
+        [
+          {"name": "ci-deploys", "principal": ["arn:aws:sts::*:assumed-role/ci-deploy-*/*"],
+           "event_name": ["PutRule", "PutTargets"], "action": "suppress"},
+          {"name": "prod-deletes", "rule_prefix": ["prod-"], "event_name": ["DeleteRule"],
+           "action": "escalate"}
+        ]
+
+    Conditions are optional: principal (ARN globs, '*' matches anything),
+    event_name and event_bus (exact) and rule_prefix. The exact fields key a
+    hash table of per-(event, bus) combined regexes, each one alternation of
+    the candidate rules in priority order, so classifying an event is one
+    dict lookup and one regex match.
+    """
+
+    def __init__(self, rules):
+        self.rules = [self._validate(number, rule) for number, rule in enumerate(rules)]
+        self.tables = {}
+        # Compile the buckets for the known actions up front
+        buses = {bus for rule in self.rules for bus in rule.get('event_bus', [])} | {'default'}
+        for event_name in ACTION_DESCRIPTIONS:
+            for bus in buses:
+                self._table(event_name, bus)
+
+    def classify(self, fields):
+        """Returns {'action', 'severity', 'description', 'matched_rule'} for extract_event_fields output."""
+        description, severity = ACTION_DESCRIPTIONS.get(fields['event_name'], (fields['event_name'], 'normal'))
+        action, matched = 'notify', None
+        regex = self._table(fields['event_name'], fields['event_bus'])
+        if regex is not None:
+            match = regex.match(f"{fields['rule_name']}{SEPARATOR}{fields['principal']}")
+            if match:
+                rule = self.rules[int(match.lastgroup[1:])]
+                action, matched = rule['action'], rule['name']
+        return {
+            'action': action,
+            'severity': ACTION_SEVERITY.get(action, severity),
+            'description': description,
+            'matched_rule': matched,
+        }
+
+    def _table(self, event_name, event_bus):
+        key = (event_name, event_bus)
+        if key not in self.tables:
+            alternatives = [
+                f"(?P<r{number}>{self._expression(rule)})"
+                for number, rule in enumerate(self.rules)
+                if event_name in rule.get('event_name', [event_name])
+                and event_bus in rule.get('event_bus', [event_bus])
+            ]
+            self.tables[key] = re.compile('|'.join(alternatives), re.DOTALL) if alternatives else None
+        return self.tables[key]
+
+    @staticmethod
+    def _expression(rule):
+        prefixes = '|'.join(re.escape(prefix) for prefix in rule.get('rule_prefix', ['']))
+        principals = '|'.join(
+            '[^\x1f]*'.join(re.escape(part) for part in pattern.split('*'))
+            for pattern in rule.get('principal', ['*'])
+        )
+        return f"(?:{prefixes})[^\x1f]*{SEPARATOR}(?:{principals})\\Z"
+
+    @staticmethod
+    def _validate(number, rule):
+        if rule.get('action') not in ACTIONS:
+            raise ValueError(f"Alert rule {number} needs an action of {', '.join(ACTIONS)}")
+        rule = dict(rule, name=rule.get('name') or f"rule-{number}")
+        for condition in ('principal', 'event_name', 'event_bus', 'rule_prefix'):
+            if isinstance(rule.get(condition), str):
+                rule[condition] = [rule[condition]]
+        return rule
+
+
+def classifier_from_environment():
+    return AlertClassifier(json.loads(os.environ.get('ALERT_RULES') or '[]'))
+
+
+_classifier = None
+
+
+def get_classifier():
+    """Compiled once per container, at the first event."""
+    global _classifier
+    if _classifier is None:
+        _classifier = classifier_from_environment()
+    return _classifier
@@ -0,0 +1,108 @@
+import os
+import time
+
+from state_store import get_store
+
+ANOMALY_EVENTS = [name for name in os.environ.get(
+    'ANOMALY_EVENTS', 'DeleteRule,DisableRule,RemoveTargets').split(',') if name]
+ANOMALY_THRESHOLD = int(os.environ.get('ANOMALY_THRESHOLD', '20'))
+ANOMALY_WINDOW_SECONDS = int(os.environ.get('ANOMALY_WINDOW_SECONDS', '300'))
+ANOMALY_BUCKETS = 10
+MAX_CACHED_KEYS = 1000
+
+
+class SlidingWindowDetector:
+    """
+    Counts destructive calls per principal and event type over a sliding
+    window and reports when the count first reaches the threshold.
+
+    The window is split into a fixed number of buckets, each an atomic
+    counter in the store under rate#<principal>#<event>#<bucket start> that
+    expires shortly after leaving the window, so memory per key is constant.
+    Buckets are assigned by processing time: once a bucket has closed nobody
+    writes to it again, so its count is cached in-process and steady state
+    is one increment per event, plus one batched read per key when a bucket
+    closes.
+    """
+
+    def __init__(self, store, events=None, threshold=ANOMALY_THRESHOLD,
+                 window_seconds=ANOMALY_WINDOW_SECONDS, buckets=ANOMALY_BUCKETS):
+        self.store = store
+        self.events = set(ANOMALY_EVENTS if events is None else events)
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.bucket_seconds = max(1, window_seconds // buckets)
+        self.buckets = buckets
+        self.closed = {}
+
+    def record(self, fields, now=None):
+        """
+        Count one event. Returns {'principal', 'event_name', 'count',
+        'window_seconds'} the first time the window reaches the threshold,
+        otherwise None.
+        """
+        if fields['event_name'] not in self.events:
+            return None
+        now = time.time() if now is None else now
+        prefix = f"rate#{fields['principal']}#{fields['event_name']}"
+        current = int(now // self.bucket_seconds) * self.bucket_seconds
+        ttl = self.window_seconds + self.bucket_seconds
+
+        count = self.store.increment(f"{prefix}#{current}", ttl_seconds=ttl)
+        count += sum(self._closed_counts(prefix, current))
+        if count < self.threshold:
+            return None
+
+        # Several containers may cross the threshold together; one alert per window
+        if not self.store.put_if_absent(f"anomaly#{prefix}", {'count': count}, ttl_seconds=self.window_seconds):
+            return None
+        return {
+            'principal': fields['principal'],
+            'event_name': fields['event_name'],
+            'count': count,
+            'window_seconds': self.window_seconds,
+        }
+
+    def _closed_counts(self, prefix, current):
+        starts = [current - self.bucket_seconds * offset for offset in range(1, self.buckets)]
+        keys = [f"{prefix}#{start}" for start in starts]
+        if prefix not in self.closed and len(self.closed) >= MAX_CACHED_KEYS:
+            self.closed.clear()
+        cached = self.closed.setdefault(prefix, {})
+        missing = [key for key in keys if key not in cached]
+        if missing:
+            cached.update(self.store.get_counters(missing))
+        # Forget buckets that have left the window
+        for key in set(cached) - set(keys):
+            del cached[key]
+        return [cached[key] for key in keys]
+
+
+def format_anomaly(anomaly, fields):
+    subject = (f"[INCIDENT] {anomaly['count']} {anomaly['event_name']} calls by "
+               f"{anomaly['principal'].rsplit('/', 1)[-1]}")
+    message = f"""
+    Possible mass change to EventBridge rules!
+
+    Principal: {anomaly['principal']}
+    Event: {anomaly['event_name']}
+    Calls: {anomaly['count']} in the last {anomaly['window_seconds']} seconds
+    Latest Rule: {fields['rule_name']} (bus: {fields['event_bus']})
+    Source IP: {fields['source_ip']}
+    User Agent: {fields['user_agent']}
+
+    Further calls in this window will not raise another incident alert.
+    """
+    # SNS subjects are limited to 100 characters
+    return subject[:100], message
+
+
+_detector = None
+
+
+def get_detector():
+    """One detector per container, so closed bucket counts stay cached."""
+    global _detector
+    if _detector is None:
+        _detector = SlidingWindowDetector(get_store())
+    return _detector
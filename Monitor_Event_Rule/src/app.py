@@ -1,47 +1,247 @@
 import json
-import boto3
-import os
 
-sns = boto3.client('sns')
+from alert_rules import get_classifier
+from anomaly import format_anomaly, get_detector
+from audit_archive import get_archive
+from dedupe import get_deduplicator
+from event_patterns import format_validation, load_golden_events, validate_pattern
+from hub import events_client_for, origin_scope
+from notifiers import get_notifier
+from rule_snapshots import format_diff, get_snapshot_store
+from state_store import get_store
+from target_index import format_impact, get_target_index, known_scopes
+
+classifier = get_classifier()
 
 def lambda_handler(event, context):
+    # Scheduled full rebuild of the target indexes
+    if event.get('action') == 'rebuild-target-index':
+        counts = rebuild_target_indexes()
+        return {
+            'statusCode': 200,
+            'body': json.dumps(counts)
+        }
+    
     # Extract relevant information from the CloudTrail event
     print(json.dumps(event))
-    detail = event.get('detail', {})
-    event_name = detail.get('eventName', '')
-    rule_name = detail.get('requestParameters', {}).get('name', 'UNKNOWN')
-    user_identity = detail.get('userIdentity', {}).get('arn', 'UNKNOWN')
-    event_time = detail.get('eventTime', 'UNKNOWN')
+    fields = extract_event_fields(event)
+    event_name = fields['event_name']
+    rule_name = fields['rule_name']
+    user_identity = fields['principal']
+    event_time = fields['event_time']
+    
+    # EventBridge delivers at least once; skip eventIDs already notified
+    deduplicator = get_deduplicator()
+    if fields['event_id'] != 'UNKNOWN' and deduplicator.is_duplicate(fields['event_id']):
+        print(f"Duplicate event {fields['event_id']} skipped")
+        return {
+            'statusCode': 200,
+            'body': json.dumps('Duplicate event skipped')
+        }
+    
+    # Every change is archived, including ones the alert rules suppress
+    archive_events([(fields, event)])
+    
+    # Bursts of destructive calls raise one incident alert, whatever the alert rules say
+    check_anomaly(fields)
+    
+    # Compare the rule with its last snapshot to show what changed
+    # (suppressed events too, so the next diff starts from the right state)
+    changes, impact = describe_rule_change(fields)
+    
+    alert = classifier.classify(fields)
+    if alert['action'] == 'suppress':
+        print(f"Event {fields['event_id']} suppressed by alert rule {alert['matched_rule']}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps('Notification suppressed')
+        }
     
     # Prepare the notification message
+    severity = alert['severity']
+    if alert['matched_rule']:
+        severity += f" (alert rule: {alert['matched_rule']})"
     subject = f"AWS EventBridge Rule {event_name} Alert"
+    if alert['action'] == 'escalate':
+        subject = f"[ESCALATED] {subject}"
     message = f"""
     EventBridge Rule Modification Detected!
     
     Event: {event_name}
+    Action: {alert['description']}
+    Severity: {severity}
     Rule Name: {rule_name}
+    Event Bus: {fields['event_bus']}
+    Account / Region: {fields['origin']}
     Performed By: {user_identity}
     Time: {event_time}
     
+    What Changed:
+{changes}
+    
+    Impact:
+{impact}
+    
     This is an automated notification for changes to EventBridge rules.
 
     Here is the complete CloudTrail event:
     {json.dumps(event)}
     """
     
-    # Publish to SNS
+    # Publish to SNS and any webhook channels at once
     try:
-        response = sns.publish(
-            TopicArn=os.environ['SNS_TOPIC_ARN'],
-            Message=message,
-            Subject=subject
-        )
-        print(f"Notification sent: {response}")
+        get_notifier().send({
+            'subject': subject,
+            'message': message,
+            'severity': alert['severity'],
+            'fields': fields
+        })
     except Exception as e:
         print(f"Error sending notification: {str(e)}")
+        if fields['event_id'] != 'UNKNOWN':
+            deduplicator.release(fields['event_id'])
         raise
     
     return {
         'statusCode': 200,
         'body': json.dumps('Notification processed successfully!')
-    }
\ No newline at end of file
+    }
+
+
+def rebuild_target_indexes():
+    """
+    Rebuild the local index and every hub origin's, so each one gets the
+    daily drift correction and its pointer never expires. Returns the counts
+    per scope ('' is local).
+    """
+    store = get_store()
+    counts = {'': get_target_index(store).rebuild()}
+    print(f"Target index rebuilt: {counts['']}")
+    for scope in known_scopes(store):
+        account_id, region = scope.strip('/').split('/')
+        try:
+            counts[scope] = get_target_index(store, scope, events_client_for(account_id, region)).rebuild()
+            print(f"Target index for {scope} rebuilt: {counts[scope]}")
+        except Exception as e:
+            # One unreachable spoke must not stop the others
+            print(f"Error rebuilding target index for {scope}: {str(e)}")
+            counts[scope] = {'error': str(e)}
+    return counts
+
+
+def archive_events(entries):
+    """Append (fields, event) pairs to the audit archive; failures are logged, not raised."""
+    if not entries:
+        return
+    try:
+        key = get_archive().append(entries)
+        print(f"Archived {len(entries)} event(s) to {key}")
+    except Exception as e:
+        print(f"Error archiving events: {str(e)}")
+
+
+def check_anomaly(fields):
+    """Count the event in its principal's sliding window and alert on a burst."""
+    try:
+        anomaly = get_detector().record(fields)
+        if anomaly:
+            subject, message = format_anomaly(anomaly, fields)
+            get_notifier().send({
+                'subject': subject,
+                'message': message,
+                'severity': 'critical',
+                'fields': fields
+            })
+            print(f"Incident alert sent: {anomaly}")
+    except Exception as e:
+        print(f"Error checking for anomalies: {str(e)}")
+
+
+def describe_rule_change(fields):
+    """
+    Snapshot the affected rule, update the target index from it and return
+    the formatted diff and impact sections.
+    """
+    if fields['rule_name'] == 'UNKNOWN':
+        return "    - Rule name not present in the event", "    - Unknown"
+    scope, events_client = origin_scope(fields)
+    try:
+        result = get_snapshot_store(get_store(), scope, events_client).record_change(
+            fields['rule_name'], fields['event_bus'], fields['event_time'])
+        validation = check_golden_events(fields, result)
+        lines = format_diff(result) + (format_validation(validation) if validation else [])
+        changes = '\n'.join(f"    - {line}" for line in lines)
+    except Exception as e:
+        print(f"Error snapshotting rule {fields['rule_name']}: {str(e)}")
+        return f"    - Could not read the rule's current state: {str(e)}", "    - Unknown"
+
+    try:
+        index = get_target_index(get_store(), scope, events_client)
+        current = result['current']
+        removed, added = index.apply_rule_change(
+            fields['event_bus'], fields['rule_name'],
+            current['Targets'] if current else None)
+        lines = format_impact(index.impact(fields['event_bus'], fields['rule_name'], removed))
+        lines += [f"Now also routes to {arn}" for arn in added]
+        impact = '\n'.join(f"    - {line}" for line in lines) or "    - No targets added or removed"
+    except Exception as e:
+        print(f"Error updating target index for {fields['rule_name']}: {str(e)}")
+        impact = f"    - Could not compute impact: {str(e)}"
+    return changes, impact
+
+
+def check_golden_events(fields, result):
+    """
+    Match a new or changed event pattern against the rule's golden sample
+    events locally. Returns the validate_pattern result, or None when the
+    pattern did not change or the rule has no samples.
+    """
+    current = result['current']
+    if not current or not current['EventPattern']:
+        return None
+    if result['diff'] is not None and not result['diff']['pattern']:
+        return None
+    samples = load_golden_events(fields['rule_name'])
+    if not samples:
+        return None
+    return validate_pattern(current['EventPattern'], samples)
+
+
+def extract_event_fields(event):
+    """
+    Pull the fields the notifications use out of a CloudTrail event, as the
+    Claude variant's handler does. PutTargets/RemoveTargets name the rule in
+    'rule' rather than 'name'.
+    """
+    detail = event.get('detail', {})
+    # Events forwarded to a hub bus keep their origin in the envelope too
+    account_id = detail.get('recipientAccountId') or event.get('account') or 'UNKNOWN'
+    aws_region = detail.get('awsRegion') or event.get('region') or 'UNKNOWN'
+    request_params = detail.get('requestParameters') or {}
+    user_identity = detail.get('userIdentity', {})
+    return {
+        'event_id': detail.get('eventID', 'UNKNOWN'),
+        'event_name': detail.get('eventName', ''),
+        'event_time': detail.get('eventTime', 'UNKNOWN'),
+        'rule_name': request_params.get('name') or request_params.get('rule') or 'UNKNOWN',
+        'rule_state': request_params.get('state', 'UNKNOWN'),
+        'event_bus': request_params.get('eventBusName') or 'default',
+        'principal': user_identity.get('arn', 'UNKNOWN'),
+        'user_type': user_identity.get('type', 'UNKNOWN'),
+        'user_name': user_identity.get('userName', user_identity.get('principalId', 'UNKNOWN')),
+        'invoked_by': user_identity.get('invokedBy') or detail.get('sourceIPAddress', 'UNKNOWN'),
+        'source_ip': detail.get('sourceIPAddress', 'UNKNOWN'),
+        'user_agent': detail.get('userAgent', 'UNKNOWN'),
+        'aws_region': aws_region,
+        'account_id': account_id,
+        'origin': f"{account_id}/{aws_region}",
+        'stack_name': stack_name_from_tags(request_params.get('tags') or []),
+    }
+
+
+def stack_name_from_tags(tags):
+    """CloudFormation tags the rules it creates with aws:cloudformation:stack-name."""
+    for tag in tags:
+        if tag.get('key', tag.get('Key')) == 'aws:cloudformation:stack-name':
+            return tag.get('value', tag.get('Value'))
+    return None
@@ -0,0 +1,224 @@
+"""
+Append-only archive of rule-change events with a rule/principal index.
+
+Each invocation writes one segment, events/dt=YYYY-MM-DD/<time>-<id>.ndjson.gz,
+in which every event is its own gzip member (a valid multi-member gzip
+file, readable with zcat). The state store indexes every event under
+audit#rule#<account>/<region>#<rule>#YYYY-MM-DD#<shard> and
+audit#principal#<account>/<region>#<arn>#YYYY-MM-DD#<shard> as
+"<segment>|<offset>|<length>|<event time>", so a history query reads the
+index sets of its days and then only the byte ranges of the matching events.
+Index sets are split per day and into INDEX_SHARDS shards, so even a busy
+deploy role stays far below DynamoDB's 400 KB item limit. They expire after
+ARCHIVE_RETENTION_DAYS, like the segments under the bucket's lifecycle rule.
+
+Usage (with ../../Shared_Runtime on PYTHONPATH; --account and --region
+default to the caller's):
+
+    python audit_archive.py --rule my-rule --days 90
+    python audit_archive.py --principal arn:aws:iam::123456789012:user/alice --days 30
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import aws_clients
+from state_store import get_store
+
+# Index sets per rule (or principal), origin and day
+INDEX_SHARDS = 4
+# Matches the archive bucket's lifecycle expiration
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '400'))
+
+
+class FileArchive:
+    """Segments under a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, key, data):
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(data)
+
+    def read_range(self, key, start, end):
+        """Bytes start..end (inclusive), or None if the segment is gone."""
+        path = os.path.join(self.directory, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as handle:
+            handle.seek(start)
+            return handle.read(end - start + 1)
+
+
+class S3Archive:
+    """Segments under s3://<bucket>/<prefix>."""
+
+    def __init__(self, s3, bucket, prefix='audit/'):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def write(self, key, data):
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}{key}", Body=data,
+                           ContentType='application/x-ndjson', ContentEncoding='gzip')
+
+    def read_range(self, key, start, end):
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}",
+                                          Range=f"bytes={start}-{end}")
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+
+class AuditArchive:
+    def __init__(self, backend, store, retention_days=ARCHIVE_RETENTION_DAYS):
+        self.backend = backend
+        self.store = store
+        self.retention_days = retention_days
+
+    def append(self, entries):
+        """
+        Archive a list of (fields, event) pairs as one segment and index them.
+        Returns the segment key, or None if there was nothing to write.
+        """
+        if not entries:
+            return None
+        now = datetime.now(timezone.utc)
+        key = f"events/dt={now:%Y-%m-%d}/{now:%H%M%S}-{uuid.uuid4().hex[:12]}.ndjson.gz"
+
+        members, pointers, offset = [], {}, 0
+        for fields, event in entries:
+            record = json.dumps({'fields': fields, 'event': event}, default=str) + '\n'
+            member = gzip.compress(record.encode('utf-8'))
+            members.append(member)
+            day = _day(fields['event_time'], now)
+            pointer = f"{key}|{offset}|{len(member)}|{fields['event_time']}"
+            shard = zlib.crc32(pointer.encode('utf-8')) % INDEX_SHARDS
+            for scope in (f"rule#{fields['origin']}#{fields['rule_name']}",
+                          f"principal#{fields['origin']}#{fields['principal']}"):
+                pointers.setdefault(f"audit#{scope}#{day}#{shard}", set()).add(pointer)
+            offset += len(member)
+
+        # Write the segment before the index, so no pointer leads nowhere
+        self.backend.write(key, b''.join(members))
+        # A day's sets expire from its first event, no later than its segments
+        for index_key, values in pointers.items():
+            self.store.add_members(index_key, values, ttl_seconds=self.retention_days * 86400)
+        return key
+
+    def history(self, origin, rule_name=None, principal=None, days=90, now=None):
+        """
+        Archived records for a rule or a principal in one origin
+        ('<account>/<region>') over the last days, oldest first.
+        """
+        if bool(rule_name) == bool(principal):
+            raise ValueError('Query by exactly one of rule_name or principal')
+        now = now or datetime.now(timezone.utc)
+        since = now - timedelta(days=days)
+        scope = f"rule#{origin}#{rule_name}" if rule_name else f"principal#{origin}#{principal}"
+
+        pointers = []
+        for day in _days_between(since, now):
+            for shard in range(INDEX_SHARDS):
+                for value in self.store.get_members(f"audit#{scope}#{day}#{shard}"):
+                    key, offset, length, event_time = value.split('|', 3)
+                    if _parse_time(event_time, now) >= since:
+                        pointers.append((key, int(offset), int(length), event_time))
+
+        # One ranged read per segment, covering just the matching events
+        by_segment = {}
+        for pointer in pointers:
+            by_segment.setdefault(pointer[0], []).append(pointer)
+        records, seen = [], set()
+        for key, entries in by_segment.items():
+            start = min(offset for _, offset, _, _ in entries)
+            end = max(offset + length for _, offset, length, _ in entries) - 1
+            data = self.backend.read_range(key, start, end)
+            if data is None:
+                print(f"Archive segment {key} is missing (expired?); skipping {len(entries)} event(s)")
+                continue
+            for _, offset, length, _ in entries:
+                record = json.loads(gzip.decompress(data[offset - start:offset - start + length]))
+                # A digest batch that is retried archives its events again
+                event_id = record['fields']['event_id']
+                if event_id != 'UNKNOWN' and event_id in seen:
+                    continue
+                seen.add(event_id)
+                records.append(record)
+        records.sort(key=lambda record: record['fields']['event_time'])
+        return records
+
+
+def _parse_time(value, default):
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return default
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _day(event_time, default):
+    return f"{_parse_time(event_time, default):%Y-%m-%d}"
+
+
+def _days_between(since, until):
+    return [f"{since.date() + timedelta(days=offset):%Y-%m-%d}"
+            for offset in range((until.date() - since.date()).days + 1)]
+
+
+def archive_from_environment():
+    bucket = os.environ.get('ARCHIVE_BUCKET')
+    if bucket:
+        backend = S3Archive(aws_clients.client('s3'), bucket)
+    else:
+        backend = FileArchive(os.environ.get('ARCHIVE_DIR', '/tmp/monitor-archive'))
+    return AuditArchive(backend, get_store())
+
+
+_archive = None
+
+
+def get_archive():
+    global _archive
+    if _archive is None:
+        _archive = archive_from_environment()
+    return _archive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the rule-change audit archive')
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument('--rule', help='rule name')
+    scope.add_argument('--principal', help='principal ARN')
+    parser.add_argument('--account', help="the rule's account (default: the caller's)")
+    parser.add_argument('--region', help="the rule's region (default: the caller's)")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--json', action='store_true', help='print full records as NDJSON')
+    args = parser.parse_args(argv)
+
+    sts = aws_clients.client('sts')
+    account = args.account or sts.get_caller_identity()['Account']
+    region = args.region or sts.meta.region_name
+    records = archive_from_environment().history(f"{account}/{region}", rule_name=args.rule,
+                                                 principal=args.principal, days=args.days)
+    for record in records:
+        if args.json:
+            print(json.dumps(record))
+        else:
+            fields = record['fields']
+            print(f"{fields['event_time']}  {fields['event_name']:<14} {fields['rule_name']} "
+                  f"(bus: {fields['event_bus']})  by {fields['principal']}")
+    print(f"{len(records)} event(s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
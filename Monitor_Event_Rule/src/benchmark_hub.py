@@ -0,0 +1,133 @@
+"""
+Throughput benchmark for hub mode: replays synthetic rule changes from
+several accounts and regions through digest.lambda_handler in SQS-sized
+batches, against the SQLite store and in-process stand-ins for EventBridge
+and SNS (optionally with simulated API latency).
+
+Usage (with ../../Shared_Runtime on PYTHONPATH):
+
+    python benchmark_hub.py --events 20000 --rules 500 --latency-ms 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+EVENT_NAMES = ['PutRule', 'PutTargets', 'RemoveTargets', 'DisableRule', 'EnableRule', 'DeleteRule']
+
+
+class StandInEvents:
+    """Answers the EventBridge calls the monitor makes, after an optional delay."""
+
+    class exceptions:
+        class ResourceNotFoundException(Exception):
+            pass
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def describe_rule(self, Name, EventBusName):
+        time.sleep(self.latency)
+        return {'EventPattern': json.dumps({'source': [f"app.{Name}"]}), 'State': 'ENABLED'}
+
+    def list_event_buses(self, **kwargs):
+        time.sleep(self.latency)
+        return {'EventBuses': [{'Name': 'default'}]}
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Rule=None, **kwargs):
+        time.sleep(self.latency)
+        if Rule is None:
+            yield {'Rules': []}
+        else:
+            yield {'Targets': [{'Id': '1', 'Arn': f"arn:aws:sqs:us-east-1:111111111111:{Rule}"}]}
+
+
+class StandInSns:
+    def __init__(self):
+        self.published = 0
+
+    def publish(self, **kwargs):
+        self.published += 1
+        return {'MessageId': str(self.published)}
+
+
+def synthetic_records(count, rules, accounts, regions):
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    for number in range(count):
+        account = accounts[number % len(accounts)]
+        rule = f"rule-{random.randrange(rules)}"
+        event = {
+            'account': account,
+            'region': random.choice(regions),
+            'detail': {
+                'eventID': str(uuid.uuid4()),
+                'eventName': random.choice(EVENT_NAMES),
+                'eventTime': now,
+                'requestParameters': {'name': rule},
+                'userIdentity': {'arn': f"arn:aws:sts::{account}:assumed-role/deployer/session-{number % 7}"},
+            },
+        }
+        yield {'messageId': str(number), 'body': json.dumps(event)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hub digest consumer')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--rules', type=int, default=500, help='distinct rule names per account')
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated EventBridge API latency')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='hub-benchmark-')
+    os.environ.update({
+        'HUB_MODE': 'true',
+        'HUB_ACCOUNT_ID': '000000000000',
+        'AWS_REGION': os.environ.get('AWS_REGION', 'us-east-1'),
+        'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+        'SNS_TOPIC_ARN': 'arn:aws:sns:us-east-1:000000000000:benchmark',
+        'STATE_DB_PATH': os.path.join(workdir, 'state.db'),
+        'ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+    })
+    os.environ.pop('STATE_TABLE', None)
+    os.environ.pop('ARCHIVE_BUCKET', None)
+
+    import digest
+    import hub
+    import notifiers
+
+    events = StandInEvents(args.latency_ms / 1000)
+    sns = StandInSns()
+    hub.events_client_for = lambda account_id, region: events
+    notifiers._notifier = notifiers.Notifier([notifiers.SnsChannel(os.environ['SNS_TOPIC_ARN'], client=sns)])
+
+    accounts = [f"{100000000000 + number}" for number in range(args.accounts)]
+    records = list(synthetic_records(args.events, args.rules, accounts, ['us-east-1', 'eu-west-1', 'ap-southeast-2']))
+
+    # Silence the handler's per-event logging while timing
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    started = time.perf_counter()
+    failures = 0
+    try:
+        for start in range(0, len(records), args.batch_size):
+            response = digest.lambda_handler({'Records': records[start:start + args.batch_size]}, None)
+            failures += len(response['batchItemFailures'])
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(records)} events in {elapsed:.1f}s: {len(records) / elapsed * 60:,.0f} events/minute "
+          f"({sns.published} digests, {failures} failed records, state in {workdir})")
+
+
+if __name__ == '__main__':
+    main()
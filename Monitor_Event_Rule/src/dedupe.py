@@ -0,0 +1,61 @@
+import os
+import time
+from collections import OrderedDict
+
+from state_store import get_store
+
+DEDUPE_TTL_SECONDS = int(os.environ.get('DEDUPE_TTL_SECONDS', '86400'))
+DEDUPE_CACHE_SIZE = int(os.environ.get('DEDUPE_CACHE_SIZE', '10000'))
+
+
+class EventDeduplicator:
+    """
+    Remembers CloudTrail eventIDs that have already been handled.
+
+    A warm in-process LRU (with the same TTL) answers repeats within one
+    container without any call; otherwise one conditional write to the store
+    both checks and claims the eventID.
+    """
+
+    def __init__(self, store, ttl_seconds=DEDUPE_TTL_SECONDS, max_entries=DEDUPE_CACHE_SIZE):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.recent = OrderedDict()
+
+    def is_duplicate(self, event_id):
+        """Claim the eventID; True if it was already claimed (here or elsewhere)."""
+        now = time.monotonic()
+        expires = self.recent.get(event_id)
+        if expires is not None:
+            if expires > now:
+                self.recent.move_to_end(event_id)
+                return True
+            del self.recent[event_id]
+
+        claimed = self.store.put_if_absent(f"event#{event_id}", {'claimed_at': int(time.time())},
+                                           ttl_seconds=self.ttl_seconds)
+        self._remember(event_id, now)
+        return not claimed
+
+    def release(self, event_id):
+        """Forget a claim whose notification failed so a retry is not dropped."""
+        self.recent.pop(event_id, None)
+        self.store.delete(f"event#{event_id}")
+
+    def _remember(self, event_id, now):
+        self.recent[event_id] = now + self.ttl_seconds
+        self.recent.move_to_end(event_id)
+        while len(self.recent) > self.max_entries:
+            self.recent.popitem(last=False)
+
+
+_deduplicator = None
+
+
+def get_deduplicator():
+    """One deduplicator per container, so the LRU survives warm invocations."""
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = EventDeduplicator(get_store())
+    return _deduplicator
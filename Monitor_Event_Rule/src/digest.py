@@ -0,0 +1,228 @@
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from alert_rules import get_classifier
+from app import archive_events, check_anomaly, check_golden_events, extract_event_fields
+from dedupe import get_deduplicator
+from event_patterns import format_validation
+from hub import HUB_MODE, origin_scope
+from notifiers import SEVERITY_ORDER, get_notifier
+from rule_snapshots import get_snapshot_store, summarize_diff
+from state_store import get_store
+from target_index import get_target_index
+
+classifier = get_classifier()
+
+# The flush interval is the SQS batching window of the event source mapping
+DIGEST_WINDOW_SECONDS = int(os.environ.get('DIGEST_WINDOW_SECONDS', '300'))
+DIGEST_MAX_RULES = int(os.environ.get('DIGEST_MAX_RULES', '50'))
+# SNS messages are capped at 256 KB; stay well below it
+DIGEST_MAX_BYTES = 200 * 1024
+# Rules are snapshotted in parallel; each snapshot is a few API calls
+SNAPSHOT_WORKERS = 8
+
+executor = ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS)
+
+
+def lambda_handler(event, context):
+    """
+    Consume a batch of rule-change events from SQS and send one digest per
+    principal, stack and time window instead of one email per API call.
+    Records whose digest could not be published are returned as
+    batchItemFailures so only they are retried.
+    """
+    records = event.get('Records', [])
+    print(f"Received {len(records)} queued rule change event(s)")
+
+    deduplicator = get_deduplicator()
+    changes = []
+    archived = []
+    for record in records:
+        try:
+            rule_event = json.loads(record['body'])
+            fields = extract_event_fields(rule_event)
+        except (ValueError, KeyError, TypeError) as e:
+            # A malformed message will never parse; drop it rather than retry forever
+            print(f"Skipping unreadable record {record.get('messageId')}: {str(e)}")
+            continue
+        if fields['event_id'] != 'UNKNOWN' and deduplicator.is_duplicate(fields['event_id']):
+            print(f"Duplicate event {fields['event_id']} skipped")
+            continue
+        changes.append((record['messageId'], fields))
+        archived.append((fields, rule_event))
+        # Incidents are alerted straight away rather than waiting for the digest
+        check_anomaly(fields)
+
+    archive_events(archived)
+
+    # Suppressed events still update the snapshots, they just are not reported
+    summaries = snapshot_rules(fields for _, fields in changes)
+    for _, fields in changes:
+        fields['alert'] = classifier.classify(fields)
+    changes = [(message_id, fields) for message_id, fields in changes if fields['alert']['action'] != 'suppress']
+
+    failures = []
+    for key, group in group_changes(changes).items():
+        message_ids = [message_id for message_id, _ in group]
+        try:
+            # A group of only downgraded changes is 'low' and goes to the low-priority topic
+            severity = max((fields['alert']['severity'] for _, fields in group), key=SEVERITY_ORDER.index)
+            for subject, message in build_digests(key, [fields for _, fields in group], summaries):
+                get_notifier().send({
+                    'subject': subject,
+                    'message': message,
+                    'severity': severity,
+                    'fields': None
+                })
+            print(f"Digest sent for {key[0]} / {key[1]}: {len(group)} event(s)")
+        except Exception as e:
+            print(f"Error sending digest for {key[0]} / {key[1]}: {str(e)}")
+            failures.extend({'itemIdentifier': message_id} for message_id in message_ids)
+            for _, fields in group:
+                if fields['event_id'] != 'UNKNOWN':
+                    deduplicator.release(fields['event_id'])
+
+    return {'batchItemFailures': failures}
+
+
+def snapshot_rules(changes):
+    """
+    Snapshot each affected rule once per batch, however many events touched
+    it, and keep the target index in step with it. Returns one summary per
+    rule_identity.
+    """
+    first = OrderedDict()
+    for fields in changes:
+        if fields['rule_name'] != 'UNKNOWN':
+            first.setdefault(rule_identity(fields), fields)
+    return dict(zip(first, executor.map(snapshot_rule, first.values())))
+
+
+def snapshot_rule(fields):
+    scope, events_client = origin_scope(fields)
+    try:
+        result = get_snapshot_store(get_store(), scope, events_client).record_change(
+            fields['rule_name'], fields['event_bus'], fields['event_time'])
+    except Exception as e:
+        print(f"Error snapshotting rule {fields['rule_name']}: {str(e)}")
+        return 'state unavailable'
+
+    summary = summarize_diff(result)
+    try:
+        validation = check_golden_events(fields, result)
+        if validation and (validation['error'] or validation['unmatched']):
+            summary += f"; {format_validation(validation)[0]}"
+        index = get_target_index(get_store(), scope, events_client)
+        removed, _ = index.apply_rule_change(
+            fields['event_bus'], fields['rule_name'],
+            result['current']['Targets'] if result['current'] else None)
+        orphaned = [entry['arn'] for entry in index.impact(fields['event_bus'], fields['rule_name'], removed)
+                    if not entry['other_rules']]
+        if orphaned:
+            summary += f"; no longer receiving events: {', '.join(orphaned)}"
+    except Exception as e:
+        print(f"Error updating target index for {fields['rule_name']}: {str(e)}")
+    return summary
+
+
+def rule_identity(fields):
+    """Rules are identified by origin too, as a hub sees every account and region."""
+    return (fields['origin'], fields['event_bus'], fields['rule_name'])
+
+
+def group_changes(changes):
+    """
+    Group (message_id, fields) pairs by (principal, stack, window start).
+
+    Only PutRule carries the CloudFormation stack tag, so the stack learned
+    for a rule anywhere in the batch is applied to its other events too.
+    """
+    stacks = {rule_identity(fields): fields['stack_name'] for _, fields in changes if fields['stack_name']}
+
+    groups = OrderedDict()
+    for message_id, fields in sorted(changes, key=lambda change: change[1]['event_time']):
+        stack = stacks.get(rule_identity(fields)) or describe_origin(fields)
+        key = (fields['principal'], stack, window_start(fields['event_time']))
+        groups.setdefault(key, []).append((message_id, fields))
+    return groups
+
+
+def describe_origin(fields):
+    if fields['invoked_by'] == 'cloudformation.amazonaws.com':
+        return 'CloudFormation (stack unknown)'
+    return 'No stack (direct API call)'
+
+
+def window_start(event_time):
+    try:
+        ts = datetime.fromisoformat(event_time.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 'unknown'
+    start = int(ts // DIGEST_WINDOW_SECONDS * DIGEST_WINDOW_SECONDS)
+    return datetime.fromtimestamp(start, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def build_digests(key, changes, summaries=None):
+    """
+    Yield (subject, message) pairs for one group, split into parts of at most
+    DIGEST_MAX_RULES rules and DIGEST_MAX_BYTES each.
+    """
+    principal, stack, window = key
+    summaries = summaries or {}
+    rules = OrderedDict()
+    counts = {}
+    escalated = set()
+    for fields in changes:
+        actions = rules.setdefault(rule_identity(fields), [])
+        if fields['event_name'] not in actions:
+            actions.append(fields['event_name'])
+        counts[fields['event_name']] = counts.get(fields['event_name'], 0) + 1
+        if fields.get('alert', {}).get('action') == 'escalate':
+            escalated.add(rule_identity(fields))
+
+    lines = []
+    for identity, actions in rules.items():
+        origin, bus, rule = identity
+        summary = f" [{summaries[identity]}]" if identity in summaries else ""
+        flag = "[ESCALATED] " if identity in escalated else ""
+        where = f"bus: {bus}, {origin}" if HUB_MODE else f"bus: {bus}"
+        lines.append(f"    - {flag}{rule} ({where}): {', '.join(actions)}{summary}")
+    parts = []
+    current, size = [], 0
+    for line in lines:
+        if current and (len(current) >= DIGEST_MAX_RULES or size + len(line) > DIGEST_MAX_BYTES):
+            parts.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    parts.append(current)
+
+    summary = ', '.join(f"{name} x{count}" for name, count in sorted(counts.items()))
+    for number, part in enumerate(parts, start=1):
+        suffix = f" (part {number}/{len(parts)})" if len(parts) > 1 else ""
+        subject = f"AWS EventBridge Rule Changes: {len(rules)} rule(s) by {short_principal(principal)}{suffix}"
+        if escalated:
+            subject = f"[ESCALATED] {subject}"
+        message = f"""
+    EventBridge Rule Change Digest{suffix}
+
+    Window Start: {window} ({DIGEST_WINDOW_SECONDS}s window)
+    Performed By: {principal}
+    Stack: {stack}
+    Events: {len(changes)} ({summary})
+    Rules Affected: {len(rules)}
+
+    Rules and actions:
+{chr(10).join(part)}
+
+    This is an automated digest of changes to EventBridge rules.
+    """
+        # SNS subjects are limited to 100 characters
+        yield subject[:100], message
+
+
+def short_principal(principal):
+    return principal.rsplit('/', 1)[-1] if principal else 'UNKNOWN'
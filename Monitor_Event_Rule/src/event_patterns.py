@@ -0,0 +1,324 @@
+"""
+Local EventBridge event-pattern matching, for validating rule changes
+against stored sample events without one test_event_pattern call per event.
+
+A pattern is compiled once into nested closures (exact values become set
+lookups), then applied to any number of events:
+
+    matcher = compile_pattern({"source": ["aws.rds"], "detail": {"EventID": [{"prefix": "RDS-EVENT-00"}]}})
+    matcher(event)  # True / False
+
+Supported grammar: exact values (strings, numbers, booleans, null), nested
+keys, arrays in events (any element may match), prefix, suffix,
+equals-ignore-case, wildcard, anything-but (value, list, prefix or suffix),
+numeric ranges, exists, cidr and $or.
+
+Golden samples for a rule are JSON files named <rule name>.json (a list of
+events the rule is expected to match) in GOLDEN_EVENTS_DIR.
+
+Usage:
+
+    python event_patterns.py --pattern pattern.json --events samples.ndjson
+    python event_patterns.py --template ../template.yaml --events samples.json
+"""
+import argparse
+import ipaddress
+import json
+import os
+import re
+import sys
+import time
+
+GOLDEN_EVENTS_DIR = os.environ.get(
+    'GOLDEN_EVENTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_events'))
+
+NUMERIC_OPERATORS = {
+    '=': lambda value, bound: value == bound,
+    '<': lambda value, bound: value < bound,
+    '<=': lambda value, bound: value <= bound,
+    '>': lambda value, bound: value > bound,
+    '>=': lambda value, bound: value >= bound,
+}
+
+_MISSING = object()
+
+
+def compile_pattern(pattern):
+    """Compile an event pattern (dict or JSON string) into a function event -> bool."""
+    if isinstance(pattern, str):
+        pattern = json.loads(pattern)
+    if not isinstance(pattern, dict):
+        raise ValueError('Event pattern must be a JSON object')
+    return _compile_object(pattern, ())
+
+
+def _compile_object(pattern, path):
+    checks = []
+    for key, value in pattern.items():
+        if key == '$or':
+            if not isinstance(value, list) or len(value) < 2:
+                raise ValueError(f"$or at {_dotted(path)} needs a list of at least two patterns")
+            alternatives = [_compile_object(option, path) for option in value]
+            checks.append(lambda event, alternatives=alternatives: any(check(event) for check in alternatives))
+        elif isinstance(value, dict):
+            checks.append(_compile_object(value, path + (key,)))
+        elif isinstance(value, list):
+            checks.append(_compile_leaf(value, path + (key,)))
+        else:
+            raise ValueError(f"Pattern value at {_dotted(path + (key,))} must be an object or a list")
+
+    if len(checks) == 1:
+        return checks[0]
+    return lambda event: all(check(event) for check in checks)
+
+
+def _compile_leaf(rules, path):
+    """A list of alternatives for one field; the field matches if any alternative does."""
+    exact = set()
+    conditions = []
+    match_missing = False
+    for rule in rules:
+        if isinstance(rule, dict):
+            if len(rule) != 1:
+                raise ValueError(f"Matcher at {_dotted(path)} must have exactly one key: {rule}")
+            (operator, operand), = rule.items()
+            if operator == 'exists':
+                if not isinstance(operand, bool):
+                    raise ValueError(f"exists at {_dotted(path)} must be true or false")
+                if operand:
+                    conditions.append(lambda value: not isinstance(value, dict))
+                else:
+                    match_missing = True
+            else:
+                conditions.append(_compile_operator(operator, operand, path))
+        else:
+            exact.add(_value_key(rule))
+
+    def match(event):
+        values = _resolve(event, path)
+        if values is _MISSING:
+            return match_missing
+        for value in values:
+            if exact and _value_key(value) in exact:
+                return True
+            for condition in conditions:
+                if condition(value):
+                    return True
+        return False
+
+    return match
+
+
+def _compile_operator(operator, operand, path):
+    where = _dotted(path)
+    if operator == 'prefix':
+        if isinstance(operand, dict) and set(operand) == {'equals-ignore-case'}:
+            lowered = operand['equals-ignore-case'].lower()
+            return lambda value: isinstance(value, str) and value.lower().startswith(lowered)
+        _require_string(operand, operator, where)
+        return lambda value: isinstance(value, str) and value.startswith(operand)
+    if operator == 'suffix':
+        if isinstance(operand, dict) and set(operand) == {'equals-ignore-case'}:
+            lowered = operand['equals-ignore-case'].lower()
+            return lambda value: isinstance(value, str) and value.lower().endswith(lowered)
+        _require_string(operand, operator, where)
+        return lambda value: isinstance(value, str) and value.endswith(operand)
+    if operator == 'equals-ignore-case':
+        _require_string(operand, operator, where)
+        lowered = operand.lower()
+        return lambda value: isinstance(value, str) and value.lower() == lowered
+    if operator == 'wildcard':
+        _require_string(operand, operator, where)
+        # Only '*' is special in EventBridge wildcards
+        regex = re.compile('.*'.join(re.escape(part) for part in operand.split('*')) + r'\Z', re.DOTALL)
+        return lambda value: isinstance(value, str) and regex.match(value) is not None
+    if operator == 'anything-but':
+        return _compile_anything_but(operand, where)
+    if operator == 'numeric':
+        return _compile_numeric(operand, where)
+    if operator == 'cidr':
+        _require_string(operand, operator, where)
+        network = ipaddress.ip_network(operand, strict=False)
+        return lambda value: _in_network(value, network)
+    raise ValueError(f"Unsupported matcher '{operator}' at {where}")
+
+
+def _compile_anything_but(operand, where):
+    if isinstance(operand, dict):
+        if len(operand) != 1 or next(iter(operand)) not in ('prefix', 'suffix', 'equals-ignore-case'):
+            raise ValueError(f"anything-but at {where} supports prefix, suffix or equals-ignore-case")
+        inner = _compile_operator(*next(iter(operand.items())), (where,))
+        return lambda value: isinstance(value, str) and not inner(value)
+    excluded = {_value_key(item) for item in (operand if isinstance(operand, list) else [operand])}
+    return lambda value: not isinstance(value, dict) and _value_key(value) not in excluded
+
+
+def _compile_numeric(operand, where):
+    if not isinstance(operand, list) or not operand or len(operand) % 2:
+        raise ValueError(f"numeric at {where} must be a list of operator/value pairs")
+    bounds = []
+    for operator, bound in zip(operand[::2], operand[1::2]):
+        if operator not in NUMERIC_OPERATORS or not _is_number(bound):
+            raise ValueError(f"Invalid numeric condition at {where}: {operator} {bound}")
+        bounds.append((NUMERIC_OPERATORS[operator], bound))
+    return lambda value: _is_number(value) and all(test(value, bound) for test, bound in bounds)
+
+
+def _resolve(event, path):
+    """Values found at the path, descending into arrays; _MISSING if there are none."""
+    nodes = [event]
+    for key in path:
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and key in node:
+                value = node[key]
+                if isinstance(value, list):
+                    found.extend(value)
+                else:
+                    found.append(value)
+        if not found:
+            return _MISSING
+        nodes = found
+    return nodes
+
+
+def _value_key(value):
+    # Keeps true distinct from 1 and 5 equal to 5.0, as EventBridge does
+    if isinstance(value, bool):
+        return ('bool', value)
+    if _is_number(value):
+        return ('number', float(value))
+    if value is None:
+        return ('null',)
+    if isinstance(value, str):
+        return ('string', value)
+    return ('other', json.dumps(value, sort_keys=True))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _in_network(value, network):
+    try:
+        return isinstance(value, str) and ipaddress.ip_address(value) in network
+    except ValueError:
+        return False
+
+
+def _require_string(operand, operator, where):
+    if not isinstance(operand, str):
+        raise ValueError(f"{operator} at {where} must be a string")
+
+
+def _dotted(path):
+    return '.'.join(path) or '<root>'
+
+
+def match_events(pattern, events):
+    """Compile once and return the indexes of the events the pattern matches."""
+    matcher = compile_pattern(pattern)
+    return [number for number, event in enumerate(events) if matcher(event)]
+
+
+def load_golden_events(rule_name, directory=None):
+    """Sample events the rule is expected to match, or [] if none are kept for it."""
+    path = os.path.join(directory or GOLDEN_EVENTS_DIR, f"{rule_name}.json")
+    if not os.path.exists(path):
+        return []
+    return load_events(path)
+
+
+def validate_pattern(pattern, samples):
+    """
+    Check a pattern against golden samples. Returns {'total', 'matched',
+    'unmatched': [indexes], 'error'}; 'error' is set if the pattern is invalid.
+    """
+    try:
+        matched = set(match_events(pattern, samples))
+    except ValueError as e:
+        return {'total': len(samples), 'matched': 0, 'unmatched': list(range(len(samples))), 'error': str(e)}
+    return {'total': len(samples), 'matched': len(matched),
+            'unmatched': [number for number in range(len(samples)) if number not in matched], 'error': None}
+
+
+def format_validation(result):
+    """Lines for the notification's pattern check."""
+    if result['error']:
+        return [f"Event pattern is invalid: {result['error']}"]
+    if not result['unmatched']:
+        return [f"Pattern still matches all {result['total']} golden sample event(s)"]
+    shown = ', '.join(str(number) for number in result['unmatched'][:10])
+    return [f"PATTERN NO LONGER MATCHES {len(result['unmatched'])} of {result['total']} golden sample event(s) "
+            f"(sample #{shown})"]
+
+
+def load_events(path):
+    """A JSON list of events, or one event per line (NDJSON)."""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def patterns_from_template(path):
+    """
+    EventPattern (AWS::Events::Rule) and Pattern (SAM EventBridgeRule events)
+    values from a template, keyed by logical id. Needs PyYAML.
+    """
+    import yaml
+
+    class TemplateLoader(yaml.SafeLoader):
+        pass
+
+    # Keep !Ref, !GetAtt, !Sub and friends loadable; their values are not used here
+    TemplateLoader.add_multi_constructor('!', lambda loader, suffix, node: None)
+    with open(path) as f:
+        template = yaml.load(f, Loader=TemplateLoader)
+
+    patterns = {}
+    for logical_id, resource in (template.get('Resources') or {}).items():
+        properties = resource.get('Properties') or {}
+        if properties.get('EventPattern'):
+            patterns[logical_id] = properties['EventPattern']
+        for event_id, source in (properties.get('Events') or {}).items():
+            if (source.get('Properties') or {}).get('Pattern'):
+                patterns[f"{logical_id}.{event_id}"] = source['Properties']['Pattern']
+    return patterns
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Match sample events against EventBridge patterns')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--pattern', help='JSON file holding one event pattern')
+    source.add_argument('--template', help='SAM/CloudFormation template to read patterns from')
+    parser.add_argument('--events', required=True, help='JSON list or NDJSON file of events')
+    parser.add_argument('--expect-all', action='store_true',
+                        help='Exit non-zero unless every pattern matches every event')
+    args = parser.parse_args()
+
+    if args.pattern:
+        with open(args.pattern) as f:
+            patterns = {os.path.basename(args.pattern): json.load(f)}
+    else:
+        patterns = patterns_from_template(args.template)
+    events = load_events(args.events)
+
+    failed = False
+    for name, pattern in patterns.items():
+        started = time.perf_counter()
+        result = validate_pattern(pattern, events)
+        elapsed = time.perf_counter() - started
+        rate = len(events) / elapsed if elapsed else float('inf')
+        print(f"{name}: {result['matched']}/{result['total']} matched ({rate:,.0f} events/s)")
+        for line in format_validation(result):
+            print(f"    {line}")
+        failed = failed or bool(result['error'] or result['unmatched'])
+
+    if args.expect_all and failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
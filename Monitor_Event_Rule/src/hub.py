@@ -0,0 +1,76 @@
+"""
+Hub mode: one monitor for rule changes forwarded from other accounts and
+regions to a central event bus.
+
+Spoke stacks (spoke-template.yaml) forward the matching CloudTrail events
+to the hub bus, which queues them for the digest consumer. Rules in other
+accounts or regions are read through a role the spoke creates
+(HUB_READ_ROLE_NAME), and their state is scoped by origin in the store so
+rules with the same name in different accounts never share snapshots or
+target indexes.
+"""
+import os
+import threading
+import time
+
+import aws_clients
+
+HUB_MODE = os.environ.get('HUB_MODE', 'false').lower() == 'true'
+HUB_READ_ROLE_NAME = os.environ.get('HUB_READ_ROLE_NAME', 'RuleMonitorHubReadRole')
+HUB_ACCOUNT_ID = os.environ.get('HUB_ACCOUNT_ID', '')
+HUB_REGION = os.environ.get('AWS_REGION', '')
+HUB_PARTITION = os.environ.get('HUB_PARTITION', 'aws')
+
+# Refresh assumed-role credentials this long before they expire
+CREDENTIAL_MARGIN_SECONDS = 300
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def is_local(account_id, region):
+    """True for events from the account and region the monitor runs in."""
+    return account_id in ('UNKNOWN', HUB_ACCOUNT_ID) and region in ('UNKNOWN', HUB_REGION)
+
+
+def origin_scope(fields):
+    """
+    (scope, events client) for the event's origin: ('', None) for local
+    rules, so single-account deployments keep their existing state keys.
+    """
+    account_id, region = fields['account_id'], fields['aws_region']
+    if not HUB_MODE or is_local(account_id, region):
+        return '', None
+    return f"{account_id}/{region}/", events_client_for(account_id, region)
+
+
+def events_client_for(account_id, region):
+    """
+    An EventBridge client for another region, assuming the spoke's read role
+    for another account. Clients are cached until their credentials are close
+    to expiry; callers fetch the client for every use rather than keep it.
+    """
+    key = (account_id, region)
+    # Held while creating, so the digest's worker threads assume a role once
+    with _lock:
+        cached = _clients.get(key)
+        if cached and cached[0] > time.time():
+            return cached[1]
+
+        if account_id in ('UNKNOWN', HUB_ACCOUNT_ID):
+            client, expires = aws_clients.client('events', region_name=region), float('inf')
+        else:
+            credentials = aws_clients.client('sts').assume_role(
+                RoleArn=f"arn:{HUB_PARTITION}:iam::{account_id}:role/{HUB_READ_ROLE_NAME}",
+                RoleSessionName='rule-monitor-hub'
+            )['Credentials']
+            client = aws_clients.new_client(
+                'events', region_name=region,
+                aws_access_key_id=credentials['AccessKeyId'],
+                aws_secret_access_key=credentials['SecretAccessKey'],
+                aws_session_token=credentials['SessionToken'],
+            )
+            expires = credentials['Expiration'].timestamp() - CREDENTIAL_MARGIN_SECONDS
+
+        _clients[key] = (expires, client)
+        return client
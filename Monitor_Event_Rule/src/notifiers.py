@@ -0,0 +1,223 @@
+"""
+Notification fan-out to SNS and webhook channels.
+
+A notification is a dict with 'subject', 'message', 'severity' and the
+event's 'fields' (or None for digests and incident alerts). Each channel
+formats it its own way; all channels are sent to concurrently from a
+shared thread pool, so their latencies overlap instead of adding up.
+SNS is the channel of record: its failure is raised so the event is
+retried, while webhook failures are only logged. Each webhook has its own
+timeout, retries and circuit breaker, so a slow or dead endpoint costs at
+most its timeout budget and, once its breaker opens, nothing at all.
+
+Webhooks are configured with NOTIFY_WEBHOOKS, a JSON list:
+
+    [{"name": "chat", "url": "https://hooks.example.com/T000/B000", "format": "chat"},
+     {"name": "tickets", "url": "https://tickets.example.com/api/issues", "format": "ticket",
+      "min_severity": "high", "timeout": 5, "retries": 1}]
+
+For local runs, point the URLs at the stand-in receiver, which prints every
+payload it gets:
+
+    python notifiers.py --serve 8080
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import aws_clients
+
+SEVERITY_ORDER = ['low', 'normal', 'high', 'critical']
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after reset_seconds one trial call is let through."""
+
+    def __init__(self, failure_threshold=3, reset_seconds=60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                # Half open: restart the clock so only this call goes through
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.failures, self.opened_at = 0, None
+            else:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.opened_at = time.monotonic()
+
+
+class SnsChannel:
+    name = 'sns'
+    required = True
+
+    def __init__(self, topic_arn, low_priority_topic_arn=None, client=None):
+        self.topic_arn = topic_arn
+        self.low_priority_topic_arn = low_priority_topic_arn
+        self.client = client or aws_clients.client('sns')
+
+    def send(self, notification):
+        # Downgraded changes go to the low-priority topic when there is one
+        topic_arn = self.topic_arn
+        if notification['severity'] == 'low':
+            topic_arn = self.low_priority_topic_arn or topic_arn
+        return self.client.publish(
+            TopicArn=topic_arn,
+            Message=notification['message'],
+            # SNS subjects are limited to 100 characters
+            Subject=notification['subject'][:100],
+            MessageAttributes={'severity': {'DataType': 'String', 'StringValue': notification['severity']}}
+        )['MessageId']
+
+
+class WebhookChannel:
+    required = False
+
+    def __init__(self, name, url, formatter, timeout=3, retries=2, min_severity='low', breaker=None):
+        self.name = name
+        self.url = url
+        self.formatter = formatter
+        self.timeout = timeout
+        self.retries = retries
+        self.min_severity = min_severity
+        self.breaker = breaker or CircuitBreaker()
+
+    def send(self, notification):
+        if SEVERITY_ORDER.index(notification['severity']) < SEVERITY_ORDER.index(self.min_severity):
+            return 'skipped (below minimum severity)'
+        if not self.breaker.allow():
+            return 'skipped (circuit open)'
+
+        body = json.dumps(self.formatter(notification), default=str).encode('utf-8')
+        for attempt in range(self.retries + 1):
+            try:
+                request = urllib.request.Request(self.url, data=body, method='POST',
+                                                 headers={'Content-Type': 'application/json'})
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    status = response.status
+                self.breaker.record(True)
+                return status
+            except Exception:
+                if attempt == self.retries:
+                    self.breaker.record(False)
+                    raise
+                time.sleep(0.2 * 2 ** attempt)
+
+
+def format_chat(notification):
+    """Chat webhooks (Slack/Teams/Chime style) take a single text field."""
+    return {'text': f"*{notification['subject']}*\n```{notification['message'].strip()}```"}
+
+
+def format_ticket(notification):
+    fields = notification.get('fields') or {}
+    return {
+        'title': notification['subject'],
+        'description': notification['message'].strip(),
+        'severity': notification['severity'],
+        'labels': ['eventbridge-rule-monitor'] + [
+            value for value in (fields.get('event_name'), fields.get('event_bus')) if value],
+        'rule_name': fields.get('rule_name'),
+        'principal': fields.get('principal'),
+        'event_id': fields.get('event_id'),
+    }
+
+
+FORMATTERS = {
+    'chat': format_chat,
+    'ticket': format_ticket,
+}
+
+
+class Notifier:
+    def __init__(self, channels, max_workers=8):
+        self.channels = channels
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def send(self, notification):
+        """
+        Send to every channel at once. Returns {channel name: result or
+        'error: ...'}; raises the first required channel's error after all
+        channels have finished.
+        """
+        futures = {channel.name: (channel, self.executor.submit(channel.send, notification))
+                   for channel in self.channels}
+        results, required_error = {}, None
+        for name, (channel, future) in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error sending notification to {name}: {str(e)}")
+                results[name] = f"error: {str(e)}"
+                if channel.required and required_error is None:
+                    required_error = e
+        print(f"Notification results: {results}")
+        if required_error is not None:
+            raise required_error
+        return results
+
+
+def notifier_from_environment():
+    channels = [SnsChannel(os.environ['SNS_TOPIC_ARN'], os.environ.get('LOW_PRIORITY_TOPIC_ARN'))]
+    for number, config in enumerate(json.loads(os.environ.get('NOTIFY_WEBHOOKS') or '[]')):
+        if config.get('format', 'chat') not in FORMATTERS:
+            raise ValueError(f"Webhook {number} has unknown format {config.get('format')}; "
+                             f"use one of {', '.join(FORMATTERS)}")
+        channels.append(WebhookChannel(
+            config.get('name') or f"webhook-{number}",
+            config['url'],
+            FORMATTERS[config.get('format', 'chat')],
+            timeout=config.get('timeout', 3),
+            retries=config.get('retries', 2),
+            min_severity=config.get('min_severity', 'low'),
+        ))
+    return Notifier(channels)
+
+
+_notifier = None
+
+
+def get_notifier():
+    """One notifier per container, so breakers and the pool survive warm invocations."""
+    global _notifier
+    if _notifier is None:
+        _notifier = notifier_from_environment()
+    return _notifier
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        print(f"{self.path}: {body.decode('utf-8', 'replace')}")
+        self.send_response(200)
+        self.end_headers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in receiver for webhook channels')
+    parser.add_argument('--serve', type=int, metavar='PORT', required=True)
+    args = parser.parse_args()
+    print(f"Listening on http://127.0.0.1:{args.serve}/")
+    HTTPServer(('127.0.0.1', args.serve), StandInHandler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
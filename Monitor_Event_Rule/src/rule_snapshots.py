@@ -0,0 +1,231 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import aws_clients
+
+SNAPSHOT_HISTORY = 20
+POINTER_WRITE_ATTEMPTS = 5
+BLOB_CACHE_SIZE = 512
+
+
+class RuleSnapshotStore:
+    """
+    Versioned, content-addressed snapshots of rule definitions and targets.
+
+    Each distinct definition is stored once under blob#<sha256>; the pointer
+    rule#<bus>#<name> holds the current version, its hash and a short
+    history. Blobs never change, so they are cached in-process without expiry.
+    Pointers are read on every change and advanced with a conditional write
+    on the version read, so concurrent containers handling a burst of changes
+    to the same rule never diff against a stale version or reuse a number.
+    Pointers for rules in other accounts or regions (hub mode) are prefixed
+    with their scope, '<account>/<region>/'.
+    """
+
+    def __init__(self, store, events_client=None, scope=''):
+        self.store = store
+        self.events = events_client or aws_clients.client('events')
+        self.scope = scope
+        self.blobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def record_change(self, rule_name, event_bus, event_time=None):
+        """
+        Snapshot the rule as it is now and diff it against the last snapshot.
+
+        Returns a dict with 'version', 'previous_version', 'changed',
+        'diff' (see diff_definitions; None for a first snapshot) and
+        'current', the definition just fetched (None if the rule is gone).
+        """
+        current = self.fetch_definition(rule_name, event_bus)
+        digest = content_hash(current)
+        self._put_blob(digest, current)
+        key = f"rule#{self.scope}{event_bus}#{rule_name}"
+
+        for _ in range(POINTER_WRITE_ATTEMPTS):
+            pointer = self.store.get(key)
+            if pointer and pointer['hash'] == digest:
+                return {'version': pointer['version'], 'previous_version': pointer['version'],
+                        'changed': False, 'diff': diff_definitions(current, current), 'current': current}
+
+            version = pointer['version'] + 1 if pointer else 1
+            history = ((pointer or {}).get('history', []) + [
+                {'version': version, 'hash': digest, 'event_time': event_time}])[-SNAPSHOT_HISTORY:]
+            # Another container advanced the pointer since it was read; diff against its version instead
+            if self.store.put_if_unchanged(key, pointer, {'version': version, 'hash': digest, 'history': history}):
+                break
+        else:
+            raise RuntimeError(f"Snapshot pointer {key} kept changing; gave up after {POINTER_WRITE_ATTEMPTS} attempts")
+
+        previous = self._get_blob(pointer['hash']) if pointer else None
+        return {
+            'version': version,
+            'previous_version': pointer['version'] if pointer else None,
+            'changed': True,
+            'diff': diff_definitions(previous, current) if pointer else None,
+            'current': current,
+        }
+
+    def fetch_definition(self, rule_name, event_bus):
+        """describe_rule + list_targets_by_rule for one rule; None once it is deleted."""
+        try:
+            rule = self.events.describe_rule(Name=rule_name, EventBusName=event_bus)
+        except self.events.exceptions.ResourceNotFoundException:
+            return None
+
+        targets = []
+        paginator = self.events.get_paginator('list_targets_by_rule')
+        for page in paginator.paginate(Rule=rule_name, EventBusName=event_bus):
+            targets.extend(page['Targets'])
+
+        pattern = rule.get('EventPattern')
+        return {
+            'EventPattern': json.loads(pattern) if pattern else None,
+            'ScheduleExpression': rule.get('ScheduleExpression'),
+            'State': rule.get('State'),
+            'Description': rule.get('Description'),
+            'RoleArn': rule.get('RoleArn'),
+            'Targets': {target['Id']: target for target in targets},
+        }
+
+    def _get_blob(self, digest):
+        with self.lock:
+            if digest in self.blobs:
+                self.blobs.move_to_end(digest)
+                return self.blobs[digest]
+        blob = self.store.get(f"blob#{digest}")
+        self._cache_blob(digest, blob)
+        return blob
+
+    def _put_blob(self, digest, definition):
+        # Identical content is stored once, whichever rule or version it belongs to
+        if digest not in self.blobs:
+            self.store.put_if_absent(f"blob#{digest}", definition)
+        self._cache_blob(digest, definition)
+
+    def _cache_blob(self, digest, definition):
+        # Digest batches snapshot several rules at once
+        with self.lock:
+            self.blobs[digest] = definition
+            self.blobs.move_to_end(digest)
+            while len(self.blobs) > BLOB_CACHE_SIZE:
+                self.blobs.popitem(last=False)
+
+
+def content_hash(definition):
+    canonical = json.dumps(definition, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def diff_definitions(before, after):
+    """
+    Structured diff of two rule definitions (either may be None).
+
+    Returns {'rule': 'created'|'deleted'|None, 'pattern': [...],
+    'schedule', 'state', 'description': (before, after) or None,
+    'targets': {'added': [...], 'removed': [...], 'changed': {id: [fields]}}}.
+    """
+    before_rule, after_rule = before or {}, after or {}
+    diff = {
+        'rule': 'created' if before is None and after is not None else
+                'deleted' if after is None and before is not None else None,
+        'pattern': diff_patterns(before_rule.get('EventPattern'), after_rule.get('EventPattern')),
+    }
+    for field, name in (('ScheduleExpression', 'schedule'), ('State', 'state'), ('Description', 'description')):
+        old, new = before_rule.get(field), after_rule.get(field)
+        diff[name] = (old, new) if old != new else None
+
+    old_targets, new_targets = before_rule.get('Targets') or {}, after_rule.get('Targets') or {}
+    diff['targets'] = {
+        'added': sorted(set(new_targets) - set(old_targets)),
+        'removed': sorted(set(old_targets) - set(new_targets)),
+        'changed': {
+            target_id: sorted(field for field in set(old_targets[target_id]) | set(new_targets[target_id])
+                              if old_targets[target_id].get(field) != new_targets[target_id].get(field))
+            for target_id in sorted(set(old_targets) & set(new_targets))
+            if old_targets[target_id] != new_targets[target_id]
+        },
+    }
+    return diff
+
+
+def diff_patterns(before, after):
+    """List of (path, before, after) for every leaf that differs in two event patterns."""
+    old, new = _flatten(before or {}), _flatten(after or {})
+    return [(path, old.get(path), new.get(path))
+            for path in sorted(set(old) | set(new)) if old.get(path) != new.get(path)]
+
+
+def _flatten(pattern, prefix=''):
+    leaves = {}
+    for key, value in pattern.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            leaves.update(_flatten(value, path))
+        else:
+            leaves[path] = value
+    return leaves
+
+
+def format_diff(result):
+    """Human-readable lines for a record_change result."""
+    if result['diff'] is None:
+        return [f"First snapshot of this rule (version {result['version']}); no previous state to compare."]
+    if not result['changed']:
+        return [f"No change in definition or targets (version {result['version']})."]
+
+    diff = result['diff']
+    lines = [f"Version {result['previous_version']} -> {result['version']}"]
+    if diff['rule'] == 'deleted':
+        removed = diff['targets']['removed']
+        lines.append(f"Rule deleted; it had {len(removed)} target(s): {', '.join(removed) or 'none'}")
+        return lines
+    if diff['rule']:
+        lines.append(f"Rule {diff['rule']}")
+    for path, old, new in diff['pattern']:
+        lines.append(f"Pattern {path}: {json.dumps(old)} -> {json.dumps(new)}")
+    for name in ('schedule', 'state', 'description'):
+        if diff[name]:
+            lines.append(f"{name.capitalize()}: {diff[name][0]} -> {diff[name][1]}")
+    for target_id in diff['targets']['added']:
+        lines.append(f"Target added: {target_id}")
+    for target_id in diff['targets']['removed']:
+        lines.append(f"Target removed: {target_id}")
+    for target_id, fields in diff['targets']['changed'].items():
+        lines.append(f"Target changed: {target_id} ({', '.join(fields)})")
+    return lines
+
+
+def summarize_diff(result):
+    """One-line summary for digests."""
+    if result['diff'] is None:
+        return 'first snapshot'
+    if not result['changed']:
+        return 'no net change'
+    diff = result['diff']
+    parts = [f"rule {diff['rule']}"] if diff['rule'] else []
+    if diff['pattern']:
+        parts.append('pattern')
+    parts.extend(name for name in ('schedule', 'state', 'description') if diff[name])
+    targets = diff['targets']
+    if targets['added'] or targets['removed'] or targets['changed']:
+        parts.append(f"targets +{len(targets['added'])}/-{len(targets['removed'])}/~{len(targets['changed'])}")
+    return 'changed: ' + ', '.join(parts)
+
+
+_snapshots = {}
+
+
+def get_snapshot_store(store, scope='', events_client=None):
+    """
+    One snapshot store per container and origin, so caches survive warm
+    invocations. The events client is replaced on every call, since a hub
+    origin's client changes whenever its assumed-role credentials are renewed.
+    """
+    if scope not in _snapshots:
+        _snapshots[scope] = RuleSnapshotStore(store, events_client, scope)
+    elif events_client is not None:
+        _snapshots[scope].events = events_client
+    return _snapshots[scope]
@@ -0,0 +1,261 @@
+import threading
+import time
+import uuid
+
+import aws_clients
+
+INDEX_CACHE_SECONDS = 300
+# A version lives until a few daily rebuilds have replaced it; its items
+# outlast its pointer, so a live pointer never leads to expired items
+INDEX_TTL_SECONDS = 3 * 24 * 3600
+ITEM_TTL_SECONDS = INDEX_TTL_SECONDS + 3600
+# A first build claims the index for this long; others wait for its pointer
+BUILD_MARKER_SECONDS = 900
+BUILD_WAIT_SECONDS = 60
+BUILD_POLL_SECONDS = 1
+# Hub scopes with an index, for the scheduled rebuild
+SCOPES_KEY = 'target-index#scopes'
+
+TARGET_KINDS = {
+    'lambda': 'Lambda function',
+    'sqs': 'SQS queue',
+    'sns': 'SNS topic',
+    'logs': 'CloudWatch log group',
+    'states': 'Step Functions state machine',
+    'events': 'Event bus / API destination',
+    'kinesis': 'Kinesis stream',
+    'firehose': 'Firehose stream',
+    'ecs': 'ECS cluster',
+    'codebuild': 'CodeBuild project',
+    'ssm': 'SSM document',
+    'batch': 'Batch job queue',
+}
+
+
+class TargetIndex:
+    """
+    Inverted index between rules and their targets for every bus in the account.
+
+    The state store keeps, per rule, its {target id: ARN} map
+    (targets#<version>/<bus>#<rule>) and, per target ARN, the set of rules
+    routing to it (rules#<version>/<arn>), one item each. A rebuild scans
+    every rule with paginated list_rules / list_targets_by_rule into a new
+    version and then switches the pointer (target-index#meta) to it, so
+    readers never see a half-written index; superseded versions expire.
+    Between rebuilds the current version is updated from each change event,
+    so impact lookups are a key read (usually served from the in-process
+    cache). In hub mode each other account/region has its own index, with
+    every key prefixed by its scope, '<account>/<region>/'.
+
+    When there is no pointer yet, one thread per container (the index lock)
+    and one invocation overall (the target-index#<scope>building marker)
+    builds the index; the others wait for its pointer.
+    """
+
+    def __init__(self, store, events_client=None, scope=''):
+        self.store = store
+        self.events = events_client or aws_clients.client('events')
+        self.scope = scope
+        self.meta_key = f"target-index#{scope}meta"
+        self.building_key = f"target-index#{scope}building"
+        self.cache = {}
+        self.version = None
+        self.lock = threading.RLock()
+
+    def current_version(self):
+        """The version the pointer names, building the index if there is none."""
+        meta = self.store.get(self.meta_key)
+        if meta is None or 'version' not in meta:
+            with self.lock:
+                # Another thread may have built it while this one waited
+                meta = self.store.get(self.meta_key)
+                if meta is None or 'version' not in meta:
+                    meta = self._build_once()
+        with self.lock:
+            if meta['version'] != self.version:
+                self.version = meta['version']
+                self.cache.clear()
+            return self.version
+
+    def _build_once(self):
+        """Build the missing index, or wait for the invocation already building it."""
+        if self.store.put_if_absent(self.building_key, {'started_at': int(time.time())},
+                                    ttl_seconds=BUILD_MARKER_SECONDS):
+            try:
+                self.rebuild()
+                return self.store.get(self.meta_key)
+            finally:
+                self.store.delete(self.building_key)
+
+        deadline = time.monotonic() + BUILD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(BUILD_POLL_SECONDS)
+            meta = self.store.get(self.meta_key)
+            if meta is not None and 'version' in meta:
+                return meta
+        raise RuntimeError(f"Target index {self.scope or 'local'} is still being built by another invocation")
+
+    def rebuild(self):
+        """Scan every bus, rule and target into a new version and switch to it."""
+        with self.lock:
+            return self._rebuild()
+
+    def _rebuild(self):
+        targets_by_rule = {}
+        for bus in self._event_buses():
+            for rule in self._paginate('list_rules', 'Rules', EventBusName=bus):
+                targets = self._paginate('list_targets_by_rule', 'Targets', Rule=rule['Name'], EventBusName=bus)
+                targets_by_rule[rule_key(bus, rule['Name'])] = {target['Id']: target['Arn'] for target in targets}
+
+        rules_by_target = {}
+        for key, targets in targets_by_rule.items():
+            for arn in targets.values():
+                rules_by_target.setdefault(arn, set()).add(key)
+
+        version = uuid.uuid4().hex[:12]
+        for key, targets in targets_by_rule.items():
+            self.store.put(self._targets_key(version, key), targets, ttl_seconds=ITEM_TTL_SECONDS)
+        for arn, rules in rules_by_target.items():
+            self.store.add_members(self._rules_key(version, arn), rules, ttl_seconds=ITEM_TTL_SECONDS)
+
+        # Readers move to the new version only once it is complete
+        self.store.put(self.meta_key, {'version': version, 'built_at': int(time.time()),
+                                       'rules': len(targets_by_rule), 'targets': len(rules_by_target)},
+                       ttl_seconds=INDEX_TTL_SECONDS)
+        if self.scope:
+            self.store.add_members(SCOPES_KEY, {self.scope})
+        self.version = version
+        self.cache.clear()
+        return {'version': version, 'rules': len(targets_by_rule), 'targets': len(rules_by_target)}
+
+    def apply_rule_change(self, event_bus, rule_name, targets):
+        """
+        Record a rule's current targets ({id: arn}, or None once deleted).
+        Returns (removed_arns, added_arns) compared with the indexed state.
+        """
+        version = self.current_version()
+        key = rule_key(event_bus, rule_name)
+        old_arns = set(self.targets_for_rule(event_bus, rule_name).values())
+        new_targets = {target_id: target['Arn'] if isinstance(target, dict) else target
+                       for target_id, target in (targets or {}).items()}
+        new_arns = set(new_targets.values())
+
+        for arn in old_arns - new_arns:
+            self.store.remove_members(self._rules_key(version, arn), {key})
+            self._uncache(self._rules_key(version, arn))
+        for arn in new_arns - old_arns:
+            self.store.add_members(self._rules_key(version, arn), {key}, ttl_seconds=ITEM_TTL_SECONDS)
+            self._uncache(self._rules_key(version, arn))
+
+        if targets is None:
+            self.store.delete(self._targets_key(version, key))
+        else:
+            self.store.put(self._targets_key(version, key), new_targets, ttl_seconds=ITEM_TTL_SECONDS)
+        self._cache(self._targets_key(version, key), new_targets)
+        return sorted(old_arns - new_arns), sorted(new_arns - old_arns)
+
+    def targets_for_rule(self, event_bus, rule_name):
+        key = self._targets_key(self.version or self.current_version(), rule_key(event_bus, rule_name))
+        cached = self._cached(key)
+        if cached is None:
+            cached = self._cache(key, self.store.get(key) or {})
+        return cached
+
+    def rules_for_target(self, arn):
+        key = self._rules_key(self.version or self.current_version(), arn)
+        cached = self._cached(key)
+        if cached is None:
+            cached = self._cache(key, self.store.get_members(key))
+        return cached
+
+    def impact(self, event_bus, rule_name, removed_arns):
+        """For each target the rule stopped routing to, which other rules still reach it."""
+        self.current_version()
+        this_rule = rule_key(event_bus, rule_name)
+        return [
+            {
+                'arn': arn,
+                'kind': target_kind(arn),
+                'other_rules': sorted(self.rules_for_target(arn) - {this_rule}),
+            }
+            for arn in removed_arns
+        ]
+
+    def _targets_key(self, version, key):
+        return f"targets#{self.scope}{version}/{key}"
+
+    def _rules_key(self, version, arn):
+        return f"rules#{self.scope}{version}/{arn}"
+
+    def _cached(self, key):
+        with self.lock:
+            entry = self.cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _cache(self, key, value):
+        with self.lock:
+            self.cache[key] = (time.monotonic() + INDEX_CACHE_SECONDS, value)
+        return value
+
+    def _uncache(self, key):
+        with self.lock:
+            self.cache.pop(key, None)
+
+    def _event_buses(self):
+        buses, kwargs = [], {}
+        while True:
+            response = self.events.list_event_buses(**kwargs)
+            buses.extend(bus['Name'] for bus in response['EventBuses'])
+            if not response.get('NextToken'):
+                return buses
+            kwargs['NextToken'] = response['NextToken']
+
+    def _paginate(self, operation, result_key, **kwargs):
+        items = []
+        for page in self.events.get_paginator(operation).paginate(**kwargs):
+            items.extend(page[result_key])
+        return items
+
+
+def rule_key(event_bus, rule_name):
+    return f"{event_bus}#{rule_name}"
+
+
+def target_kind(arn):
+    parts = arn.split(':')
+    return TARGET_KINDS.get(parts[2], parts[2]) if len(parts) > 2 else 'Unknown'
+
+
+def format_impact(impact):
+    """Lines for the notification's impact section."""
+    lines = []
+    for entry in impact:
+        if entry['other_rules']:
+            others = ', '.join(key.replace('#', ' / ', 1) for key in entry['other_rules'])
+            lines.append(f"{entry['kind']} {entry['arn']} is still routed by: {others}")
+        else:
+            lines.append(f"{entry['kind']} {entry['arn']} NO LONGER RECEIVES EVENTS from any rule")
+    return lines
+
+
+def known_scopes(store):
+    """The '<account>/<region>/' scopes of every hub origin indexed so far."""
+    return sorted(store.get_members(SCOPES_KEY))
+
+
+_indexes = {}
+
+
+def get_target_index(store, scope='', events_client=None):
+    """
+    One index per container and origin, so its cache survives warm
+    invocations. The events client is replaced on every call, since a hub
+    origin's client changes whenever its assumed-role credentials are renewed.
+    """
+    if scope not in _indexes:
+        _indexes[scope] = TargetIndex(store, events_client, scope)
+    elif events_client is not None:
+        _indexes[scope].events = events_client
+    return _indexes[scope]
@@ -0,0 +1,56 @@
+from dedupe import EventDeduplicator
+from state_store import SQLiteStore
+
+
+class CountingStore(SQLiteStore):
+    """SQLiteStore that counts the conditional writes reaching it."""
+
+    def __init__(self):
+        super().__init__()
+        self.claims = 0
+
+    def put_if_absent(self, key, value=None, ttl_seconds=None):
+        self.claims += 1
+        return super().put_if_absent(key, value, ttl_seconds)
+
+
+def process(deduplicator, event_ids):
+    """The eventIDs a handler would go on to notify."""
+    return [event_id for event_id in event_ids if not deduplicator.is_duplicate(event_id)]
+
+
+def test_duplicate_event_is_processed_once():
+    store = CountingStore()
+    deduplicator = EventDeduplicator(store)
+
+    assert process(deduplicator, ['a', 'b', 'a', 'a', 'b']) == ['a', 'b']
+    # Repeats are answered by the in-process LRU
+    assert store.claims == 2
+
+
+def test_duplicate_in_another_container_is_processed_once():
+    store = CountingStore()
+
+    first = process(EventDeduplicator(store), ['a'])
+    second = process(EventDeduplicator(store), ['a', 'b'])
+
+    assert first == ['a']
+    assert second == ['b']
+
+
+def test_lru_evicts_oldest_and_falls_back_to_the_store():
+    store = CountingStore()
+    deduplicator = EventDeduplicator(store, max_entries=2)
+
+    assert process(deduplicator, ['a', 'b', 'c', 'a']) == ['a', 'b', 'c']
+    assert list(deduplicator.recent) == ['c', 'a']
+    assert store.claims == 4
+
+
+def test_released_event_is_processed_again():
+    deduplicator = EventDeduplicator(SQLiteStore())
+
+    assert process(deduplicator, ['a']) == ['a']
+    deduplicator.release('a')
+
+    assert process(deduplicator, ['a', 'a']) == ['a']
@@ -0,0 +1,154 @@
+import pytest
+
+from event_patterns import compile_pattern, format_validation, match_events, validate_pattern
+
+EVENT = {
+    'source': 'aws.ec2',
+    'detail-type': 'EC2 Instance State-change Notification',
+    'account': '123456789012',
+    'detail': {
+        'instance-id': 'i-0abc123',
+        'state': 'running',
+        'cpu': 42.5,
+        'tags': ['prod', 'web'],
+        'source-ip': '10.0.3.17',
+        'owner': None,
+        'spot': False,
+        'placement': {'zone': 'us-east-1b'},
+    },
+}
+
+
+def matches(pattern):
+    return compile_pattern(pattern)(EVENT)
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'source': ['aws.ec2']}, True),
+    ({'source': ['aws.ec2', 'aws.rds']}, True),
+    ({'source': ['aws.rds']}, False),
+    ({'detail': {'placement': {'zone': ['us-east-1b']}}}, True),
+    ({'detail': {'tags': ['web']}}, True),
+    ({'detail': {'tags': ['dev']}}, False),
+    ({'detail': {'cpu': [42.5]}}, True),
+    ({'detail': {'owner': [None]}}, True),
+    ({'detail': {'spot': [False]}}, True),
+    ({'detail': {'spot': [0]}}, False),
+])
+def test_exact_values(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'instance-id': [{'prefix': 'i-0'}]}}, True),
+    ({'detail': {'instance-id': [{'prefix': 'i-1'}]}}, False),
+    ({'detail': {'instance-id': [{'prefix': {'equals-ignore-case': 'I-0ABC'}}]}}, True),
+    ({'detail': {'placement': {'zone': [{'suffix': '-1b'}]}}}, True),
+    ({'detail': {'placement': {'zone': [{'suffix': '-1a'}]}}}, False),
+    ({'detail': {'placement': {'zone': [{'suffix': {'equals-ignore-case': '-1B'}}]}}}, True),
+    ({'detail': {'cpu': [{'prefix': '42'}]}}, False),
+])
+def test_prefix_and_suffix(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'state': [{'equals-ignore-case': 'RUNNING'}]}}, True),
+    ({'detail': {'state': [{'equals-ignore-case': 'STOPPED'}]}}, False),
+    ({'detail-type': [{'wildcard': 'EC2 * State-change *'}]}, True),
+    ({'detail-type': [{'wildcard': 'EC2 *.Notification'}]}, False),
+])
+def test_equals_ignore_case_and_wildcard(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'cpu': [{'numeric': ['>', 40]}]}}, True),
+    ({'detail': {'cpu': [{'numeric': ['>', 40, '<=', 42.5]}]}}, True),
+    ({'detail': {'cpu': [{'numeric': ['>=', 0, '<', 42.5]}]}}, False),
+    ({'detail': {'cpu': [{'numeric': ['=', 42.5]}]}}, True),
+    ({'detail': {'state': [{'numeric': ['>', 0]}]}}, False),
+    ({'detail': {'missing': [{'numeric': ['>', 0]}]}}, False),
+])
+def test_numeric(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'state': [{'exists': True}]}}, True),
+    ({'detail': {'missing': [{'exists': True}]}}, False),
+    ({'detail': {'missing': [{'exists': False}]}}, True),
+    ({'detail': {'state': [{'exists': False}]}}, False),
+    # exists matches leaves only, not objects
+    ({'detail': {'placement': [{'exists': True}]}}, False),
+])
+def test_exists(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'state': [{'anything-but': 'stopped'}]}}, True),
+    ({'detail': {'state': [{'anything-but': 'running'}]}}, False),
+    ({'detail': {'state': [{'anything-but': ['stopped', 'running']}]}}, False),
+    ({'detail': {'cpu': [{'anything-but': [0, 100]}]}}, True),
+    ({'detail': {'state': [{'anything-but': {'prefix': 'run'}}]}}, False),
+    ({'detail': {'state': [{'anything-but': {'prefix': 'stop'}}]}}, True),
+    ({'detail': {'state': [{'anything-but': {'suffix': 'ing'}}]}}, False),
+    ({'detail': {'state': [{'anything-but': {'equals-ignore-case': 'RUNNING'}}]}}, False),
+])
+def test_anything_but(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'detail': {'source-ip': [{'cidr': '10.0.0.0/16'}]}}, True),
+    ({'detail': {'source-ip': [{'cidr': '10.0.3.17/32'}]}}, True),
+    ({'detail': {'source-ip': [{'cidr': '192.168.0.0/16'}]}}, False),
+    ({'detail': {'state': [{'cidr': '10.0.0.0/8'}]}}, False),
+])
+def test_cidr(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ({'$or': [{'source': ['aws.rds']}, {'detail': {'state': ['running']}}]}, True),
+    ({'$or': [{'source': ['aws.rds']}, {'detail': {'state': ['stopped']}}]}, False),
+    ({'source': ['aws.ec2'], '$or': [{'detail': {'cpu': [{'numeric': ['>', 90]}]}},
+                                      {'detail': {'tags': ['prod']}}]}, True),
+    ({'source': ['aws.rds'], '$or': [{'detail': {'tags': ['prod']}}, {'detail': {'tags': ['web']}}]}, False),
+])
+def test_or(pattern, expected):
+    assert matches(pattern) is expected
+
+
+@pytest.mark.parametrize('pattern', [
+    '[]',
+    {'source': 'aws.ec2'},
+    {'$or': [{'source': ['aws.ec2']}]},
+    {'detail': {'state': [{'prefix': 'a', 'suffix': 'b'}]}},
+    {'detail': {'state': [{'exists': 'yes'}]}},
+    {'detail': {'cpu': [{'numeric': ['>', 'ten']}]}},
+    {'detail': {'cpu': [{'numeric': ['>']}]}},
+    {'detail': {'state': [{'anything-but': {'wildcard': '*'}}]}},
+    {'detail': {'state': [{'regex': '.*'}]}},
+])
+def test_invalid_patterns_raise(pattern):
+    with pytest.raises(ValueError):
+        compile_pattern(pattern)
+
+
+def test_validate_pattern_reports_unmatched_samples():
+    samples = [EVENT, dict(EVENT, source='aws.rds'), EVENT]
+
+    result = validate_pattern({'source': ['aws.ec2']}, samples)
+
+    assert match_events({'source': ['aws.ec2']}, samples) == [0, 2]
+    assert result == {'total': 3, 'matched': 2, 'unmatched': [1], 'error': None}
+    assert format_validation(result)[0].startswith('PATTERN NO LONGER MATCHES 1 of 3')
+
+
+def test_validate_pattern_reports_invalid_pattern():
+    result = validate_pattern({'source': 'aws.ec2'}, [EVENT])
+
+    assert result['error']
+    assert format_validation(result)[0].startswith('Event pattern is invalid')
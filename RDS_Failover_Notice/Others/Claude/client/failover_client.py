@@ -0,0 +1,153 @@
+"""
+Client helper for application processes: receives the failover messages the
+notification function pushes (see src/push.py) and drops pooled database
+connections as soon as a new writer is promoted, instead of waiting for
+cached DNS and stale connections to time out.
+
+Usage in an application:
+
+    from failover_client import FailoverSubscriber, start_sqs_listener
+
+    subscriber = FailoverSubscriber(cluster_ids=['orders-cluster'])
+    subscriber.register_pool(engine.dispose)  # e.g. a SQLAlchemy engine
+    start_sqs_listener(subscriber, queue_url)  # queue subscribed to the push topic
+
+Local stand-in for the push channel (set FAILOVER_PUSH_TARGET to its URL):
+
+    python failover_client.py --serve 8080
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPE = 'rds-failover'
+
+
+def parse_failover_message(body: Union[str, bytes, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The failover message in an SQS/HTTP body, unwrapping the SNS envelope
+    when raw message delivery is off. None for anything else.
+    """
+    try:
+        message = json.loads(body) if isinstance(body, (str, bytes)) else body
+        if message.get('Type') == 'Notification' and 'Message' in message:
+            message = json.loads(message['Message'])
+    except (ValueError, AttributeError, TypeError):
+        return None
+    if not isinstance(message, dict) or message.get('type') != MESSAGE_TYPE:
+        return None
+    return message
+
+
+class FailoverSubscriber:
+    """
+    Calls the registered callbacks once per failover of the watched clusters
+    or instances (all of them when none are given).
+    """
+
+    def __init__(self, cluster_ids: Optional[Iterable[str]] = None, instance_ids: Optional[Iterable[str]] = None):
+        self.cluster_ids = set(cluster_ids or ())
+        self.instance_ids = set(instance_ids or ())
+        self.callbacks: List[Callable[[Dict[str, Any]], Any]] = []
+        self.seen: set = set()
+        self.lock = threading.Lock()
+
+    def register(self, callback: Callable[[Dict[str, Any]], Any]) -> None:
+        """Call callback(message) on every failover."""
+        self.callbacks.append(callback)
+
+    def register_pool(self, reset: Callable[[], Any]) -> None:
+        """Call reset() on every failover, e.g. a pool's dispose or clear method."""
+        self.callbacks.append(lambda message: reset())
+
+    def watches(self, message: Dict[str, Any]) -> bool:
+        if not self.cluster_ids and not self.instance_ids:
+            return True
+        return message.get('cluster_id') in self.cluster_ids or message.get('instance_id') in self.instance_ids
+
+    def handle(self, body: Union[str, bytes, Dict[str, Any]]) -> bool:
+        """Handle one received body. Returns True if the callbacks ran."""
+        message = parse_failover_message(body)
+        if message is None or not self.watches(message):
+            return False
+
+        # At-least-once delivery: the same failover may arrive more than once
+        key = (message.get('cluster_id'), message.get('instance_id'), message.get('event_time'))
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+
+        logger.warning(f"RDS failover: {message.get('cluster_id') or message.get('instance_id')} "
+                       f"writer is now {message.get('instance_id')} at {message.get('writer_endpoint')}")
+        for callback in self.callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Failover callback failed: {str(e)}")
+        return True
+
+
+def poll_sqs(subscriber: FailoverSubscriber, queue_url: str, sqs_client: Any = None,
+             stop: Optional[threading.Event] = None) -> None:
+    """Long-poll an SQS queue subscribed to the push topic until stop is set."""
+    if sqs_client is None:
+        import boto3
+        sqs_client = boto3.client('sqs')
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            response = sqs_client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=20)
+        except Exception as e:
+            logger.error(f"Could not receive failover messages: {str(e)}")
+            stop.wait(5)
+            continue
+        for sqs_message in response.get('Messages', []):
+            subscriber.handle(sqs_message['Body'])
+            sqs_client.delete_message(QueueUrl=queue_url, ReceiptHandle=sqs_message['ReceiptHandle'])
+
+
+def start_sqs_listener(subscriber: FailoverSubscriber, queue_url: str, sqs_client: Any = None) -> threading.Event:
+    """Run poll_sqs on a daemon thread. Set the returned event to stop it."""
+    stop = threading.Event()
+    threading.Thread(target=poll_sqs, args=(subscriber, queue_url, sqs_client, stop),
+                     name='rds-failover-listener', daemon=True).start()
+    return stop
+
+
+def serve_http(subscriber: FailoverSubscriber, port: int) -> ThreadingHTTPServer:
+    """An HTTP receiver for the push channel's POSTs. Call serve_forever() on the result."""
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            subscriber.handle(body)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer(('127.0.0.1', port), Receiver)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Receive RDS failover push messages')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--serve', type=int, metavar='PORT', help='local HTTP stand-in for the push channel')
+    group.add_argument('--queue', metavar='URL', help='SQS queue subscribed to the push topic')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cli_subscriber = FailoverSubscriber()
+    cli_subscriber.register(lambda message: print(json.dumps(message, indent=2)))
+    if args.serve:
+        print(f"Listening on http://127.0.0.1:{args.serve}/")
+        serve_http(cli_subscriber, args.serve).serve_forever()
+    else:
+        poll_sqs(cli_subscriber, args.queue)
@@ -1,20 +1,51 @@
 import json
-import boto3
 import os
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from aws_clients import lazy_client
+from metrics import MetricSnapshots, format_metric_snapshot, parse_event_time
+from probe import format_probe_results, is_completed_failover, probe_targets, run_probes
+from push import PushChannel, push_failovers, writer_instance
+from topology import ClusterTopologyStore, TopologyCache, format_topology_change
 
 # Configure logging
 log_level = os.environ.get('LOG_LEVEL', 'INFO')
 logging.basicConfig(level=getattr(logging, log_level))
 logger = logging.getLogger(__name__)
 
-# Initialize AWS clients
-sns_client = boto3.client('sns')
-rds_client = boto3.client('rds')
+# AWS clients, created on first use and kept across warm invocations
+sns_client = lazy_client('sns')
+rds_client = lazy_client('rds')
+cloudwatch_client = lazy_client('cloudwatch')
 
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+PROBE_ENDPOINTS = os.environ.get('PROBE_ENDPOINTS', 'false').lower() == 'true'
+PROBE_TIMEOUT_SECONDS = float(os.environ.get('PROBE_TIMEOUT_SECONDS', '15'))
+FAILOVER_PUSH_TARGET = os.environ.get('FAILOVER_PUSH_TARGET')
+TOPOLOGY_TABLE = os.environ.get('TOPOLOGY_TABLE')
+
+# Cluster and instance descriptions, kept across warm invocations
+topology_cache = TopologyCache(
+    rds_client,
+    ttl_seconds=int(os.environ.get('TOPOLOGY_CACHE_TTL_SECONDS', '60'))
+)
+
+# Last known writer/reader roles per cluster, for promotion/demotion diffs
+cluster_topology = ClusterTopologyStore(
+    TOPOLOGY_TABLE,
+    lazy_client('dynamodb') if TOPOLOGY_TABLE else None
+)
+
+# Performance context around each failover, reused by the events of one incident
+metric_snapshots = MetricSnapshots(
+    cloudwatch_client,
+    window_minutes=int(os.environ.get('METRIC_WINDOW_MINUTES', '15'))
+)
+
+# Machine-readable failover messages for application processes
+push_channel = PushChannel(FAILOVER_PUSH_TARGET, sns_client=sns_client) if FAILOVER_PUSH_TARGET else None
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -46,6 +77,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Get additional RDS information
         enhanced_data = enhance_with_rds_info(notification_data)
+        attach_topology_changes([enhanced_data])
+        
+        # Tell applications about the new writer before the slower steps
+        if is_completed_failover(enhanced_data['event_id']):
+            push_failovers(push_channel, [enhanced_data])
+        attach_metric_snapshot(enhanced_data)
+        attach_probe_results([enhanced_data])
         
         # Send SNS notification
         send_notification(enhanced_data, detail_type)
@@ -57,23 +95,90 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         logger.error(f"Error processing event: {str(e)}", exc_info=True)
         return create_response(500, f"Error: {str(e)}")
 
+def batch_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler for RDS failover events buffered in SQS.
+
+    Enriches the whole batch with one describe call per resource type and
+    returns the records whose notification failed as batchItemFailures, so
+    only those are retried.
+    """
+    records = event.get('Records', [])
+    logger.info(f"Received {len(records)} queued RDS event(s)")
+
+    if not SNS_TOPIC_ARN:
+        raise ValueError("SNS_TOPIC_ARN environment variable is not set")
+
+    notifications = []
+    for record in records:
+        try:
+            rds_event = json.loads(record['body'])
+        except (ValueError, KeyError, TypeError) as e:
+            # A malformed message will never parse; drop it rather than retry forever
+            logger.warning(f"Skipping unreadable record {record.get('messageId')}: {str(e)}")
+            continue
+
+        if rds_event.get('source') != 'aws.rds':
+            logger.warning(f"Skipping record {record['messageId']} from unexpected source: {rds_event.get('source')}")
+            continue
+
+        notification_data = extract_failover_info(rds_event.get('detail', {}))
+        if not notification_data:
+            logger.warning(f"Skipping record {record['messageId']}: invalid event data")
+            continue
+        notifications.append((record['messageId'], notification_data, rds_event.get('detail-type')))
+
+    try:
+        topology_cache.prime(
+            cluster_ids=[data['source_id'] for _, data, _ in notifications if data['is_cluster']],
+            instance_ids=[data['source_id'] for _, data, _ in notifications if not data['is_cluster']]
+        )
+    except Exception as e:
+        # Enrichment falls back to per-identifier lookups
+        logger.warning(f"Could not prime RDS topology for the batch: {str(e)}")
+
+    for _, notification_data, _ in notifications:
+        enhance_with_rds_info(notification_data)
+    attach_topology_changes([data for _, data, _ in notifications])
+    push_failovers(push_channel, [data for _, data, _ in notifications if is_completed_failover(data['event_id'])])
+    for _, notification_data, _ in notifications:
+        attach_metric_snapshot(notification_data)
+    attach_probe_results([data for _, data, _ in notifications])
+
+    failures = []
+    for message_id, notification_data, detail_type in notifications:
+        try:
+            send_notification(notification_data, detail_type)
+        except Exception as e:
+            logger.error(f"Notification failed for record {message_id}: {str(e)}")
+            failures.append({'itemIdentifier': message_id})
+
+    logger.info(f"Processed {len(notifications)} failover event(s), {len(failures)} failed")
+    return {'batchItemFailures': failures}
+
 def extract_failover_info(detail: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Extract relevant failover information from the event detail.
+
+    RDS events identify the resource in SourceIdentifier, with SourceType
+    CLUSTER for DB clusters and DB_INSTANCE for instances.
     """
     try:
-        source_id = detail.get('SourceId', 'Unknown')
+        source_arn = detail.get('SourceArn', '')
+        source_id = detail.get('SourceIdentifier') or source_arn.split(':')[-1] or 'Unknown'
+        event_id = detail.get('EventID')
         source_type = detail.get('SourceType', 'Unknown')
         event_categories = detail.get('EventCategories', [])
         message = detail.get('Message', 'No message available')
         event_time = detail.get('Date', datetime.utcnow().isoformat())
         
         # Determine if it's a cluster or instance failover
-        is_cluster = source_type == 'db-cluster'
+        is_cluster = source_type in ('CLUSTER', 'db-cluster')
         resource_type = 'DB Cluster' if is_cluster else 'DB Instance'
         
         return {
             'source_id': source_id,
+            'event_id': event_id,
             'source_type': source_type,
             'resource_type': resource_type,
             'event_categories': event_categories,
@@ -94,9 +199,12 @@ def enhance_with_rds_info(notification_data: Dict[str, Any]) -> Dict[str, Any]:
         is_cluster = notification_data['is_cluster']
         
         if is_cluster:
-            # Get cluster information
-            response = rds_client.describe_db_clusters(DBClusterIdentifier=source_id)
-            cluster = response['DBClusters'][0]
+            # Get cluster information, described after the event so it shows the new writer
+            event_epoch = parse_event_time(notification_data['event_time']).timestamp()
+            cluster = topology_cache.get_cluster(source_id, fetched_after=event_epoch)
+            if cluster is None:
+                logger.warning(f"DB cluster {source_id} not found")
+                return notification_data
             
             notification_data.update({
                 'engine': cluster.get('Engine', 'Unknown'),
@@ -105,13 +213,17 @@ def enhance_with_rds_info(notification_data: Dict[str, Any]) -> Dict[str, Any]:
                 'availability_zones': cluster.get('AvailabilityZones', []),
                 'cluster_members': [member['DBInstanceIdentifier'] 
                                   for member in cluster.get('DBClusterMembers', [])],
+                'writer_instance': writer_instance(cluster),
                 'writer_endpoint': cluster.get('Endpoint'),
-                'reader_endpoint': cluster.get('ReaderEndpoint')
+                'reader_endpoint': cluster.get('ReaderEndpoint'),
+                'port': cluster.get('Port')
             })
         else:
             # Get instance information
-            response = rds_client.describe_db_instances(DBInstanceIdentifier=source_id)
-            instance = response['DBInstances'][0]
+            instance = topology_cache.get_instance(source_id)
+            if instance is None:
+                logger.warning(f"DB instance {source_id} not found")
+                return notification_data
             
             notification_data.update({
                 'engine': instance.get('Engine', 'Unknown'),
@@ -119,7 +231,9 @@ def enhance_with_rds_info(notification_data: Dict[str, Any]) -> Dict[str, Any]:
                 'status': instance.get('DBInstanceStatus', 'Unknown'),
                 'availability_zone': instance.get('AvailabilityZone', 'Unknown'),
                 'instance_class': instance.get('DBInstanceClass', 'Unknown'),
-                'endpoint': instance.get('Endpoint', {}).get('Address') if instance.get('Endpoint') else None
+                'cluster_id': instance.get('DBClusterIdentifier'),
+                'endpoint': instance.get('Endpoint', {}).get('Address') if instance.get('Endpoint') else None,
+                'port': instance.get('Endpoint', {}).get('Port') if instance.get('Endpoint') else None
             })
             
     except Exception as e:
@@ -128,6 +242,79 @@ def enhance_with_rds_info(notification_data: Dict[str, Any]) -> Dict[str, Any]:
         
     return notification_data
 
+def attach_topology_changes(notifications: List[Dict[str, Any]]) -> None:
+    """
+    Diff each cluster's writer/reader roles against the last recorded topology
+    once per batch and attach the diff to the latest event completing its
+    failover. Clusters without such an event only record a baseline topology
+    if none is recorded yet, so the completing event still has one to diff.
+    """
+    clusters: Dict[str, List[Dict[str, Any]]] = {}
+    for data in notifications:
+        if data['is_cluster'] and 'cluster_members' in data:
+            clusters.setdefault(data['source_id'], []).append(data)
+
+    for cluster_id, events in clusters.items():
+        try:
+            cluster = topology_cache.get_cluster(cluster_id)
+            if cluster is None:
+                continue
+            members = cluster.get('DBClusterMembers', [])
+            captured_at = topology_cache.cluster_fetched_at(cluster_id)
+            completing = [data for data in events if is_completed_failover(data['event_id'])]
+            if completing:
+                latest = max(completing, key=lambda data: data['event_time'])
+                latest['topology_change'] = cluster_topology.update(cluster_id, members, captured_at)
+            else:
+                cluster_topology.record(cluster_id, members, captured_at)
+        except Exception as e:
+            logger.warning(f"Could not compare the topology of {cluster_id}: {str(e)}")
+
+def attach_metric_snapshot(notification_data: Dict[str, Any]) -> None:
+    """
+    Add min/max/p95 of the key RDS metrics for the cluster's members (or the
+    instance) before and after the event time.
+    """
+    source_id = notification_data['source_id']
+    if 'engine' not in notification_data:
+        # Not described (unknown or deleted resource): there is nothing to query
+        return
+    if notification_data['is_cluster']:
+        instance_ids = notification_data.get('cluster_members', [])
+    else:
+        instance_ids = [source_id]
+    if not instance_ids:
+        return
+
+    try:
+        notification_data['metric_snapshot'] = metric_snapshots.snapshot(
+            source_id, instance_ids, parse_event_time(notification_data['event_time'])
+        )
+    except Exception as e:
+        logger.warning(f"Could not get metric snapshot for {source_id}: {str(e)}")
+
+def attach_probe_results(notifications: List[Dict[str, Any]]) -> None:
+    """
+    When endpoint probing is enabled, probe the endpoints of every completed
+    failover concurrently and add the timings to its notification data.
+    """
+    if not PROBE_ENDPOINTS:
+        return
+    targets = {id(data): probe_targets(data) for data in notifications
+               if is_completed_failover(data.get('event_id'))}
+    endpoints = sorted({endpoint for pairs in targets.values() for endpoint in pairs})
+    if not endpoints:
+        return
+
+    try:
+        results = dict(zip(endpoints, run_probes(endpoints, timeout_seconds=PROBE_TIMEOUT_SECONDS)))
+    except Exception as e:
+        logger.warning(f"Could not probe endpoints: {str(e)}")
+        return
+    for data in notifications:
+        if targets.get(id(data)):
+            data['probe_results'] = [results[endpoint] for endpoint in targets[id(data)]]
+
 def send_notification(notification_data: Dict[str, Any], event_type: str) -> None:
     """
     Send SNS notification with failover information.
@@ -198,8 +385,15 @@ Cluster Configuration:
 ---------------------
 • Availability Zones: {', '.join(data.get('availability_zones', []))}
 • Cluster Members: {', '.join(data.get('cluster_members', []))}
+• Writer Instance: {data.get('writer_instance') or 'N/A'}
 • Writer Endpoint: {data.get('writer_endpoint', 'N/A')}
 • Reader Endpoint: {data.get('reader_endpoint', 'N/A')}
+"""
+        if data.get('topology_change'):
+            message += f"""
+Writer/Reader Changes:
+----------------------
+{format_topology_change(data['topology_change'])}
 """
     else:
         message += f"""
@@ -208,6 +402,20 @@ Instance Configuration:
 • Availability Zone: {data.get('availability_zone', 'Unknown')}
 • Instance Class: {data.get('instance_class', 'Unknown')}
 • Endpoint: {data.get('endpoint', 'N/A')}
+"""
+    
+    if data.get('metric_snapshot'):
+        message += f"""
+Performance Around the Event:
+-----------------------------
+{format_metric_snapshot(data['metric_snapshot'])}
+"""
+    
+    if data.get('probe_results'):
+        message += f"""
+Endpoint Reachability:
+----------------------
+{format_probe_results(data['probe_results'])}
 """
     
     message += f"""
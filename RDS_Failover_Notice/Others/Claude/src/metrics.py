@@ -0,0 +1,149 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (metric name, unit shown in the email)
+SNAPSHOT_METRICS = [
+    ('DatabaseConnections', ''),
+    ('CPUUtilization', '%'),
+    ('AuroraReplicaLag', ' ms'),
+    ('CommitLatency', ' ms'),
+    ('ReadLatency', ' s'),
+    ('WriteLatency', ' s'),
+    ('FreeableMemory', ' bytes'),
+]
+
+# GetMetricData accepts up to 500 queries per call
+MAX_QUERIES = 500
+
+
+def parse_event_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    return {'min': min(values), 'max': max(values), 'p95': percentile(values, 0.95)}
+
+
+class MetricSnapshots:
+    """
+    CloudWatch metrics for every instance of a failed-over cluster (or the
+    instance itself) in a window around the event, summarized before and
+    after the event time, from one batched get_metric_data call.
+
+    Snapshots are cached per source and member instances for cache_seconds,
+    so the several events of one failover reuse a single call as long as
+    they fall in its window.
+    A snapshot whose window ended before an event's time (it was fetched
+    before the event happened) is never reused for it, since it has no data
+    after that event.
+    """
+
+    def __init__(self, cloudwatch_client: Any, window_minutes: int = 15, period_seconds: int = 60,
+                 cache_seconds: int = 300):
+        self.cloudwatch = cloudwatch_client
+        self.window = timedelta(minutes=window_minutes)
+        self.period_seconds = period_seconds
+        self.cache_seconds = cache_seconds
+        self.cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[float, datetime, Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+
+    def snapshot(self, source_id: str, instance_ids: List[str], event_time: datetime) -> Dict[str, Any]:
+        """
+        {'event_time', 'start', 'end', 'instances': {instance: {metric: {'before': summary, 'after': summary}}}}
+        where each summary has min, max and p95, or is None without datapoints.
+        """
+        # A cluster whose membership changed needs a new query
+        key = (source_id, tuple(sorted(instance_ids)))
+        with self.lock:
+            cached = self.cache.get(key)
+        if (cached and cached[0] > time.monotonic() and abs(cached[1] - event_time) <= self.window
+                and cached[2]['end'] >= event_time):
+            logger.info(f"Reusing metric snapshot for {source_id}")
+            return cached[2]
+
+        snapshot = self._fetch(instance_ids, event_time)
+        with self.lock:
+            self.cache[key] = (time.monotonic() + self.cache_seconds, event_time, snapshot)
+        return snapshot
+
+    def _fetch(self, instance_ids: List[str], event_time: datetime) -> Dict[str, Any]:
+        start = event_time - self.window
+        end = min(event_time + self.window, datetime.now(timezone.utc))
+        pairs = [(instance_id, metric) for instance_id in instance_ids for metric, _ in SNAPSHOT_METRICS]
+        if len(pairs) > MAX_QUERIES:
+            logger.warning(f"Metric snapshot limited to the first {MAX_QUERIES} of {len(pairs)} queries")
+            pairs = pairs[:MAX_QUERIES]
+        queries = {}
+        for index, (instance_id, metric) in enumerate(pairs):
+            queries[f"m{index}"] = (instance_id, metric, {
+                'Id': f"m{index}",
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/RDS',
+                        'MetricName': metric,
+                        'Dimensions': [{'Name': 'DBInstanceIdentifier', 'Value': instance_id}]
+                    },
+                    'Period': self.period_seconds,
+                    'Stat': 'Average'
+                },
+                'ReturnData': True
+            })
+
+        values: Dict[str, Tuple[List[float], List[float]]] = {query_id: ([], []) for query_id in queries}
+        paginator = self.cloudwatch.get_paginator('get_metric_data')
+        for page in paginator.paginate(MetricDataQueries=[query for _, _, query in queries.values()],
+                                       StartTime=start, EndTime=end):
+            for result in page['MetricDataResults']:
+                before, after = values[result['Id']]
+                for timestamp, value in zip(result['Timestamps'], result['Values']):
+                    (before if timestamp < event_time else after).append(value)
+
+        instances: Dict[str, Dict[str, Any]] = {}
+        for query_id, (instance_id, metric, _) in queries.items():
+            before, after = values[query_id]
+            instances.setdefault(instance_id, {})[metric] = {'before': summarize(before), 'after': summarize(after)}
+        return {'event_time': event_time, 'start': start, 'end': end, 'instances': instances}
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == ' s':
+        return f"{value * 1000:.1f} ms"
+    if unit == ' bytes':
+        return f"{value / 1024 ** 3:.2f} GiB"
+    return f"{value:.4g}{unit}"
+
+
+def format_summary(summary: Optional[Dict[str, float]], unit: str) -> str:
+    if summary is None:
+        return 'no data'
+    return '/'.join(format_value(summary[key], unit) for key in ('min', 'max', 'p95'))
+
+
+def format_metric_snapshot(snapshot: Dict[str, Any]) -> str:
+    """Email section: min/max/p95 per instance and metric, before and after the event."""
+    lines = [f"Window: {snapshot['start']:%H:%M} to {snapshot['end']:%H:%M} UTC, "
+             f"event at {snapshot['event_time']:%H:%M:%S} (values are min/max/p95)"]
+    for instance_id, metrics in sorted(snapshot['instances'].items()):
+        lines.append(f"• {instance_id}")
+        for metric, unit in SNAPSHOT_METRICS:
+            summaries = metrics.get(metric)
+            if not summaries or (summaries['before'] is None and summaries['after'] is None):
+                continue
+            lines.append(f"  - {metric}: before {format_summary(summaries['before'], unit)}, "
+                         f"after {format_summary(summaries['after'], unit)}")
+    return '\n'.join(lines)
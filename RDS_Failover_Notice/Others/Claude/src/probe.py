@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import socket
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Resolves (host, port) to a list of IP addresses
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+# https://docs.aws.amazon.com/AmazonRDS/latest/AuroraUserGuide/USER_Events.Messages.html
+COMPLETED_FAILOVER_EVENTS = {
+    'RDS-EVENT-0071',  # Completed failover to DB instance
+    'RDS-EVENT-0049',  # Multi-AZ instance failover completed
+    'RDS-EVENT-0088',  # DB instance started, a Multi-AZ failover has completed
+}
+
+
+async def system_resolver(host: str, port: int) -> List[str]:
+    """Resolve through the event loop's getaddrinfo, de-duplicated and sorted."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return sorted({info[4][0] for info in infos})
+
+
+async def probe_endpoint(
+    host: str,
+    port: int,
+    resolver: Resolver = system_resolver,
+    timeout_seconds: float = 15,
+    interval_seconds: float = 1,
+    connect_timeout_seconds: float = 2
+) -> Dict[str, Any]:
+    """
+    Resolve the endpoint and try a TCP connect every interval_seconds until a
+    connect succeeds or timeout_seconds pass.
+
+    Returns the first and last resolved addresses and, in seconds from the
+    start of the probe, when the resolved addresses first changed and when
+    the first connect succeeded (None if they did not happen in time).
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout_seconds
+    result: Dict[str, Any] = {
+        'endpoint': host,
+        'port': port,
+        'initial_addresses': None,
+        'addresses': None,
+        'address_changed_after': None,
+        'connected_after': None,
+        'connect_latency_ms': None,
+        'attempts': 0,
+        'last_error': None
+    }
+
+    while True:
+        result['attempts'] += 1
+        attempt_started = loop.time()
+        try:
+            addresses = await asyncio.wait_for(resolver(host, port), max(deadline - attempt_started, 0.001))
+            if result['initial_addresses'] is None:
+                result['initial_addresses'] = addresses
+            elif addresses != result['addresses'] and result['address_changed_after'] is None:
+                result['address_changed_after'] = round(loop.time() - started, 3)
+            result['addresses'] = addresses
+
+            connect_timeout = min(connect_timeout_seconds, max(deadline - loop.time(), 0.001))
+            connect_started = loop.time()
+            _, writer = await asyncio.wait_for(asyncio.open_connection(addresses[0], port), connect_timeout)
+            result['connect_latency_ms'] = round((loop.time() - connect_started) * 1000, 1)
+            result['connected_after'] = round(loop.time() - started, 3)
+            result['last_error'] = None
+            writer.close()
+            await writer.wait_closed()
+            return result
+        except (OSError, IndexError, asyncio.TimeoutError) as e:
+            result['last_error'] = f"{type(e).__name__}: {str(e)}" if str(e) else type(e).__name__
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return result
+        await asyncio.sleep(min(max(interval_seconds - (loop.time() - attempt_started), 0), remaining))
+
+
+async def probe_endpoints(endpoints: List[Tuple[str, int]], **options: Any) -> List[Dict[str, Any]]:
+    """Probe all endpoints concurrently."""
+    return list(await asyncio.gather(*(probe_endpoint(host, port, **options) for host, port in endpoints)))
+
+
+def run_probes(endpoints: List[Tuple[str, int]], **options: Any) -> List[Dict[str, Any]]:
+    """Synchronous entry point for the Lambda handler."""
+    results = asyncio.run(probe_endpoints(endpoints, **options))
+    for result in results:
+        logger.info(f"Endpoint probe: {result}")
+    return results
+
+
+def probe_targets(data: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """The (host, port) pairs to probe from enriched notification data."""
+    port = data.get('port')
+    if not port:
+        return []
+    hosts = [data.get('writer_endpoint'), data.get('reader_endpoint')] if data['is_cluster'] else [data.get('endpoint')]
+    return [(host, port) for host in hosts if host]
+
+
+def format_probe_results(results: List[Dict[str, Any]]) -> str:
+    """Email section describing when each endpoint became reachable."""
+    lines = []
+    for result in results:
+        lines.append(f"• {result['endpoint']}:{result['port']}")
+        lines.append(f"  - Resolved: {', '.join(result['addresses'] or []) or 'not resolved'}")
+        if result['address_changed_after'] is not None:
+            lines.append(f"  - Address changed from {', '.join(result['initial_addresses'])} "
+                         f"after {result['address_changed_after']}s")
+        if result['connected_after'] is not None:
+            lines.append(f"  - TCP connect succeeded after {result['connected_after']}s "
+                         f"({result['connect_latency_ms']} ms)")
+        else:
+            lines.append(f"  - Not reachable after {result['attempts']} attempt(s): {result['last_error']}")
+    return '\n'.join(lines)
+
+
+def is_completed_failover(event_id: Optional[str]) -> bool:
+    return event_id in COMPLETED_FAILOVER_EVENTS
@@ -0,0 +1,83 @@
+import json
+import logging
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import aws_clients
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPE = 'rds-failover'
+MESSAGE_VERSION = 1
+
+
+def writer_instance(cluster: Dict[str, Any]) -> Optional[str]:
+    """The identifier of the cluster member that is currently the writer."""
+    for member in cluster.get('DBClusterMembers', []):
+        if member.get('IsClusterWriter'):
+            return member['DBInstanceIdentifier']
+    return None
+
+
+def build_push_message(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact, machine-readable failover message from enriched notification data."""
+    return {
+        'type': MESSAGE_TYPE,
+        'version': MESSAGE_VERSION,
+        'event_id': data.get('event_id'),
+        'event_time': data['event_time'],
+        'source_type': data['source_type'],
+        'cluster_id': data['source_id'] if data['is_cluster'] else data.get('cluster_id'),
+        'instance_id': data.get('writer_instance') if data['is_cluster'] else data['source_id'],
+        'writer_endpoint': data.get('writer_endpoint') if data['is_cluster'] else data.get('endpoint'),
+        'reader_endpoint': data.get('reader_endpoint'),
+        'port': data.get('port')
+    }
+
+
+class PushChannel:
+    """
+    Publishes failover messages to application processes.
+
+    The target is an SNS topic ARN (subscribe SQS queues or HTTP endpoints
+    with raw message delivery), an SQS queue URL, or an http(s) URL such as
+    a local stand-in (see client/failover_client.py --serve).
+    """
+
+    def __init__(self, target: str, sns_client: Any = None, sqs_client: Any = None, timeout_seconds: float = 2):
+        self.target = target
+        self.sns_client = sns_client
+        self.sqs_client = sqs_client
+        self.timeout_seconds = timeout_seconds
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        body = json.dumps(message, separators=(',', ':'))
+        if self.target.startswith('arn:'):
+            self.sns_client = self.sns_client or aws_clients.client('sns')
+            self.sns_client.publish(
+                TopicArn=self.target,
+                Message=body,
+                MessageAttributes={'type': {'DataType': 'String', 'StringValue': MESSAGE_TYPE}}
+            )
+        elif self.target.startswith('https://sqs.'):
+            self.sqs_client = self.sqs_client or aws_clients.client('sqs')
+            self.sqs_client.send_message(QueueUrl=self.target, MessageBody=body)
+        else:
+            request = urllib.request.Request(
+                self.target, data=body.encode('utf-8'), method='POST',
+                headers={'Content-Type': 'application/json'}
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+                response.read()
+        logger.info(f"Failover pushed to {self.target}: {body}")
+
+
+def push_failovers(channel: Optional[PushChannel], notifications: List[Dict[str, Any]]) -> None:
+    """Push one message per enriched notification; failures never block the email/SMS path."""
+    if channel is None:
+        return
+    for data in notifications:
+        try:
+            channel.publish(build_push_message(data))
+        except Exception as e:
+            logger.warning(f"Could not push failover for {data['source_id']}: {str(e)}")
@@ -0,0 +1,288 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Identifiers per describe_db_clusters/describe_db_instances filter
+MAX_FILTER_VALUES = 100
+
+
+class TopologyCache:
+    """
+    Module-scope cache of RDS cluster and instance descriptions.
+
+    Entries expire after ttl_seconds (identifiers that were not found after
+    negative_ttl_seconds). The first miss in a container pre-loads every
+    cluster and instance in the region with one paginated call each, so a
+    failover storm across many clusters costs two listings instead of one
+    describe per event. Concurrent lookups of the same key share a single
+    in-flight call.
+    """
+
+    REGION_KEY = ('region', '*')
+
+    def __init__(self, rds_client: Any, ttl_seconds: int = 300, negative_ttl_seconds: int = 30):
+        self.rds_client = rds_client
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # key -> (monotonic expiry, wall-clock fetch time, description)
+        self.entries: Dict[Hashable, Tuple[float, float, Optional[Dict[str, Any]]]] = {}
+        self.in_flight: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+
+    def get_cluster(self, cluster_id: str, fetched_after: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        The DBClusters entry for the identifier, or None if it does not exist.
+        With fetched_after (epoch seconds), a cached entry fetched earlier is
+        refreshed: by the region pre-load in a cold container, otherwise with
+        a single describe call.
+        """
+        key = ('cluster', cluster_id)
+        if fetched_after is None:
+            return self._get(key, lambda: self._describe_cluster(cluster_id))
+        if self._fetched_at(key) < fetched_after:
+            self._preload_once()
+        if self._fetched_at(key) >= fetched_after:
+            return self._lookup(key)[1]
+        return self._single_flight(key, lambda: self._describe_cluster(cluster_id))
+
+    def get_instance(self, instance_id: str) -> Optional[Dict[str, Any]]:
+        """The DBInstances entry for the identifier, or None if it does not exist."""
+        return self._get(('instance', instance_id), lambda: self._describe_instance(instance_id))
+
+    def preload(self) -> int:
+        """Cache every cluster and instance in the region. Returns the number cached."""
+        return self._single_flight(self.REGION_KEY, self._load_region)
+
+    def prime(self, cluster_ids: Iterable[str] = (), instance_ids: Iterable[str] = ()) -> None:
+        """
+        Cache the given clusters and instances with one filtered, paginated
+        describe call per resource type, skipping identifiers already cached.
+        Identifiers the call does not return are cached as not found.
+        """
+        for kind, identifiers, operation, filter_name, result_key, id_key in (
+            ('cluster', cluster_ids, 'describe_db_clusters', 'db-cluster-id', 'DBClusters', 'DBClusterIdentifier'),
+            ('instance', instance_ids, 'describe_db_instances', 'db-instance-id', 'DBInstances', 'DBInstanceIdentifier'),
+        ):
+            missing = sorted({identifier for identifier in identifiers if not self._lookup((kind, identifier))[0]})
+            for start in range(0, len(missing), MAX_FILTER_VALUES):
+                chunk = missing[start:start + MAX_FILTER_VALUES]
+                found = set()
+                pages = self.rds_client.get_paginator(operation).paginate(
+                    Filters=[{'Name': filter_name, 'Values': chunk}]
+                )
+                for page in pages:
+                    for resource in page[result_key]:
+                        self._store((kind, resource[id_key]), resource)
+                        found.add(resource[id_key])
+                for identifier in set(chunk) - found:
+                    self._store((kind, identifier), None)
+                logger.info(f"Primed {len(found)} of {len(chunk)} {kind}(s) in one {operation} call")
+
+    def _get(self, key: Tuple[str, str], loader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        hit, value = self._lookup(key)
+        if hit:
+            return value
+        if self._preload_once():
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+        return self._single_flight(key, loader)
+
+    def _preload_once(self) -> bool:
+        """Pre-load the region unless it already was. Returns True if it ran now."""
+        if self._lookup(self.REGION_KEY)[0]:
+            return False
+        # Cold container: a storm is likely, so fetch the whole region once
+        try:
+            self.preload()
+        except Exception as e:
+            logger.warning(f"Could not pre-load RDS topology: {str(e)}")
+        return True
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return True, entry[2]
+        return False, None
+
+    def cluster_fetched_at(self, cluster_id: str) -> float:
+        """Epoch seconds the cached cluster description was fetched (0 if not cached)."""
+        return self._fetched_at(('cluster', cluster_id))
+
+    def _fetched_at(self, key: Hashable) -> float:
+        """When a still-valid entry was fetched, or 0 if there is none."""
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry[1] if entry and entry[0] > time.monotonic() else 0
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, time.time(), value)
+
+    def _single_flight(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self.lock:
+            flight = self.in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = Future()
+                self.in_flight[key] = flight
+        if not owner:
+            return flight.result()
+
+        try:
+            value = loader()
+            self._store(key, value)
+            flight.set_result(value)
+            return value
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def _load_region(self) -> int:
+        count = 0
+        for page in self.rds_client.get_paginator('describe_db_clusters').paginate():
+            for cluster in page['DBClusters']:
+                self._store(('cluster', cluster['DBClusterIdentifier']), cluster)
+                count += 1
+        for page in self.rds_client.get_paginator('describe_db_instances').paginate():
+            for instance in page['DBInstances']:
+                self._store(('instance', instance['DBInstanceIdentifier']), instance)
+                count += 1
+        logger.info(f"Pre-loaded RDS topology: {count} clusters and instances")
+        return count
+
+    def _describe_cluster(self, cluster_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.rds_client.describe_db_clusters(DBClusterIdentifier=cluster_id)['DBClusters'][0]
+        except self.rds_client.exceptions.DBClusterNotFoundFault:
+            return None
+
+    def _describe_instance(self, instance_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.rds_client.describe_db_instances(DBInstanceIdentifier=instance_id)['DBInstances'][0]
+        except self.rds_client.exceptions.DBInstanceNotFoundFault:
+            return None
+
+
+def cluster_roles(members: List[Dict[str, Any]]) -> Dict[str, str]:
+    """{instance id: 'writer' or 'reader'} from DBClusterMembers."""
+    return {member['DBInstanceIdentifier']: 'writer' if member.get('IsClusterWriter') else 'reader'
+            for member in members}
+
+
+def topology_diff(previous: Optional[Dict[str, Any]], roles: Dict[str, str]) -> Dict[str, Any]:
+    """Promotions, demotions and membership changes between the stored and current roles."""
+    writers = sorted(instance for instance, role in roles.items() if role == 'writer')
+    if previous is None:
+        return {'known': False, 'current_writers': writers}
+
+    before = previous['roles']
+    return {
+        'known': True,
+        'captured_at': previous['captured_at'],
+        'previous_writers': sorted(instance for instance, role in before.items() if role == 'writer'),
+        'current_writers': writers,
+        'promoted': sorted(instance for instance, role in roles.items()
+                           if role == 'writer' and before.get(instance) != 'writer'),
+        'demoted': sorted(instance for instance, role in before.items()
+                          if role == 'writer' and roles.get(instance) != 'writer'),
+        'added': sorted(set(roles) - set(before)),
+        'removed': sorted(set(before) - set(roles))
+    }
+
+
+class ClusterTopologyStore:
+    """
+    Last known writer/reader roles per cluster, kept in DynamoDB (partition
+    key 'pk') when a table name is given, otherwise in memory. The table is
+    read on every lookup, as other containers record failovers too. A stored
+    topology is only replaced by one captured later, so out-of-order events
+    cannot roll it back.
+    """
+
+    def __init__(self, table_name: Optional[str] = None, dynamodb_client: Any = None):
+        self.table_name = table_name
+        self.dynamodb = dynamodb_client
+        self.memory: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, cluster_id: str) -> Optional[Dict[str, Any]]:
+        if not self.table_name:
+            with self.lock:
+                return self.memory.get(cluster_id)
+        item = self.dynamodb.get_item(
+            TableName=self.table_name, Key={'pk': {'S': cluster_id}}, ConsistentRead=True
+        ).get('Item')
+        if item is None:
+            return None
+        return {'roles': json.loads(item['roles']['S']), 'captured_at': float(item['captured_at']['N'])}
+
+    def put(self, cluster_id: str, roles: Dict[str, str], captured_at: float, if_absent: bool = False) -> bool:
+        """
+        Store the roles unless a topology captured later is stored (or, with
+        if_absent, any topology is). Returns True if they were stored.
+        """
+        if not self.table_name:
+            with self.lock:
+                stored = self.memory.get(cluster_id)
+                if stored is not None and (if_absent or stored['captured_at'] > captured_at):
+                    return False
+                self.memory[cluster_id] = {'roles': roles, 'captured_at': captured_at}
+            return True
+
+        condition = {'ConditionExpression': 'attribute_not_exists(pk)'} if if_absent else {
+            'ConditionExpression': 'attribute_not_exists(pk) OR captured_at < :captured_at',
+            'ExpressionAttributeValues': {':captured_at': {'N': str(captured_at)}}
+        }
+        try:
+            self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item={'pk': {'S': cluster_id}, 'roles': {'S': json.dumps(roles)},
+                      'captured_at': {'N': str(captured_at)}},
+                **condition
+            )
+            return True
+        except self.dynamodb.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def record(self, cluster_id: str, members: List[Dict[str, Any]], captured_at: float) -> None:
+        """Store the members as the cluster's baseline if no topology is recorded yet."""
+        self.put(cluster_id, cluster_roles(members), captured_at, if_absent=True)
+
+    def update(self, cluster_id: str, members: List[Dict[str, Any]], captured_at: float) -> Dict[str, Any]:
+        """Diff the members against the last recorded topology, then store them as the latest."""
+        roles = cluster_roles(members)
+        diff = topology_diff(self.get(cluster_id), roles)
+        if not self.put(cluster_id, roles, captured_at):
+            logger.info(f"Kept the newer stored topology for {cluster_id}")
+        return diff
+
+
+def format_topology_change(diff: Dict[str, Any]) -> str:
+    """Email lines describing writer changes since the last known topology."""
+    current = ', '.join(diff['current_writers']) or 'none'
+    if not diff['known']:
+        return f"• Writer: {current} (no earlier topology recorded)"
+
+    lines = [f"• Previous Writer: {', '.join(diff['previous_writers']) or 'none'}",
+             f"• Current Writer: {current}"]
+    if diff['promoted'] or diff['demoted']:
+        lines.append(f"• Promoted to writer: {', '.join(diff['promoted']) or 'none'}")
+        lines.append(f"• Demoted to reader: {', '.join(diff['demoted']) or 'none'}")
+    else:
+        lines.append("• Writer unchanged since the last recorded topology")
+    if diff['added']:
+        lines.append(f"• Members added: {', '.join(diff['added'])}")
+    if diff['removed']:
+        lines.append(f"• Members removed: {', '.join(diff['removed'])}")
+    return '\n'.join(lines)
@@ -0,0 +1,34 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The function's modules are imported as the Lambda runtime does, from src/
+# and the shared runtime layer; tests import the fakes from tests/
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+sys.path.insert(0, os.path.join(ROOT, '..', '..', '..', 'Shared_Runtime'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """The handler module with its AWS clients and stores replaced by fakes."""
+    import handler
+    from fakes import FakeChannel, FakeCloudWatch, FakeRDS, FakeSNS
+    from metrics import MetricSnapshots
+    from topology import ClusterTopologyStore, TopologyCache
+
+    fakes = SimpleNamespace(handler=handler, rds=FakeRDS(), sns=FakeSNS(),
+                            cloudwatch=FakeCloudWatch(), channel=FakeChannel())
+    monkeypatch.setattr(handler, 'SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:123456789012:rds-failover')
+    monkeypatch.setattr(handler, 'PROBE_ENDPOINTS', False)
+    monkeypatch.setattr(handler, 'sns_client', fakes.sns)
+    monkeypatch.setattr(handler, 'topology_cache', TopologyCache(fakes.rds))
+    monkeypatch.setattr(handler, 'cluster_topology', ClusterTopologyStore())
+    monkeypatch.setattr(handler, 'metric_snapshots', MetricSnapshots(fakes.cloudwatch))
+    monkeypatch.setattr(handler, 'push_channel', fakes.channel)
+    return fakes
@@ -0,0 +1,152 @@
+"""Stand-ins for the AWS clients the handler uses, and real-shaped RDS data."""
+from datetime import datetime, timedelta, timezone
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return self.pages(**kwargs) if callable(self.pages) else self.pages
+
+
+class FakeRDS:
+    """describe_db_clusters/describe_db_instances over fixed descriptions."""
+
+    class exceptions:
+        class DBClusterNotFoundFault(Exception):
+            pass
+
+        class DBInstanceNotFoundFault(Exception):
+            pass
+
+    def __init__(self, clusters=(), instances=()):
+        self.clusters = list(clusters)
+        self.instances = list(instances)
+        self.calls = []
+
+    def describe_db_clusters(self, DBClusterIdentifier):
+        self.calls.append(('describe_db_clusters', DBClusterIdentifier))
+        for cluster in self.clusters:
+            if cluster['DBClusterIdentifier'] == DBClusterIdentifier:
+                return {'DBClusters': [cluster]}
+        raise self.exceptions.DBClusterNotFoundFault(DBClusterIdentifier)
+
+    def describe_db_instances(self, DBInstanceIdentifier):
+        self.calls.append(('describe_db_instances', DBInstanceIdentifier))
+        for instance in self.instances:
+            if instance['DBInstanceIdentifier'] == DBInstanceIdentifier:
+                return {'DBInstances': [instance]}
+        raise self.exceptions.DBInstanceNotFoundFault(DBInstanceIdentifier)
+
+    def get_paginator(self, operation):
+        self.calls.append((operation, None))
+        if operation == 'describe_db_clusters':
+            return FakePaginator([{'DBClusters': self.clusters}])
+        return FakePaginator([{'DBInstances': self.instances}])
+
+
+class FakeCloudWatch:
+    """get_metric_data returning the same datapoints for every query."""
+
+    def __init__(self, timestamps=(), values=()):
+        self.timestamps = list(timestamps)
+        self.values = list(values)
+        self.requests = []
+
+    def get_paginator(self, operation):
+        def pages(MetricDataQueries, StartTime, EndTime):
+            self.requests.append(MetricDataQueries)
+            return [{'MetricDataResults': [
+                {'Id': query['Id'], 'Timestamps': self.timestamps, 'Values': self.values}
+                for query in MetricDataQueries
+            ]}]
+        return FakePaginator(pages)
+
+
+class FakeSNS:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, **kwargs):
+        self.published.append(kwargs)
+        return {'MessageId': str(len(self.published))}
+
+
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, message):
+        self.messages.append(message)
+
+
+def aurora_cluster(cluster_id, writer, readers):
+    """A describe_db_clusters entry for an Aurora cluster."""
+    members = [{'DBInstanceIdentifier': writer, 'IsClusterWriter': True}]
+    members += [{'DBInstanceIdentifier': reader, 'IsClusterWriter': False} for reader in readers]
+    return {
+        'DBClusterIdentifier': cluster_id,
+        'Engine': 'aurora-mysql',
+        'EngineVersion': '8.0.mysql_aurora.3.05.2',
+        'Status': 'available',
+        'AvailabilityZones': ['us-east-1a', 'us-east-1b'],
+        'DBClusterMembers': members,
+        'Endpoint': f"{cluster_id}.cluster-abc.us-east-1.rds.amazonaws.com",
+        'ReaderEndpoint': f"{cluster_id}.cluster-ro-abc.us-east-1.rds.amazonaws.com",
+        'Port': 3306,
+    }
+
+
+def cluster_event(cluster_id, event_id, message, date):
+    """An 'RDS DB Cluster Event' as EventBridge delivers it."""
+    return {
+        'version': '0',
+        'id': '68f6e973-1a0c-d37b-f2f2-94a7f62ffd4e',
+        'detail-type': 'RDS DB Cluster Event',
+        'source': 'aws.rds',
+        'account': '123456789012',
+        'time': date,
+        'region': 'us-east-1',
+        'resources': [f"arn:aws:rds:us-east-1:123456789012:cluster:{cluster_id}"],
+        'detail': {
+            'EventCategories': ['failover'],
+            'SourceType': 'CLUSTER',
+            'SourceArn': f"arn:aws:rds:us-east-1:123456789012:cluster:{cluster_id}",
+            'Date': date,
+            'Message': message,
+            'SourceIdentifier': cluster_id,
+            'EventID': event_id,
+        },
+    }
+
+
+def multi_az_instance(instance_id, cluster_id=None):
+    """A describe_db_instances entry for a Multi-AZ instance."""
+    instance = {
+        'DBInstanceIdentifier': instance_id,
+        'Engine': 'postgres',
+        'EngineVersion': '16.4',
+        'DBInstanceStatus': 'available',
+        'AvailabilityZone': 'us-east-1b',
+        'DBInstanceClass': 'db.r6g.large',
+        'Endpoint': {'Address': f"{instance_id}.abc.us-east-1.rds.amazonaws.com", 'Port': 5432},
+    }
+    if cluster_id:
+        instance['DBClusterIdentifier'] = cluster_id
+    return instance
+
+
+def instance_event(instance_id, event_id, message, date):
+    """An 'RDS DB Instance Event' as EventBridge delivers it."""
+    event = cluster_event(instance_id, event_id, message, date)
+    arn = f"arn:aws:rds:us-east-1:123456789012:db:{instance_id}"
+    event['detail-type'] = 'RDS DB Instance Event'
+    event['resources'] = [arn]
+    event['detail'].update(SourceType='DB_INSTANCE', SourceArn=arn)
+    return event
+
+
+def minutes_ago(minutes):
+    """An event Date the given number of minutes in the past."""
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
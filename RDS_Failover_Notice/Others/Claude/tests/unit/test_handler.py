@@ -0,0 +1,46 @@
+import json
+
+from fakes import aurora_cluster, cluster_event, minutes_ago
+
+
+def test_extract_failover_info_reads_cluster_events():
+    event = cluster_event('orders', 'RDS-EVENT-0071', 'Completed failover to DB instance: orders-2',
+                          '2026-10-19T10:15:30.123Z')
+
+    from handler import extract_failover_info
+    data = extract_failover_info(event['detail'])
+
+    assert data['source_id'] == 'orders'
+    assert data['is_cluster'] is True
+    assert data['resource_type'] == 'DB Cluster'
+
+
+def test_cluster_failover_reports_promotion(aws):
+    aws.handler.cluster_topology.put('orders', {'orders-1': 'writer', 'orders-2': 'reader'}, captured_at=1)
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-2', readers=['orders-1'])]
+    event = cluster_event('orders', 'RDS-EVENT-0071', 'Completed failover to DB instance: orders-2',
+                          minutes_ago(1))
+
+    response = aws.handler.lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    email = json.loads(aws.sns.published[0]['Message'])['email']
+    assert 'Resource ID: orders' in email
+    assert 'Writer Instance: orders-2' in email
+    assert '• Previous Writer: orders-1' in email
+    assert '• Current Writer: orders-2' in email
+    assert '• Promoted to writer: orders-2' in email
+    assert '• Demoted to reader: orders-1' in email
+    assert aws.handler.cluster_topology.get('orders')['roles'] == {'orders-1': 'reader', 'orders-2': 'writer'}
+
+
+def test_started_failover_only_records_baseline(aws):
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-1', readers=['orders-2'])]
+    event = cluster_event('orders', 'RDS-EVENT-0073', 'Started cross AZ failover to DB instance: orders-2',
+                          minutes_ago(2))
+
+    aws.handler.lambda_handler(event, None)
+
+    email = json.loads(aws.sns.published[0]['Message'])['email']
+    assert 'Writer/Reader Changes' not in email
+    assert aws.handler.cluster_topology.get('orders')['roles'] == {'orders-1': 'writer', 'orders-2': 'reader'}
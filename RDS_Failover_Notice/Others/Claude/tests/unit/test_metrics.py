@@ -0,0 +1,36 @@
+from fakes import aurora_cluster, cluster_event, minutes_ago
+
+
+def queried_instances(request):
+    return sorted({query['MetricStat']['Metric']['Dimensions'][0]['Value'] for query in request})
+
+
+def test_snapshot_queries_the_cluster_members(aws):
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-2', readers=['orders-1']),
+                        aurora_cluster('payments', writer='payments-1', readers=[])]
+
+    aws.handler.lambda_handler(cluster_event('orders', 'RDS-EVENT-0073', 'Started cross AZ failover',
+                                             minutes_ago(3)), None)
+    aws.handler.lambda_handler(cluster_event('payments', 'RDS-EVENT-0073', 'Started cross AZ failover',
+                                             minutes_ago(3)), None)
+
+    assert [queried_instances(request) for request in aws.cloudwatch.requests] == [
+        ['orders-1', 'orders-2'], ['payments-1']]
+
+
+def test_snapshot_is_reused_within_one_failover(aws):
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-2', readers=['orders-1'])]
+
+    aws.handler.lambda_handler(cluster_event('orders', 'RDS-EVENT-0073', 'Started cross AZ failover',
+                                             minutes_ago(3)), None)
+    aws.handler.lambda_handler(cluster_event('orders', 'RDS-EVENT-0071', 'Completed failover',
+                                             minutes_ago(2)), None)
+
+    assert len(aws.cloudwatch.requests) == 1
+
+
+def test_unknown_resource_is_not_queried(aws):
+    aws.handler.lambda_handler(cluster_event('gone', 'RDS-EVENT-0071', 'Completed failover',
+                                             minutes_ago(1)), None)
+
+    assert aws.cloudwatch.requests == []
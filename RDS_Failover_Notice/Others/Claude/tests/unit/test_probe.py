@@ -0,0 +1,140 @@
+import asyncio
+import socket
+
+import pytest
+
+from probe import format_probe_results, probe_endpoint, probe_endpoints, probe_targets
+
+
+def free_port():
+    """A local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def start_server():
+    """A TCP server on 127.0.0.1 that accepts and closes connections."""
+    async def handle(reader, writer):
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def static_resolver(*answers):
+    """Resolves to each answer in turn, then keeps the last one."""
+    calls = []
+
+    async def resolve(host, port):
+        calls.append((host, port))
+        return answers[min(len(calls), len(answers)) - 1]
+
+    resolve.calls = calls
+    return resolve
+
+
+def test_probe_connects_to_local_server():
+    async def run():
+        server, port = await start_server()
+        async with server:
+            return await probe_endpoint('db.example', port, resolver=static_resolver(['127.0.0.1']),
+                                        timeout_seconds=2, interval_seconds=0.05)
+
+    result = asyncio.run(run())
+
+    assert result['connected_after'] is not None
+    assert result['connect_latency_ms'] is not None
+    assert result['attempts'] == 1
+    assert result['initial_addresses'] == ['127.0.0.1']
+    assert result['address_changed_after'] is None
+    assert result['last_error'] is None
+
+
+def test_probe_reports_changed_address_then_connects():
+    async def run():
+        server, port = await start_server()
+        # 127.0.0.2 has nothing listening on the port; the server is bound to 127.0.0.1 only
+        resolver = static_resolver(['127.0.0.2'], ['127.0.0.2'], ['127.0.0.1'])
+        async with server:
+            result = await probe_endpoint('db.example', port, resolver=resolver, timeout_seconds=3,
+                                          interval_seconds=0.05, connect_timeout_seconds=0.2)
+        return result, resolver.calls
+
+    result, calls = asyncio.run(run())
+
+    assert len(calls) == 3
+    assert result['initial_addresses'] == ['127.0.0.2']
+    assert result['addresses'] == ['127.0.0.1']
+    assert result['address_changed_after'] is not None
+    assert result['connected_after'] >= result['address_changed_after']
+    assert result['attempts'] == 3
+    assert result['last_error'] is None
+
+
+def test_probe_gives_up_after_timeout():
+    port = free_port()
+
+    result = asyncio.run(probe_endpoint('db.example', port, resolver=static_resolver(['127.0.0.1']),
+                                        timeout_seconds=0.3, interval_seconds=0.05))
+
+    assert result['connected_after'] is None
+    assert result['attempts'] > 1
+    assert result['last_error'].startswith('ConnectionRefusedError')
+
+
+def test_probe_retries_resolver_failures():
+    answers = iter([OSError('Name or service not known'), ['127.0.0.1']])
+
+    async def flaky_resolver(host, port):
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    async def run():
+        server, port = await start_server()
+        async with server:
+            return await probe_endpoint('db.example', port, resolver=flaky_resolver,
+                                        timeout_seconds=2, interval_seconds=0.05)
+
+    result = asyncio.run(run())
+
+    assert result['attempts'] == 2
+    assert result['initial_addresses'] == ['127.0.0.1']
+    assert result['connected_after'] is not None
+
+
+def test_probe_endpoints_runs_concurrently():
+    async def run():
+        server, port = await start_server()
+        async with server:
+            return await probe_endpoints([('writer.example', port), ('reader.example', free_port())],
+                                         resolver=static_resolver(['127.0.0.1']),
+                                         timeout_seconds=0.5, interval_seconds=0.05)
+
+    writer, reader = asyncio.run(run())
+
+    assert writer['endpoint'] == 'writer.example'
+    assert writer['connected_after'] is not None
+    assert reader['connected_after'] is None
+
+
+@pytest.mark.parametrize('data, expected', [
+    ({'is_cluster': True, 'port': 3306, 'writer_endpoint': 'w', 'reader_endpoint': 'r'}, [('w', 3306), ('r', 3306)]),
+    ({'is_cluster': False, 'port': 5432, 'endpoint': 'i'}, [('i', 5432)]),
+    ({'is_cluster': True, 'writer_endpoint': 'w'}, []),
+])
+def test_probe_targets(data, expected):
+    assert probe_targets(data) == expected
+
+
+def test_format_probe_results():
+    text = format_probe_results([{
+        'endpoint': 'w', 'port': 3306, 'initial_addresses': ['10.0.0.1'], 'addresses': ['10.0.0.2'],
+        'address_changed_after': 4.2, 'connected_after': 4.5, 'connect_latency_ms': 1.2,
+        'attempts': 5, 'last_error': None
+    }])
+
+    assert 'Address changed from 10.0.0.1 after 4.2s' in text
+    assert 'TCP connect succeeded after 4.5s (1.2 ms)' in text
@@ -0,0 +1,58 @@
+from fakes import aurora_cluster, cluster_event, instance_event, minutes_ago, multi_az_instance
+
+from push import MESSAGE_TYPE, build_push_message
+
+
+def test_cluster_failover_message(aws):
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-2', readers=['orders-1'])]
+    event = cluster_event('orders', 'RDS-EVENT-0071', 'Completed failover to DB instance: orders-2',
+                          minutes_ago(1))
+
+    aws.handler.lambda_handler(event, None)
+
+    assert aws.channel.messages == [{
+        'type': MESSAGE_TYPE,
+        'version': 1,
+        'event_id': 'RDS-EVENT-0071',
+        'event_time': event['detail']['Date'],
+        'source_type': 'CLUSTER',
+        'cluster_id': 'orders',
+        'instance_id': 'orders-2',
+        'writer_endpoint': 'orders.cluster-abc.us-east-1.rds.amazonaws.com',
+        'reader_endpoint': 'orders.cluster-ro-abc.us-east-1.rds.amazonaws.com',
+        'port': 3306,
+    }]
+
+
+def test_instance_failover_message(aws):
+    aws.rds.instances = [multi_az_instance('billing')]
+    event = instance_event('billing', 'RDS-EVENT-0049', 'Multi-AZ instance failover completed.',
+                           minutes_ago(1))
+
+    data = aws.handler.enhance_with_rds_info(aws.handler.extract_failover_info(event['detail']))
+    message = build_push_message(data)
+
+    assert message['cluster_id'] is None
+    assert message['instance_id'] == 'billing'
+    assert message['writer_endpoint'] == 'billing.abc.us-east-1.rds.amazonaws.com'
+    assert message['port'] == 5432
+
+
+def test_instance_message_names_its_cluster(aws):
+    aws.rds.instances = [multi_az_instance('ledger-1', cluster_id='ledger')]
+    event = instance_event('ledger-1', 'RDS-EVENT-0049', 'Multi-AZ instance failover completed.',
+                           minutes_ago(1))
+
+    data = aws.handler.enhance_with_rds_info(aws.handler.extract_failover_info(event['detail']))
+
+    assert build_push_message(data)['cluster_id'] == 'ledger'
+
+
+def test_started_failover_is_not_pushed(aws):
+    aws.rds.clusters = [aurora_cluster('orders', writer='orders-1', readers=['orders-2'])]
+    event = cluster_event('orders', 'RDS-EVENT-0073', 'Started cross AZ failover to DB instance: orders-2',
+                          minutes_ago(1))
+
+    aws.handler.lambda_handler(event, None)
+
+    assert aws.channel.messages == []
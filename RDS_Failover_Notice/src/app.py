@@ -1,55 +1,181 @@
 import json
-import boto3
 import os
 
+import aws_clients
+from backfill import run_backfill
+from catalog import classify
+from correlation import event_info, get_correlator, publish_duration_metric
+from ledger import event_identity, get_ledger
+from rate_limit import get_limiter, summary_notification
+
+# SNS rejects longer subjects, which would lose the notification
+MAX_SUBJECT_LENGTH = 100
+
 def lambda_handler(event, context):
     print(json.dumps(event))
-    sns = boto3.client('sns')
     
-    # Extract relevant information from the event
-    detail = event.get('detail', {})
-    event_id = detail.get('EventID', 'N/A')
-    event_message = detail.get('Message', 'N/A')
-    source_id = detail.get('SourceIdentifier', 'N/A')
-    source_arn = detail.get('SourceArn', 'N/A')
-    event_time = detail.get('EventTime', 'N/A')
+    # Scheduled reconciliation of events this function never received
+    if event.get('action') == 'backfill':
+        summary = run_backfill(process_event)
+        print(f"Backfill: {json.dumps(summary)}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps(summary)
+        }
     
-    # Determine if this is a reader or writer failover
-    failover_type = "unknown"
-    if "reader" in event_message.lower():
-        failover_type = "READER"
-    elif "writer" in event_message.lower():
-        failover_type = "WRITER"
-    elif "failover" in event_message.lower():
-        failover_type = "failover"
-    elif "restarted" in event_message.lower():
-        failover_type = "restarted"
-    elif "shutdown" in event_message.lower():
-        failover_type = "shutdown"
+    # Scheduled delivery of "N further events suppressed" summaries
+    if event.get('action') == 'flush-suppressed':
+        return flush_suppressed()
     
-    # Prepare the notification message
-    subject = f"AWS RDS {failover_type} Failover Notification"
-    message = f"""
-    RDS Failover Event Detected!
+    return process_event(event)
+
+
+def process_event(event):
+    """Notify one RDS event and record it in the processed-event ledger."""
+    info = event_info(event)
+    response = notify(info, event.get('backfilled', False))
+    if response['statusCode'] == 200:
+        try:
+            get_ledger().record(event_identity(info['source_id'], info['event_time'], info['message']))
+        except Exception as e:
+            print(f"Error recording event in the ledger: {str(e)}")
+    return response
+
+
+def notify(info, backfilled):
+    sns = aws_clients.client('sns')
+    # Replayed events say so, since they arrive late
+    prefix = "[Backfilled] " if backfilled else ""
+    category = classify(info)
+    print(f"Category: {category['name']} ({category['severity']})")
     
-    Event Type: {failover_type} Failover
-    Event ID: {event_id}
-    Event Time: {event_time}
-    Source Identifier: {source_id}
-    Source ARN: {source_arn}
+    # Routine events are never part of a failover incident
+    if category['severity'] == 'low':
+        subject, message = category['handler'](info, category)
+        return deliver(sns, prefix + subject, message, category['severity'], info['source_id'], info)
+    
+    # Merge the events of one failover into a single incident
+    try:
+        decision, incident = get_correlator().process(info)
+    except Exception as e:
+        print(f"Error correlating event, notifying it on its own: {str(e)}")
+        decision, incident = 'standalone', None
+    print(f"Correlation: {decision} {incident['id'] if incident else ''}")
+    
+    if decision == 'merged':
+        return {
+            'statusCode': 200,
+            'body': json.dumps(f"Event merged into incident {incident['id']}")
+        }
+    if decision == 'closed':
+        try:
+            publish_duration_metric(incident)
+        except Exception as e:
+            print(f"Error publishing failover metrics: {str(e)}")
+    if decision in ('opened', 'closed'):
+        subject, message = incident_notification(decision, incident, info)
+        severity = 'normal' if incident.get('outcome') == 'completed' else 'critical'
+        return deliver(sns, prefix + subject, message, severity, incident['key'], info)
+    
+    subject, message = category['handler'](info, category)
+    return deliver(sns, prefix + subject, message, category['severity'], info['source_id'], info)
+
+
+def incident_notification(decision, incident, info):
+    """Subject and message for an incident's opening or closing notification."""
+    if decision == 'opened':
+        subject = f"AWS RDS Failover Started: {incident['key']}"
+        message = f"""
+    RDS Failover Started!
+    
+    Incident: {incident['id']}
+    Source: {incident['key']} ({info['source_id']})
+    Started: {incident['opened_at']} ({incident['opening_event']})
+    Source ARN: {info['source_arn']}
     
     Message Details:
-    {event_message}
+    {info['message']}
     
-    Please investigate the RDS instance to ensure proper operation.
+    Related events are merged into this incident; a single notification
+    follows when the failover completes.
     """
+        return subject, message
+
+    duration = incident['duration_seconds']
+    duration_text = f"{duration // 60}m {duration % 60}s" if duration is not None else "unknown"
+    events = '\n'.join(f"    - {entry.replace('|', '  ')}" for entry in incident['events'])
+    subject = f"AWS RDS Failover {incident['outcome'].capitalize()}: {incident['key']} after {duration_text}"
+    message = f"""
+    RDS Failover {incident['outcome'].capitalize()}!
+    
+    Incident: {incident['id']}
+    Source: {incident['key']}
+    Started: {incident['opened_at']} ({incident['opening_event']})
+    Finished: {incident['closed_at']} ({incident['closing_event']})
+    Duration: {duration_text}
+    
+    Events:
+{events}
     
-    # Publish to SNS topic
+    Message Details:
+    {info['message']}
+    """
+    return subject, message
+
+
+def deliver(sns, subject, message, severity, resource, info):
+    """
+    Publish to the channels the resource's rate limits still allow; denied
+    channels count the event towards a later suppression summary.
+    """
+    limiter = get_limiter()
+    channels = []
+    for channel in (['email'] if severity == 'low' else ['sms', 'email']):
+        try:
+            if limiter.allow(channel, resource):
+                channels.append(channel)
+                continue
+            limiter.suppress(channel, resource, f"{info['event_time']}|{info['event_id']}|{subject}")
+            print(f"Rate limited {channel} notification for {resource}")
+        except Exception as e:
+            # Fail open: a store outage must not silence failover alerts
+            print(f"Error applying rate limit, notifying anyway: {str(e)}")
+            channels.append(channel)
+    
+    if not channels:
+        return {
+            'statusCode': 200,
+            'body': json.dumps('Notification suppressed by rate limit')
+        }
+    return publish(sns, subject, message, severity, channels)
+
+
+def flush_suppressed():
+    """Send one summary per suppression window that has ended."""
+    sns = aws_clients.client('sns')
+    summaries = get_limiter().due_summaries()
+    for summary in summaries:
+        subject, message = summary_notification(summary)
+        publish(sns, subject, message, 'normal', [summary['channel']])
+    return {
+        'statusCode': 200,
+        'body': json.dumps(f"{len(summaries)} suppression summaries sent")
+    }
+
+
+def publish(sns, subject, message, severity, channels):
+    # Publish to SNS topic; subscriptions filter on the channels attribute
+    if len(subject) > MAX_SUBJECT_LENGTH:
+        subject = subject[:MAX_SUBJECT_LENGTH - 3] + '...'
     try:
         response = sns.publish(
             TopicArn=os.environ['SNS_TOPIC_ARN'],
             Subject=subject,
-            Message=message
+            Message=message,
+            MessageAttributes={
+                'severity': {'DataType': 'String', 'StringValue': severity},
+                'channels': {'DataType': 'String.Array', 'StringValue': json.dumps(channels)}
+            }
         )
         print(f"Notification sent: {response['MessageId']}")
         print(message)
@@ -0,0 +1,118 @@
+"""
+Reconciliation for RDS events the handler never saw (throttling, errors,
+deployments): pages through describe_events for the past BACKFILL_HOURS,
+replays the events missing from the processed-event ledger through the
+normal handler, and reports the gap as the MissedEvents metric.
+
+A high-water mark (backfill#high-water) records how far the last run got, so
+each run only rescans from there, less a small overlap for late events. The
+first run (or the first after the state table is recreated) only sets the
+mark: with an empty ledger every recent event would look missed.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import aws_clients
+from correlation import METRIC_NAMESPACE
+from ledger import event_identity, get_ledger
+from state_store import get_store
+
+BACKFILL_HOURS = int(os.environ.get('BACKFILL_HOURS', '6'))
+BACKFILL_OVERLAP_MINUTES = int(os.environ.get('BACKFILL_OVERLAP_MINUTES', '15'))
+
+# The categories the EventBridge rule in template.yaml listens for
+BACKFILL_CATEGORIES = ['failover', 'failure', 'availability', 'notification', 'configuration-change']
+
+DETAIL_TYPES = {
+    'db-instance': 'RDS DB Instance Event',
+    'db-cluster': 'RDS DB Cluster Event',
+    'db-parameter-group': 'RDS DB Parameter Group Event',
+    'db-security-group': 'RDS DB Security Group Event',
+    'db-snapshot': 'RDS DB Snapshot Event',
+    'db-cluster-snapshot': 'RDS DB Cluster Snapshot Event',
+}
+
+HIGH_WATER_KEY = 'backfill#high-water'
+
+
+def describe_events(rds, start, end):
+    """All RDS events of every source type between start and end, oldest first."""
+    events = []
+    paginator = rds.get_paginator('describe_events')
+    for page in paginator.paginate(StartTime=start, EndTime=end, EventCategories=BACKFILL_CATEGORIES):
+        events.extend(page['Events'])
+    return sorted(events, key=lambda entry: entry['Date'])
+
+
+def to_eventbridge_event(entry):
+    """The describe_events entry in the shape EventBridge delivers to the handler."""
+    event_time = entry['Date'].astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    return {
+        'source': 'aws.rds',
+        'detail-type': DETAIL_TYPES.get(entry.get('SourceType'), 'RDS Event'),
+        'time': event_time,
+        'backfilled': True,
+        'detail': {
+            'EventCategories': entry.get('EventCategories', []),
+            'SourceType': entry.get('SourceType', 'N/A'),
+            'SourceIdentifier': entry['SourceIdentifier'],
+            'SourceArn': entry.get('SourceArn', 'N/A'),
+            'Date': event_time,
+            'Message': entry['Message'],
+        },
+    }
+
+
+def run_backfill(process, rds=None, cloudwatch=None, now=None):
+    """
+    Replay missed events through process(event), which returns the handler's
+    response. Returns a summary of the scan.
+    """
+    rds = rds or aws_clients.client('rds')
+    store = get_store()
+    ledger = get_ledger()
+    now = now or datetime.now(timezone.utc)
+
+    high_water = store.get(HIGH_WATER_KEY)
+    if not high_water:
+        store.put(HIGH_WATER_KEY, {'scanned_until': now.isoformat()})
+        print(f"No backfill high-water mark; starting from {now.isoformat()} without replaying events")
+        return {'start': now.isoformat(), 'end': now.isoformat(), 'events': 0, 'missed': 0, 'replayed': 0,
+                'scanned_until': now.isoformat()}
+
+    resume = datetime.fromisoformat(high_water['scanned_until']) - timedelta(minutes=BACKFILL_OVERLAP_MINUTES)
+    start = max(now - timedelta(hours=BACKFILL_HOURS), resume)
+
+    entries = describe_events(rds, start, now)
+    by_identity = {event_identity(entry['SourceIdentifier'], entry['Date'], entry['Message']): entry
+                   for entry in entries}
+    missing = ledger.missing(list(by_identity))
+    print(f"Backfill {start.isoformat()} to {now.isoformat()}: {len(entries)} event(s), {len(missing)} missed")
+
+    replayed, failed_at = 0, None
+    for identity in missing:
+        entry = by_identity[identity]
+        response = process(to_eventbridge_event(entry))
+        if response['statusCode'] == 200:
+            replayed += 1
+        elif failed_at is None:
+            failed_at = entry['Date']
+            print(f"Replay failed for {identity}; it is retried on the next run")
+
+    # Never move past an event that still has to be replayed
+    scanned_until = min(now, failed_at) if failed_at else now
+    store.put(HIGH_WATER_KEY, {'scanned_until': scanned_until.isoformat()})
+
+    cloudwatch = cloudwatch or aws_clients.client('cloudwatch')
+    cloudwatch.put_metric_data(Namespace=METRIC_NAMESPACE, MetricData=[
+        {'MetricName': 'MissedEvents', 'Value': len(missing), 'Unit': 'Count'},
+    ])
+
+    return {
+        'start': start.isoformat(),
+        'end': now.isoformat(),
+        'events': len(entries),
+        'missed': len(missing),
+        'replayed': replayed,
+        'scanned_until': scanned_until.isoformat(),
+    }
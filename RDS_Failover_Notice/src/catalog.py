@@ -0,0 +1,107 @@
+"""
+RDS event catalog: maps each EventID to a category, and each category to a
+label, a severity and the function that builds its notification.
+
+Severity decides delivery: 'low' events are only published to the email
+channel (see app.deliver), and they skip failover correlation entirely.
+"""
+
+# https://docs.aws.amazon.com/AmazonRDS/latest/AuroraUserGuide/USER_Events.Messages.html
+EVENT_CATALOG = {
+    'RDS-EVENT-0013': 'failover',           # Multi-AZ instance failover started
+    'RDS-EVENT-0072': 'failover',           # Started same AZ failover to DB instance
+    'RDS-EVENT-0073': 'failover',           # Started cross AZ failover to DB instance
+    'RDS-EVENT-0071': 'failover',           # Completed failover to DB instance
+    'RDS-EVENT-0049': 'failover',           # Multi-AZ instance failover completed
+    'RDS-EVENT-0088': 'failover',           # DB instance started, a Multi-AZ failover has completed
+    'RDS-EVENT-0069': 'failover-failed',    # Cluster failover failed
+    'RDS-EVENT-0034': 'failover-failed',    # Abandoning user requested failover
+    'RDS-EVENT-0004': 'shutdown',           # DB instance shutdown
+    'RDS-EVENT-0006': 'restart',            # DB instance restarted
+    'RDS-EVENT-0057': 'replication',        # Replication streaming has been terminated
+    'RDS-EVENT-0003': 'lifecycle',          # DB instance deleted
+    'RDS-EVENT-0005': 'lifecycle',          # DB instance created
+    'RDS-EVENT-0087': 'lifecycle',          # DB instance stopped
+    'RDS-EVENT-0153': 'lifecycle',          # DB cluster started after exceeding the maximum stopped time
+    'RDS-EVENT-0026': 'maintenance',        # Applying off-line patches to DB instance
+    'RDS-EVENT-0047': 'maintenance',        # Database instance patched
+}
+
+# Fallback for EventIDs missing from the catalog, checked in order
+MESSAGE_KEYWORDS = [
+    ('failover', 'failover'),
+    ('shutdown', 'shutdown'),
+    ('restarted', 'restart'),
+    ('rebooted', 'restart'),
+    ('replication', 'replication'),
+    ('patch', 'maintenance'),
+]
+
+
+def alert_notification(info, category):
+    """Detailed notification for events that need someone to look at the database."""
+    event_type = category['label']
+    if category['name'].startswith('failover'):
+        role = failover_role(info['message'])
+        if role:
+            event_type = f"{role} {event_type}"
+    subject = f"AWS RDS {event_type} Notification"
+    message = f"""
+    RDS {category['label']} Event Detected!
+    
+    Event Type: {event_type}
+    Severity: {category['severity']}
+    Event ID: {info['event_id']}
+    Event Time: {info['event_time']}
+    Source Identifier: {info['source_id']}
+    Source ARN: {info['source_arn']}
+    
+    Message Details:
+    {info['message']}
+    
+    Please investigate the RDS instance to ensure proper operation.
+    """
+    return subject, message
+
+
+def summary_notification(info, category):
+    """Short notification for routine events."""
+    subject = f"AWS RDS {category['label']}: {info['source_id']}"
+    message = f"""
+    {info['event_time']} {info['event_id']} {info['source_id']}
+    {info['message']}
+    """
+    return subject, message
+
+
+CATEGORIES = {
+    'failover': {'label': 'Failover', 'severity': 'critical', 'handler': alert_notification},
+    'failover-failed': {'label': 'Failover Failed', 'severity': 'critical', 'handler': alert_notification},
+    'shutdown': {'label': 'Shutdown', 'severity': 'critical', 'handler': alert_notification},
+    'replication': {'label': 'Replication', 'severity': 'critical', 'handler': alert_notification},
+    'restart': {'label': 'Restart', 'severity': 'normal', 'handler': alert_notification},
+    'other': {'label': 'Other', 'severity': 'normal', 'handler': alert_notification},
+    'lifecycle': {'label': 'Lifecycle', 'severity': 'low', 'handler': summary_notification},
+    'maintenance': {'label': 'Maintenance', 'severity': 'low', 'handler': summary_notification},
+}
+for name, category in CATEGORIES.items():
+    category['name'] = name
+
+
+def classify(info):
+    """The category for an event (see correlation.event_info): catalog first, then its message."""
+    name = EVENT_CATALOG.get(info['event_id'])
+    if name is None:
+        lowered = info['message'].lower()
+        name = next((category for keyword, category in MESSAGE_KEYWORDS if keyword in lowered), 'other')
+    return CATEGORIES[name]
+
+
+def failover_role(message):
+    """'WRITER' or 'READER' when a failover message says which instance it concerns."""
+    lowered = message.lower()
+    if 'writer' in lowered:
+        return 'WRITER'
+    if 'reader' in lowered:
+        return 'READER'
+    return None
@@ -0,0 +1,162 @@
+import os
+import uuid
+from datetime import datetime
+
+import aws_clients
+from state_store import get_store
+
+CORRELATION_WINDOW_SECONDS = int(os.environ.get('CORRELATION_WINDOW_SECONDS', '1800'))
+METRIC_NAMESPACE = os.environ.get('METRIC_NAMESPACE', 'RDSFailover')
+
+# https://docs.aws.amazon.com/AmazonRDS/latest/AuroraUserGuide/USER_Events.Messages.html
+OPENING_EVENTS = {
+    'RDS-EVENT-0013',  # Multi-AZ instance failover started
+    'RDS-EVENT-0072',  # Started same AZ failover to DB instance
+    'RDS-EVENT-0073',  # Started cross AZ failover to DB instance
+}
+CLOSING_EVENTS = {
+    'RDS-EVENT-0071',  # Completed failover to DB instance
+    'RDS-EVENT-0049',  # Multi-AZ instance failover completed
+    'RDS-EVENT-0088',  # DB instance started, a Multi-AZ failover has completed
+}
+FAILED_EVENTS = {
+    'RDS-EVENT-0069',  # Cluster failover failed
+    'RDS-EVENT-0034',  # Abandoning user requested failover
+}
+
+
+class FailoverCorrelator:
+    """
+    Merges the events of one failover into a single incident per source.
+
+    An opening event (e.g. RDS-EVENT-0013) creates incident#<source>; any
+    event for that source while it is open is merged into it, and a
+    completion (0071/0049/0088) or failure (0069/0034) closes it with the
+    start-to-completion duration. Late events for a source whose incident
+    closed within the window are merged too. Instance events are keyed on
+    their Aurora cluster where there is one, so the cluster's and its
+    instances' events land in one incident.
+    """
+
+    def __init__(self, store, rds_client=None, window_seconds=CORRELATION_WINDOW_SECONDS):
+        self.store = store
+        self.rds = rds_client or aws_clients.client('rds')
+        self.window_seconds = window_seconds
+        self.clusters = {}
+
+    def process(self, info):
+        """
+        Correlate one event (see event_info). Returns (decision, incident)
+        where decision is 'opened', 'closed', 'merged' or 'standalone'
+        (not part of any failover; notify as before).
+        """
+        key = self.correlation_key(info)
+        incident = self.store.get(f"incident#{key}")
+        event_id = info['event_id']
+
+        if event_id in OPENING_EVENTS and incident is None:
+            incident = {
+                'id': uuid.uuid4().hex[:12],
+                'key': key,
+                'opened_at': info['event_time'],
+                'opening_event': event_id,
+                'message': info['message'],
+            }
+            if self.store.put_if_absent(f"incident#{key}", incident, ttl_seconds=self.window_seconds):
+                self._add_event(incident, info)
+                return 'opened', incident
+            # Another invocation opened it first
+            incident = self.store.get(f"incident#{key}")
+
+        if incident is None:
+            recent = self.store.get(f"recent#{key}")
+            if recent is not None:
+                self._add_event(recent, info)
+                return 'merged', recent
+            return 'standalone', None
+
+        self._add_event(incident, info)
+        if event_id not in CLOSING_EVENTS and event_id not in FAILED_EVENTS:
+            # Keep the incident open while related events keep arriving
+            self.store.put(f"incident#{key}", incident, ttl_seconds=self.window_seconds)
+            return 'merged', incident
+
+        # Only one invocation closes each incident
+        if not self.store.put_if_absent(f"closed#{incident['id']}", {'event_id': event_id},
+                                        ttl_seconds=self.window_seconds):
+            return 'merged', incident
+        incident = dict(incident, closed_at=info['event_time'], closing_event=event_id,
+                        outcome='failed' if event_id in FAILED_EVENTS else 'completed',
+                        duration_seconds=duration_seconds(incident['opened_at'], info['event_time']),
+                        events=self.events(incident))
+        self.store.delete(f"incident#{key}")
+        self.store.put(f"recent#{key}", incident, ttl_seconds=self.window_seconds)
+        return 'closed', incident
+
+    def events(self, incident):
+        """The incident's 'time|event id' entries in time order."""
+        return sorted(self.store.get_members(f"incident-events#{incident['id']}"))
+
+    def correlation_key(self, info):
+        source = info['source_id']
+        if info['source_type'] in ('CLUSTER', 'db-cluster'):
+            return source
+        if source not in self.clusters:
+            try:
+                instances = self.rds.describe_db_instances(DBInstanceIdentifier=source)['DBInstances']
+                self.clusters[source] = instances[0].get('DBClusterIdentifier') if instances else None
+            except Exception as e:
+                print(f"Could not resolve cluster for {source}: {str(e)}")
+                return source
+        return self.clusters[source] or source
+
+    def _add_event(self, incident, info):
+        # The incident's TTL is renewed by every event, so the set's must be too
+        self.store.add_members(f"incident-events#{incident['id']}", {f"{info['event_time']}|{info['event_id']}"},
+                               ttl_seconds=self.window_seconds, refresh_ttl=True)
+
+
+def event_info(event):
+    """The fields correlation needs from an RDS EventBridge event."""
+    detail = event.get('detail', {})
+    return {
+        'event_id': detail.get('EventID', 'N/A'),
+        'message': detail.get('Message', 'N/A'),
+        'source_id': detail.get('SourceIdentifier', 'N/A'),
+        'source_type': detail.get('SourceType', 'N/A'),
+        'source_arn': detail.get('SourceArn', 'N/A'),
+        'event_time': detail.get('Date') or detail.get('EventTime') or event.get('time', 'N/A'),
+    }
+
+
+def duration_seconds(start, end):
+    try:
+        started = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        ended = datetime.fromisoformat(end.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+    return max(0, round((ended - started).total_seconds()))
+
+
+def publish_duration_metric(incident, cloudwatch=None):
+    """FailoverDurationSeconds and FailoverCount, per source and overall."""
+    cloudwatch = cloudwatch or aws_clients.client('cloudwatch')
+    metric_data = []
+    for dimensions in ([{'Name': 'SourceIdentifier', 'Value': incident['key']}], []):
+        metric_data.append({'MetricName': 'FailoverCount', 'Dimensions': dimensions,
+                            'Value': 1, 'Unit': 'Count'})
+        if incident['duration_seconds'] is not None and incident['outcome'] == 'completed':
+            metric_data.append({'MetricName': 'FailoverDurationSeconds', 'Dimensions': dimensions,
+                                'Value': incident['duration_seconds'], 'Unit': 'Seconds'})
+    cloudwatch.put_metric_data(Namespace=METRIC_NAMESPACE, MetricData=metric_data)
+
+
+_correlator = None
+
+
+def get_correlator():
+    """One correlator per container, so resolved clusters stay cached."""
+    global _correlator
+    if _correlator is None:
+        _correlator = FailoverCorrelator(get_store())
+    return _correlator
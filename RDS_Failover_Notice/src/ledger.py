@@ -0,0 +1,68 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from state_store import get_store
+
+# Keep processed events a little longer than the backfill looks back
+LEDGER_RETENTION_SECONDS = (int(os.environ.get('BACKFILL_HOURS', '6')) + 24) * 3600
+
+
+def event_identity(source_id, event_time, message):
+    """
+    Identity shared by an EventBridge event and the describe_events entry for
+    the same event: EventBridge carries an EventID, describe_events does not.
+    """
+    digest = hashlib.sha1(message.encode('utf-8')).hexdigest()[:12]
+    return f"{source_id}|{normalize_time(event_time)}|{digest}"
+
+
+def normalize_time(value):
+    """Second-precision UTC timestamp for an ISO string or datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class EventLedger:
+    """
+    Processed RDS events, as sets of identities per hour of event time
+    (ledger#YYYY-MM-DDTHH), so a backfill checks a whole hour with one read
+    and each event with a set lookup.
+    """
+
+    def __init__(self, store, retention_seconds=LEDGER_RETENTION_SECONDS):
+        self.store = store
+        self.retention_seconds = retention_seconds
+
+    def record(self, identity):
+        self.store.add_members(self._key(identity), {identity}, ttl_seconds=self.retention_seconds)
+
+    def missing(self, identities):
+        """The identities not in the ledger, in the order given."""
+        processed = {}
+        result = []
+        for identity in identities:
+            key = self._key(identity)
+            if key not in processed:
+                processed[key] = self.store.get_members(key)
+            if identity not in processed[key]:
+                result.append(identity)
+        return result
+
+    @staticmethod
+    def _key(identity):
+        # Hour prefix of the identity's timestamp
+        return f"ledger#{identity.split('|')[1][:13]}"
+
+
+_ledger = None
+
+
+def get_ledger():
+    global _ledger
+    if _ledger is None:
+        _ledger = EventLedger(get_store())
+    return _ledger
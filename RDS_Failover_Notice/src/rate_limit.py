@@ -0,0 +1,126 @@
+"""
+Per-resource, per-channel token buckets for failover notifications, so a
+flapping instance cannot send dozens of SMS messages in minutes.
+
+Each channel ('sms', 'email') allows a burst of `capacity` notifications per
+resource, refilling over `per_seconds`. Buckets live in the state store
+(bucket#<channel>#<resource>); a bucket this container saw empty is denied
+from memory until it refills, since other containers can only take tokens
+from it. Denied events are counted per suppression window and summarized as
+"N further events suppressed" when the window ends (see flush_suppressed,
+run every few minutes).
+"""
+import os
+import time
+import uuid
+
+from state_store import get_store
+
+CHANNELS = ('sms', 'email')
+
+
+def parse_limit(value):
+    """'3/900' -> (capacity 3, per 900 seconds)."""
+    capacity, per_seconds = value.split('/')
+    return int(capacity), int(per_seconds)
+
+
+RATE_LIMITS = {
+    'sms': parse_limit(os.environ.get('RATE_LIMIT_SMS', '3/900')),
+    'email': parse_limit(os.environ.get('RATE_LIMIT_EMAIL', '10/900')),
+}
+
+PENDING_KEY = 'suppressed#pending'
+
+# Suppressed events listed in a summary
+SUMMARY_MAX_EVENTS = 20
+
+
+class NotificationRateLimiter:
+    def __init__(self, store, limits=RATE_LIMITS):
+        self.store = store
+        self.limits = limits
+        # (channel, resource) -> time the bucket next has a token
+        self.empty_until = {}
+
+    def allow(self, channel, resource, now=None):
+        """Take a token from the resource's bucket for the channel. Returns True if one was left."""
+        now = now or time.time()
+        if self.empty_until.get((channel, resource), 0) > now:
+            return False
+
+        capacity, per_seconds = self.limits[channel]
+        rate = capacity / per_seconds
+        key = f"bucket#{channel}#{resource}"
+        bucket = self.store.get(key) or {'tokens': capacity, 'updated': now}
+        tokens = min(capacity, bucket['tokens'] + (now - bucket['updated']) * rate)
+        if tokens < 1:
+            self.empty_until[(channel, resource)] = now + (1 - tokens) / rate
+            return False
+
+        # Concurrent containers may both take the last token; a rare extra notification is acceptable
+        self.store.put(key, {'tokens': tokens - 1, 'updated': now}, ttl_seconds=2 * per_seconds)
+        return True
+
+    def suppress(self, channel, resource, entry, now=None):
+        """Count a denied notification in the resource's current suppression window."""
+        now = now or time.time()
+        capacity, per_seconds = self.limits[channel]
+        window_end = max(self.empty_until.get((channel, resource), now), now + 1)
+        window = {'id': uuid.uuid4().hex[:12], 'channel': channel, 'resource': resource,
+                  'window_end': int(window_end)}
+        if self.store.put_if_absent(f"suppression#{channel}#{resource}", window, ttl_seconds=2 * per_seconds):
+            self.store.add_members(PENDING_KEY, {f"{window['window_end']}|{channel}|{resource}"})
+        else:
+            window = self.store.get(f"suppression#{channel}#{resource}") or window
+        self.store.increment(f"suppressed#{window['id']}", ttl_seconds=2 * per_seconds)
+        self.store.add_members(f"suppressed-events#{window['id']}", {entry}, ttl_seconds=2 * per_seconds)
+
+    def due_summaries(self, now=None):
+        """
+        Close the suppression windows that have ended. Returns one summary per
+        window: {'channel', 'resource', 'count', 'events'}.
+        """
+        now = now or time.time()
+        summaries = []
+        for member in sorted(self.store.get_members(PENDING_KEY)):
+            window_end, channel, resource = member.split('|', 2)
+            if int(window_end) > now:
+                continue
+            window = self.store.get(f"suppression#{channel}#{resource}")
+            if window is not None:
+                count = self.store.get_counters([f"suppressed#{window['id']}"])[f"suppressed#{window['id']}"]
+                events = sorted(self.store.get_members(f"suppressed-events#{window['id']}"))
+                summaries.append({'channel': channel, 'resource': resource, 'count': count, 'events': events})
+                self.store.delete(f"suppression#{channel}#{resource}")
+            self.store.remove_members(PENDING_KEY, {member})
+        return summaries
+
+
+def summary_notification(summary):
+    """Subject and message for a closed suppression window."""
+    subject = f"AWS RDS {summary['resource']}: {summary['count']} further events suppressed"
+    shown = summary['events'][-SUMMARY_MAX_EVENTS:]
+    events = '\n'.join(f"    - {entry.replace('|', '  ')}" for entry in shown)
+    more = f"\n    ... and {len(summary['events']) - len(shown)} more" if len(summary['events']) > len(shown) else ''
+    message = f"""
+    {summary['count']} further {summary['channel'].upper()} notification(s) for {summary['resource']}
+    were suppressed by the notification rate limit.
+
+    Suppressed events:
+{events}{more}
+
+    Check the RDS events for {summary['resource']} in the console for full details.
+    """
+    return subject, message
+
+
+_limiter = None
+
+
+def get_limiter():
+    """One limiter per container, so empty buckets are remembered between invocations."""
+    global _limiter
+    if _limiter is None:
+        _limiter = NotificationRateLimiter(get_store())
+    return _limiter
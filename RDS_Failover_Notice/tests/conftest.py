@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The function's modules are imported as the Lambda runtime does, from src/
+# and the shared runtime layer
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, '..', 'Shared_Runtime'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
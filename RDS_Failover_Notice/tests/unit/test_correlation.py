@@ -0,0 +1,122 @@
+import pytest
+
+from correlation import FailoverCorrelator, duration_seconds, event_info
+from state_store import SQLiteStore
+
+
+class FakeRDS:
+    """describe_db_instances for instances of the 'orders' Aurora cluster."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def describe_db_instances(self, DBInstanceIdentifier):
+        self.calls += 1
+        cluster = 'orders' if DBInstanceIdentifier.startswith('orders-') else None
+        return {'DBInstances': [{'DBInstanceIdentifier': DBInstanceIdentifier, 'DBClusterIdentifier': cluster}]}
+
+
+def rds_event(source_id, source_type, event_id, date, message='message'):
+    return {
+        'source': 'aws.rds',
+        'detail-type': 'RDS DB Cluster Event' if source_type == 'CLUSTER' else 'RDS DB Instance Event',
+        'time': date,
+        'detail': {
+            'EventID': event_id,
+            'Message': message,
+            'SourceIdentifier': source_id,
+            'SourceType': source_type,
+            'SourceArn': f"arn:aws:rds:us-east-1:123456789012:cluster:{source_id}",
+            'Date': date,
+        },
+    }
+
+
+@pytest.fixture
+def correlator():
+    return FailoverCorrelator(SQLiteStore(), rds_client=FakeRDS(), window_seconds=1800)
+
+
+def process(correlator, *args):
+    return correlator.process(event_info(rds_event(*args)))
+
+
+def test_open_merge_close(correlator):
+    decision, opened = process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0072', '2026-10-19T10:00:00Z')
+    assert decision == 'opened'
+    assert opened['key'] == 'orders'
+
+    decision, merged = process(correlator, 'orders-1', 'DB_INSTANCE', 'RDS-EVENT-0006', '2026-10-19T10:00:20Z')
+    assert decision == 'merged'
+    assert merged['id'] == opened['id']
+
+    decision, closed = process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0071', '2026-10-19T10:01:05Z')
+    assert decision == 'closed'
+    assert closed['id'] == opened['id']
+    assert closed['outcome'] == 'completed'
+    assert closed['duration_seconds'] == 65
+    assert closed['events'] == ['2026-10-19T10:00:00Z|RDS-EVENT-0072',
+                                '2026-10-19T10:00:20Z|RDS-EVENT-0006',
+                                '2026-10-19T10:01:05Z|RDS-EVENT-0071']
+    assert correlator.store.get('incident#orders') is None
+
+
+def test_failed_failover_closes_as_failed(correlator):
+    process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0072', '2026-10-19T10:00:00Z')
+
+    decision, closed = process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0069', '2026-10-19T10:02:00Z')
+
+    assert decision == 'closed'
+    assert closed['outcome'] == 'failed'
+
+
+def test_late_closing_events_merge_into_the_closed_incident(correlator):
+    _, opened = process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0072', '2026-10-19T10:00:00Z')
+    process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0071', '2026-10-19T10:01:00Z')
+
+    # The instance's own completion arrives after the cluster's, and is delivered twice
+    first = process(correlator, 'orders-2', 'DB_INSTANCE', 'RDS-EVENT-0049', '2026-10-19T10:00:58Z')
+    second = process(correlator, 'orders-2', 'DB_INSTANCE', 'RDS-EVENT-0049', '2026-10-19T10:00:58Z')
+
+    assert first[0] == second[0] == 'merged'
+    assert first[1]['id'] == opened['id']
+    assert correlator.events(opened)[1] == '2026-10-19T10:00:58Z|RDS-EVENT-0049'
+
+
+def test_only_one_invocation_closes_an_incident(correlator):
+    process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0072', '2026-10-19T10:00:00Z')
+    # Another invocation closed it but had not yet removed the open incident
+    incident = correlator.store.get('incident#orders')
+    correlator.store.put_if_absent(f"closed#{incident['id']}", {'event_id': 'RDS-EVENT-0071'})
+
+    decision, _ = process(correlator, 'orders', 'CLUSTER', 'RDS-EVENT-0071', '2026-10-19T10:01:00Z')
+
+    assert decision == 'merged'
+
+
+def test_closing_event_before_any_opening_is_standalone(correlator):
+    decision, incident = process(correlator, 'billing', 'DB_INSTANCE', 'RDS-EVENT-0049', '2026-10-19T10:00:00Z')
+
+    assert decision == 'standalone'
+    assert incident is None
+
+
+def test_instance_events_are_keyed_on_their_cluster(correlator):
+    info = event_info(rds_event('orders-1', 'DB_INSTANCE', 'RDS-EVENT-0013', '2026-10-19T10:00:00Z'))
+
+    assert correlator.correlation_key(info) == 'orders'
+    assert correlator.correlation_key(info) == 'orders'
+    assert correlator.rds.calls == 1
+    assert correlator.correlation_key(dict(info, source_id='billing')) == 'billing'
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('2026-10-19T10:00:00Z', '2026-10-19T10:01:05Z', 65),
+    ('2026-10-19T10:00:00.250Z', '2026-10-19T10:00:30.750Z', 30),
+    ('2026-10-19T10:00:00+00:00', '2026-10-19T12:00:00+02:00', 0),
+    # A completion stamped before the start (clock skew) never gives a negative duration
+    ('2026-10-19T10:01:00Z', '2026-10-19T10:00:00Z', 0),
+    ('N/A', '2026-10-19T10:00:00Z', None),
+])
+def test_duration_seconds(start, end, expected):
+    assert duration_seconds(start, end) == expected
@@ -0,0 +1,83 @@
+from rate_limit import PENDING_KEY, NotificationRateLimiter, summary_notification
+from state_store import SQLiteStore
+
+NOW = 1_800_000_000
+LIMITS = {'sms': (3, 900), 'email': (10, 900)}
+
+
+def deliver(limiter, resource, now, entry='2026-10-19T10:00:00Z|RDS-EVENT-0013|subject'):
+    """What app.deliver does for one SMS: send it, or count it as suppressed."""
+    if limiter.allow('sms', resource, now=now):
+        return True
+    limiter.suppress('sms', resource, entry, now=now)
+    return False
+
+
+def test_first_event_passes():
+    limiter = NotificationRateLimiter(SQLiteStore(), LIMITS)
+
+    assert limiter.allow('sms', 'orders', now=NOW)
+    assert limiter.allow('email', 'orders', now=NOW)
+
+
+def test_burst_is_suppressed():
+    limiter = NotificationRateLimiter(SQLiteStore(), LIMITS)
+
+    sent = [deliver(limiter, 'orders', NOW + second) for second in range(6)]
+
+    assert sent == [True, True, True, False, False, False]
+    # Other resources and channels have their own buckets
+    assert limiter.allow('sms', 'payments', now=NOW + 6)
+    assert limiter.allow('email', 'orders', now=NOW + 6)
+
+
+def test_bucket_refills_over_time():
+    limiter = NotificationRateLimiter(SQLiteStore(), LIMITS)
+    for second in range(3):
+        limiter.allow('sms', 'orders', now=NOW + second)
+
+    assert not limiter.allow('sms', 'orders', now=NOW + 10)
+    # One token per 300 seconds
+    assert limiter.allow('sms', 'orders', now=NOW + 310)
+
+
+def test_other_container_sees_the_empty_bucket():
+    store = SQLiteStore()
+    for second in range(3):
+        NotificationRateLimiter(store, LIMITS).allow('sms', 'orders', now=NOW + second)
+
+    assert not NotificationRateLimiter(store, LIMITS).allow('sms', 'orders', now=NOW + 5)
+
+
+def test_summary_is_sent_once_the_window_closes():
+    store = SQLiteStore()
+    limiter = NotificationRateLimiter(store, LIMITS)
+    for second in range(5):
+        deliver(limiter, 'orders', NOW + second, entry=f"2026-10-19T10:00:0{second}Z|RDS-EVENT-0013|s")
+
+    assert limiter.due_summaries(now=NOW + 10) == []
+
+    summaries = limiter.due_summaries(now=NOW + 600)
+
+    assert summaries == [{'channel': 'sms', 'resource': 'orders', 'count': 2,
+                          'events': ['2026-10-19T10:00:03Z|RDS-EVENT-0013|s',
+                                     '2026-10-19T10:00:04Z|RDS-EVENT-0013|s']}]
+    assert limiter.due_summaries(now=NOW + 700) == []
+    assert store.get_members(PENDING_KEY) == set()
+
+    subject, message = summary_notification(summaries[0])
+    assert subject == 'AWS RDS orders: 2 further events suppressed'
+    assert '2 further SMS notification(s) for orders' in message
+
+
+def test_new_window_after_a_summary():
+    limiter = NotificationRateLimiter(SQLiteStore(), LIMITS)
+    for second in range(4):
+        deliver(limiter, 'orders', NOW + second)
+    limiter.due_summaries(now=NOW + 600)
+
+    for second in range(4):
+        deliver(limiter, 'orders', NOW + 1000 + second)
+
+    summaries = limiter.due_summaries(now=NOW + 2000)
+    assert [summary['count'] for summary in summaries] == [1]
@@ -1,5 +1,5 @@
 # Lambda function to delete expired RDS snapshots
-import boto3
+import aws_clients
 import os
 from datetime import datetime, timezone, timedelta
 import logging
@@ -18,7 +18,7 @@ def lambda_handler(event, context):
     regions = ["us-east-1", "us-west-2", "ap-southeast-2", "eu-west-2"]  # Add your regions here
 
     for region in regions:
-        rds_client = boto3.client("rds", region_name=region)
+        rds_client = aws_clients.client("rds", region_name=region)
         
         # Get all manual DB cluster snapshots
         paginator = rds_client.get_paginator("describe_db_cluster_snapshots")
@@ -65,7 +65,7 @@ def lambda_handler(event, context):
     send_sns_notification(deleted_snapshots)
 
 def send_sns_notification(snapshot_list):
-    sns_client = boto3.client("sns")
+    sns_client = aws_clients.client("sns")
     if not snapshot_list:
         message = "No expired RDS snapshots were found for deletion today."
     else:
@@ -1,5 +1,5 @@
 import json
-import boto3
+import aws_clients
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
@@ -17,8 +17,8 @@ class RdsSnapshotCleaner:
         self.environment = os.environ.get('ENVIRONMENT', 'prod')
         
         # Initialize AWS clients
-        self.rds_client = boto3.client('rds')
-        self.sns_client = boto3.client('sns')
+        self.rds_client = aws_clients.client('rds')
+        self.sns_client = aws_clients.client('sns')
         
         # Track cleanup results
         self.deleted_cluster_snapshots = []
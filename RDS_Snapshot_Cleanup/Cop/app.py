@@ -1,4 +1,4 @@
-import boto3
+import aws_clients
 import os
 from datetime import datetime, timezone, timedelta
 
@@ -7,8 +7,8 @@ SNS_TOPIC_ARN = os.environ.get("SNS_TOPIC_ARN")
 RETENTION_TAG_KEY = "RetentionDays"
 
 def lambda_handler(event, context):
-    rds = boto3.client("rds")
-    sns = boto3.client("sns")
+    rds = aws_clients.client("rds")
+    sns = aws_clients.client("sns")
 
     deleted_snapshots = []
 
@@ -1,10 +1,10 @@
-import boto3
+import aws_clients
 from datetime import datetime, timedelta
 import os
 
 # Initialize clients
-rds_client = boto3.client('rds')
-sns_client = boto3.client('sns')
+rds_client = aws_clients.lazy_client('rds')
+sns_client = aws_clients.lazy_client('sns')
 
 def lambda_handler(event, context):
     # Configuration
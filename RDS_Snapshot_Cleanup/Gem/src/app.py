@@ -1,5 +1,5 @@
 import os
-import boto3
+import aws_clients
 from datetime import datetime, timedelta, timezone
 import json
 import logging
@@ -8,9 +8,9 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize Boto3 clients outside the handler for reuse
-rds_client = boto3.client('rds')
-sns_client = boto3.client('sns')
+# Clients are created on first use and reused across warm invocations
+rds_client = aws_clients.lazy_client('rds')
+sns_client = aws_clients.lazy_client('sns')
 
 # Get environment variables
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
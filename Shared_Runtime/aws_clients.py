@@ -0,0 +1,79 @@
+"""
+Shared boto3 client factory for the Lambda functions of every stack,
+deployed to each of them as a layer (see the SharedRuntimeLayer resource in
+their templates).
+
+Clients are created on first use and kept for the lifetime of the
+container, so warm invocations reuse their connection pools instead of
+building new clients, and functions do not pay for clients they never use.
+All clients share one botocore config: bounded connect/read timeouts,
+adaptive retries, TCP keep-alive and a connection pool sized for the
+functions' thread pools. Each setting can be overridden with the
+environment variables below.
+
+    from aws_clients import client, lazy_client
+
+    sns = client('sns')              # inside a function
+    rds_client = lazy_client('rds')  # at module level: created on first call
+
+Local scripts that import the functions' modules need this directory on
+PYTHONPATH.
+"""
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+CLIENT_CONFIG = Config(
+    connect_timeout=float(os.environ.get('AWS_CLIENT_CONNECT_TIMEOUT', '3')),
+    read_timeout=float(os.environ.get('AWS_CLIENT_READ_TIMEOUT', '10')),
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': int(os.environ.get('AWS_CLIENT_MAX_ATTEMPTS', '5')),
+    },
+    tcp_keepalive=True,
+    max_pool_connections=int(os.environ.get('AWS_CLIENT_MAX_POOL_CONNECTIONS', '32')),
+)
+
+_clients = {}
+# Guards the cache and every client creation: boto3's default session is not thread-safe
+_lock = threading.RLock()
+
+
+def client(service_name, region_name=None):
+    """The container's client for the service (and region, if not the function's own)."""
+    key = (service_name, region_name)
+    cached = _clients.get(key)
+    if cached is not None:
+        return cached
+    with _lock:
+        # Another thread may have created it while this one waited
+        if key not in _clients:
+            _clients[key] = new_client(service_name, region_name=region_name)
+        return _clients[key]
+
+
+def new_client(service_name, config=None, **kwargs):
+    """
+    A client that is not cached, with the shared config (merged with config),
+    e.g. for assumed-role credentials the caller caches until they expire.
+    """
+    merged = CLIENT_CONFIG.merge(config) if config else CLIENT_CONFIG
+    with _lock:
+        return boto3.client(service_name, config=merged, **kwargs)
+
+
+class LazyClient:
+    """Stands in for client(service_name) and creates it on first attribute access."""
+
+    def __init__(self, service_name, region_name=None):
+        self._service_name = service_name
+        self._region_name = region_name
+
+    def __getattr__(self, name):
+        return getattr(client(self._service_name, self._region_name), name)
+
+
+def lazy_client(service_name, region_name=None):
+    return LazyClient(service_name, region_name)
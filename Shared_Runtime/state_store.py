@@ -0,0 +1,300 @@
+"""
+Key/value, set and counter state shared by the Monitor_Event_Rule and
+RDS_Failover_Notice functions: DynamoDB when STATE_TABLE is set, otherwise
+a local SQLite file at STATE_DB_PATH.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import aws_clients
+
+
+class DynamoDBStore:
+    """
+    Key/value state kept in a DynamoDB table with a string partition key 'pk'
+    and TTL enabled on 'expires_at'. Expired items are treated as absent even
+    before DynamoDB's TTL sweeper removes them.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self.client = client or aws_clients.client('dynamodb')
+
+    def put_if_absent(self, key, value=None, ttl_seconds=None):
+        """Write the item only if the key is new or expired. Returns True if written."""
+        now = int(time.time())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=self._item(key, value, ttl_seconds, now),
+                ConditionExpression='attribute_not_exists(pk) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}}
+            )
+            return True
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def put_if_unchanged(self, key, expected, value, ttl_seconds=None):
+        """
+        Replace the item only if it still holds `expected` (as returned by get;
+        None means absent or expired). Returns True if written.
+        """
+        if expected is None:
+            return self.put_if_absent(key, value, ttl_seconds)
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=self._item(key, value, ttl_seconds, int(time.time())),
+                ConditionExpression='#data = :expected',
+                ExpressionAttributeNames={'#data': 'data'},
+                ExpressionAttributeValues={':expected': {'S': json.dumps(expected, default=str)}}
+            )
+            return True
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def get(self, key):
+        response = self.client.get_item(TableName=self.table_name, Key={'pk': {'S': key}},
+                                        ConsistentRead=True)
+        item = response.get('Item')
+        if not item or ('expires_at' in item and int(item['expires_at']['N']) < int(time.time())):
+            return None
+        return json.loads(item['data']['S'])
+
+    def put(self, key, value, ttl_seconds=None):
+        self.client.put_item(TableName=self.table_name,
+                             Item=self._item(key, value, ttl_seconds, int(time.time())))
+
+    def delete(self, key):
+        self.client.delete_item(TableName=self.table_name, Key={'pk': {'S': key}})
+
+    def get_members(self, key):
+        """Members of the string set kept under the key (empty if none or expired)."""
+        response = self.client.get_item(TableName=self.table_name, Key={'pk': {'S': key}},
+                                        ProjectionExpression='members, expires_at', ConsistentRead=True)
+        item = response.get('Item', {})
+        if 'expires_at' in item and int(item['expires_at']['N']) < int(time.time()):
+            return set()
+        return set(item.get('members', {}).get('SS', []))
+
+    def add_members(self, key, members, ttl_seconds=None, refresh_ttl=False):
+        """
+        Atomically add strings to the key's set. ttl_seconds applies from the
+        set's first add, or from this add with refresh_ttl.
+        """
+        if members:
+            update, values = 'ADD members :m', {':m': {'SS': sorted(members)}}
+            if ttl_seconds:
+                update += (' SET expires_at = :expires' if refresh_ttl else
+                           ' SET expires_at = if_not_exists(expires_at, :expires)')
+                values[':expires'] = {'N': str(int(time.time()) + int(ttl_seconds))}
+            self.client.update_item(TableName=self.table_name, Key={'pk': {'S': key}},
+                                    UpdateExpression=update, ExpressionAttributeValues=values)
+
+    def remove_members(self, key, members):
+        """Atomically remove strings from the key's set."""
+        if members:
+            self.client.update_item(TableName=self.table_name, Key={'pk': {'S': key}},
+                                    UpdateExpression='DELETE members :m',
+                                    ExpressionAttributeValues={':m': {'SS': sorted(members)}})
+
+    def increment(self, key, amount=1, ttl_seconds=None):
+        """
+        Atomically add to the key's counter and return the new value. A counter
+        that expired but was not swept yet restarts from zero, as in SQLite.
+        """
+        now = int(time.time())
+        expires = {':expires': {'N': str(now + int(ttl_seconds))}} if ttl_seconds else {}
+        while True:
+            update, values = 'ADD #counter :amount', {':amount': {'N': str(amount)}, ':now': {'N': str(now)}}
+            if ttl_seconds:
+                update += ' SET expires_at = if_not_exists(expires_at, :expires)'
+            try:
+                response = self.client.update_item(
+                    TableName=self.table_name, Key={'pk': {'S': key}}, UpdateExpression=update,
+                    ConditionExpression='attribute_not_exists(expires_at) OR expires_at >= :now',
+                    ExpressionAttributeNames={'#counter': 'counter'},
+                    ExpressionAttributeValues={**values, **expires}, ReturnValues='UPDATED_NEW'
+                )
+                return int(response['Attributes']['counter']['N'])
+            except self.client.exceptions.ConditionalCheckFailedException:
+                pass
+            # Expired: start a new counter, unless another invocation just did
+            reset = 'SET #counter = :amount' + (', expires_at = :expires' if ttl_seconds else ' REMOVE expires_at')
+            try:
+                self.client.update_item(
+                    TableName=self.table_name, Key={'pk': {'S': key}}, UpdateExpression=reset,
+                    ConditionExpression='expires_at < :now',
+                    ExpressionAttributeNames={'#counter': 'counter'},
+                    ExpressionAttributeValues={**values, **expires}
+                )
+                return amount
+            except self.client.exceptions.ConditionalCheckFailedException:
+                continue
+
+    def get_counters(self, keys):
+        """Counters for several keys in one round trip (missing or expired keys count 0)."""
+        now = int(time.time())
+        counters = dict.fromkeys(keys, 0)
+        request = {self.table_name: {'Keys': [{'pk': {'S': key}} for key in keys],
+                                     'ProjectionExpression': 'pk, #counter, expires_at',
+                                     'ExpressionAttributeNames': {'#counter': 'counter'}}}
+        while keys and request:
+            response = self.client.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(self.table_name, []):
+                if 'expires_at' in item and int(item['expires_at']['N']) < now:
+                    continue
+                counters[item['pk']['S']] = int(item.get('counter', {'N': '0'})['N'])
+            request = response.get('UnprocessedKeys')
+        return counters
+
+    @staticmethod
+    def _item(key, value, ttl_seconds, now):
+        item = {'pk': {'S': key}, 'data': {'S': json.dumps(value, default=str)}}
+        if ttl_seconds:
+            item['expires_at'] = {'N': str(now + int(ttl_seconds))}
+        return item
+
+
+class SQLiteStore:
+    """Local stand-in for DynamoDBStore with the same interface, for tests and local runs."""
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS state (pk TEXT PRIMARY KEY, data TEXT, expires_at INTEGER)'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS state_sets (pk TEXT PRIMARY KEY, members TEXT, expires_at INTEGER)'
+        )
+        # Databases created before sets could expire lack the column
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(state_sets)')}
+        if 'expires_at' not in columns:
+            self.connection.execute('ALTER TABLE state_sets ADD COLUMN expires_at INTEGER')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS state_counters (pk TEXT PRIMARY KEY, counter INTEGER, expires_at INTEGER)'
+        )
+
+    def put_if_absent(self, key, value=None, ttl_seconds=None):
+        now = int(time.time())
+        with self.lock:
+            self.connection.execute('DELETE FROM state WHERE pk = ? AND expires_at < ?', (key, now))
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO state (pk, data, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, default=str), now + int(ttl_seconds) if ttl_seconds else None)
+            )
+            return cursor.rowcount == 1
+
+    def put_if_unchanged(self, key, expected, value, ttl_seconds=None):
+        if expected is None:
+            return self.put_if_absent(key, value, ttl_seconds)
+        with self.lock:
+            cursor = self.connection.execute(
+                'UPDATE state SET data = ?, expires_at = ? WHERE pk = ? AND data = ? '
+                'AND (expires_at IS NULL OR expires_at >= ?)',
+                (json.dumps(value, default=str), int(time.time()) + int(ttl_seconds) if ttl_seconds else None,
+                 key, json.dumps(expected, default=str), int(time.time()))
+            )
+            return cursor.rowcount == 1
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT data FROM state WHERE pk = ? AND (expires_at IS NULL OR expires_at >= ?)',
+                (key, int(time.time()))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value, ttl_seconds=None):
+        expires_at = int(time.time()) + int(ttl_seconds) if ttl_seconds else None
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO state (pk, data, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, default=str), expires_at)
+            )
+
+    def delete(self, key):
+        with self.lock:
+            self.connection.execute('DELETE FROM state WHERE pk = ?', (key,))
+
+    def get_members(self, key):
+        with self.lock:
+            return self._members(key)
+
+    def add_members(self, key, members, ttl_seconds=None, refresh_ttl=False):
+        now = int(time.time())
+        with self.lock:
+            self.connection.execute('DELETE FROM state_sets WHERE pk = ? AND expires_at < ?', (key, now))
+            self._set_members(key, self._members(key) | set(members),
+                              now + int(ttl_seconds) if ttl_seconds else None, refresh_ttl)
+
+    def remove_members(self, key, members):
+        with self.lock:
+            self._set_members(key, self._members(key) - set(members))
+
+    def increment(self, key, amount=1, ttl_seconds=None):
+        now = int(time.time())
+        with self.lock:
+            self.connection.execute('DELETE FROM state_counters WHERE pk = ? AND expires_at < ?', (key, now))
+            self.connection.execute(
+                'INSERT INTO state_counters (pk, counter, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(pk) DO UPDATE SET counter = counter + excluded.counter',
+                (key, amount, now + int(ttl_seconds) if ttl_seconds else None)
+            )
+            return self.connection.execute('SELECT counter FROM state_counters WHERE pk = ?', (key,)).fetchone()[0]
+
+    def get_counters(self, keys):
+        counters = dict.fromkeys(keys, 0)
+        with self.lock:
+            for key in keys:
+                row = self.connection.execute(
+                    'SELECT counter FROM state_counters WHERE pk = ? AND (expires_at IS NULL OR expires_at >= ?)',
+                    (key, int(time.time()))
+                ).fetchone()
+                if row:
+                    counters[key] = row[0]
+        return counters
+
+    def _members(self, key):
+        row = self.connection.execute(
+            'SELECT members FROM state_sets WHERE pk = ? AND (expires_at IS NULL OR expires_at >= ?)',
+            (key, int(time.time()))
+        ).fetchone()
+        return set(json.loads(row[0])) if row else set()
+
+    def _set_members(self, key, members, expires_at=None, refresh_ttl=False):
+        if members:
+            # Like DynamoDB's if_not_exists, the first add fixes the set's expiry unless refreshed
+            expiry = ('excluded.expires_at' if refresh_ttl and expires_at else
+                      'COALESCE(state_sets.expires_at, excluded.expires_at)')
+            self.connection.execute(
+                'INSERT INTO state_sets (pk, members, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(pk) DO UPDATE SET members = excluded.members, '
+                f'expires_at = {expiry}',
+                (key, json.dumps(sorted(members)), expires_at)
+            )
+        else:
+            self.connection.execute('DELETE FROM state_sets WHERE pk = ?', (key,))
+
+
+def store_from_environment():
+    """DynamoDB when STATE_TABLE is set, otherwise SQLite at STATE_DB_PATH."""
+    table_name = os.environ.get('STATE_TABLE')
+    if table_name:
+        return DynamoDBStore(table_name)
+    return SQLiteStore(os.environ.get('STATE_DB_PATH', '/tmp/lambda-state.db'))
+
+
+_store = None
+
+
+def get_store():
+    """One store per container, shared by the function's modules."""
+    global _store
+    if _store is None:
+        _store = store_from_environment()
+    return _store